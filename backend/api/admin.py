@@ -1,3 +1,16 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import TaskRecord, TaskState
+
+
+@admin.register(TaskRecord)
+class TaskRecordAdmin(admin.ModelAdmin):
+    list_display = ('task_id', 'created_at', 'cell_count', 'total_frames', 'video_duration', 'model_name')
+    ordering = ('-created_at',)
+
+
+@admin.register(TaskState)
+class TaskStateAdmin(admin.ModelAdmin):
+    list_display = ('task_id', 'status', 'stage', 'progress', 'video_name', 'created_at', 'updated_at')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
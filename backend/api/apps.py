@@ -1,6 +1,41 @@
+import os
+import sys
+import threading
+from pathlib import Path
+
 from django.apps import AppConfig
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # 服务进程启动时接管已退出的工作进程遗留的任务，从追踪检查点继续处理；
+        # 在后台线程中执行，不阻塞启动，也不在应用初始化阶段访问数据库
+        if _is_serving():
+            threading.Thread(target=_resume_interrupted_tasks, name='resume-interrupted-tasks', daemon=True).start()
+
+
+def _is_serving() -> bool:
+    """当前进程是否提供服务（migrate / test 等管理命令不接管任务）"""
+    if Path(sys.argv[0]).name not in ('manage.py', 'django-admin'):
+        # ASGI / WSGI 服务器
+        return True
+    if len(sys.argv) < 2 or sys.argv[1] != 'runserver':
+        return False
+    # runserver 自动重载时父进程只监视文件变化，由子进程（RUN_MAIN=true）提供服务
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+
+def _resume_interrupted_tasks():
+    from django.db import connection
+
+    from .views import resume_interrupted_tasks
+
+    try:
+        resume_interrupted_tasks()
+    except Exception as e:
+        print(f"[TaskState] 接管中断的任务失败: {e}")
+    finally:
+        connection.close()
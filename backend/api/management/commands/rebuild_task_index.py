@@ -0,0 +1,45 @@
+"""
+重建任务索引
+扫描 media/tasks 下已完成任务的结果 manifest（或旧版 result.json），写入 TaskRecord，
+用于升级前已存在的任务，或任务目录被手动改动之后的修复。
+
+用法: python manage.py rebuild_task_index [--prune]
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import TaskRecord
+from api.services.result_store import ResultStore
+
+
+class Command(BaseCommand):
+    help = '扫描 media/tasks 重建任务索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help='同时删除任务目录已不存在的索引记录')
+
+    def handle(self, *args, **options):
+        tasks_dir = Path(settings.MEDIA_ROOT) / 'tasks'
+        found = set()
+
+        if tasks_dir.exists():
+            for task_dir in sorted(tasks_dir.iterdir()):
+                store = ResultStore(task_dir)
+                if not task_dir.is_dir() or not store.exists():
+                    continue
+                try:
+                    manifest = dict(store.manifest())
+                    manifest.setdefault('task_id', task_dir.name)
+                    TaskRecord.upsert_from_manifest(manifest)
+                    found.add(manifest['task_id'])
+                except Exception as e:
+                    self.stderr.write(f"读取任务 {task_dir.name} 结果失败: {e}")
+
+        self.stdout.write(f"已索引 {len(found)} 个任务")
+
+        if options['prune']:
+            deleted, _ = TaskRecord.objects.exclude(task_id__in=found).delete()
+            self.stdout.write(f"已删除 {deleted} 条失效索引")
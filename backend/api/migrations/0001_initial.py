@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRecord',
+            fields=[
+                ('task_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('cell_count', models.IntegerField(default=0)),
+                ('total_frames', models.IntegerField(default=0)),
+                ('video_duration', models.FloatField(default=0)),
+                ('model_name', models.CharField(blank=True, max_length=255)),
+                ('original_video_path', models.CharField(blank=True, max_length=1024)),
+                ('annotated_video_path', models.CharField(blank=True, max_length=1024)),
+                ('annotated_video_url', models.CharField(blank=True, max_length=255)),
+                ('frame_range', models.JSONField(blank=True, default=dict)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskState',
+            fields=[
+                ('task_id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('video_name', models.CharField(blank=True, max_length=255)),
+                ('video_path', models.CharField(blank=True, max_length=1024)),
+                ('video_sha256', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(db_index=True, default='uploaded', max_length=16)),
+                ('stage', models.CharField(blank=True, max_length=32)),
+                ('progress', models.IntegerField(default=0)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('current_frame', models.IntegerField(blank=True, null=True)),
+                ('total_frames', models.IntegerField(blank=True, null=True)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('priority', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('failed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'priority', 'queued_at'], name='api_tasksta_status_7d8b58_idx')],
+            },
+        ),
+    ]
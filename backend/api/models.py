@@ -1,3 +1,149 @@
 from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-# Create your models here.
+
+class TaskRecord(models.Model):
+    """
+    已完成任务的索引（只保存汇总字段）
+
+    任务列表直接在数据库中分页、排序，不再遍历 media/tasks 读取每个任务的结果文件。
+    逐行追踪数据仍保存在任务目录的列式结果中（见 services/result_store.py）。
+    """
+
+    # 任务列表允许的排序字段
+    ORDERING_FIELDS = ('created_at', 'cell_count', 'total_frames', 'video_duration', 'model_name')
+
+    task_id = models.CharField(max_length=64, primary_key=True)
+    created_at = models.DateTimeField(db_index=True)
+    cell_count = models.IntegerField(default=0)
+    total_frames = models.IntegerField(default=0)
+    video_duration = models.FloatField(default=0)
+    model_name = models.CharField(max_length=255, blank=True)
+    original_video_path = models.CharField(max_length=1024, blank=True)
+    annotated_video_path = models.CharField(max_length=1024, blank=True)
+    annotated_video_url = models.CharField(max_length=255, blank=True)
+    frame_range = models.JSONField(default=dict, blank=True)
+    summary = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.task_id
+
+    @classmethod
+    def upsert_from_manifest(cls, manifest: dict) -> 'TaskRecord':
+        """按结果 manifest 新建或更新索引记录"""
+        created_at = parse_datetime(manifest.get('created_at') or '') or timezone.now()
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+
+        record, _ = cls.objects.update_or_create(
+            task_id=manifest['task_id'],
+            defaults={
+                'created_at': created_at,
+                'cell_count': manifest.get('cell_count') or 0,
+                'total_frames': manifest.get('total_frames') or 0,
+                'video_duration': manifest.get('video_duration') or 0,
+                'model_name': manifest.get('model_name') or '',
+                'original_video_path': manifest.get('original_video_path') or '',
+                'annotated_video_path': manifest.get('annotated_video_path') or '',
+                'annotated_video_url': manifest.get('annotated_video_url') or '',
+                'frame_range': manifest.get('frame_range') or {},
+                'summary': manifest.get('summary') or {},
+            }
+        )
+        return record
+
+    def to_dict(self) -> dict:
+        """与结果 manifest 相同结构的字典（任务列表接口的返回格式）"""
+        return {
+            'task_id': self.task_id,
+            'status': 'completed',
+            'progress': 100,
+            'total_frames': self.total_frames,
+            'frame_range': self.frame_range,
+            'cell_count': self.cell_count,
+            'video_duration': self.video_duration,
+            'model_name': self.model_name,
+            'annotated_video_path': self.annotated_video_path,
+            'annotated_video_url': self.annotated_video_url,
+            'original_video_path': self.original_video_path,
+            'created_at': timezone.localtime(self.created_at).isoformat(),
+            'summary': self.summary,
+        }
+
+
+class TaskState(models.Model):
+    """
+    任务的运行状态（上传 / 排队 / 处理中 / 取消中 / 完成 / 失败 / 已取消）
+
+    保存在数据库中（SQLite WAL），服务重启后仍可查询，多个 Web 工作进程看到的是同一份状态。
+    读写接口见 services/task_state.py。
+    """
+
+    UPLOADED = 'uploaded'
+    QUEUED = 'queued'
+    PROCESSING = 'processing'
+    # 已请求取消、等待负责的工作进程停止
+    CANCELLING = 'cancelling'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    # 尚未结束、由某个工作进程负责的状态
+    ACTIVE_STATUSES = (QUEUED, PROCESSING, CANCELLING)
+
+    task_id = models.CharField(max_length=64, primary_key=True)
+    video_name = models.CharField(max_length=255, blank=True)
+    video_path = models.CharField(max_length=1024, blank=True)
+    video_sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=16, default=UPLOADED, db_index=True)
+    stage = models.CharField(max_length=32, blank=True)
+    progress = models.IntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    current_frame = models.IntegerField(null=True, blank=True)
+    total_frames = models.IntegerField(null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    priority = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    # 负责排队 / 处理该任务的工作进程（主机名:PID），用于发现进程退出后遗留的任务
+    worker = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    queued_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'priority', 'queued_at'])]
+
+    def __str__(self):
+        return f'{self.task_id} ({self.status})'
+
+    def to_dict(self) -> dict:
+        """状态查询接口的返回格式"""
+        def iso(value):
+            return timezone.localtime(value).isoformat() if value else None
+
+        return {
+            'task_id': self.task_id,
+            'video_name': self.video_name,
+            'video_path': self.video_path,
+            'video_sha256': self.video_sha256,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'message': self.message,
+            'current_frame': self.current_frame,
+            'total_frames': self.total_frames,
+            'params': self.params,
+            'error': self.error,
+            'created_at': iso(self.created_at),
+            'started_at': iso(self.started_at),
+            'completed_at': iso(self.completed_at),
+            'failed_at': iso(self.failed_at),
+            'cancelled_at': iso(self.cancelled_at),
+        }
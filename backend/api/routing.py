@@ -6,5 +6,7 @@ from django.urls import re_path
 from . import websocket
 
 websocket_urlpatterns = [
-    re_path(r'ws/task/(?P<task_id>\w+)/$', websocket.TaskProgressConsumer.as_asgi()),
+    # task_id 为 UUID（含连字符）；不带 task_id 连接时通过 subscribe 消息订阅
+    re_path(r'ws/task/(?P<task_id>[\w-]+)/$', websocket.TaskProgressConsumer.as_asgi()),
+    re_path(r'ws/task/$', websocket.TaskProgressConsumer.as_asgi()),
 ]
\ No newline at end of file
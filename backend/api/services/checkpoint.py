@@ -0,0 +1,130 @@
+"""
+追踪检查点
+长视频的流式追踪每处理 interval 帧保存一次检查点，处理进程退出（重启、崩溃、被抢占）后
+从最后一个检查点继续，而不是从第一帧重新推理。
+
+检查点目录（任务目录下的 checkpoint/）中包含：
+- state.pkl: 恢复所需的状态（已处理帧数、DeepSORT 追踪器、ID 重映射、轨迹、视频写入器状态等）；
+- part_NNNNN.pkl: 相邻两次检查点之间产生的 MOT 行、掩模面积和逐帧 label，只追加不重写；
+- video/: 标注视频的分段，处理完成时拼接为最终视频。
+
+state.pkl 最后写入且原子替换，只有它引用的分段 / part 文件才有效，中途退出留下的多余文件在恢复时丢弃。
+指纹（视频、模型、推理参数等）不一致的检查点直接清除，不会用旧参数的状态恢复新任务。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class TrackingCheckpoint:
+    """
+    单个任务的追踪检查点
+
+    Args:
+        directory: 检查点目录
+        fingerprint: 决定能否恢复的参数（视频 / 模型哈希、推理参数等），可 JSON 序列化
+        interval: 每处理多少帧保存一次检查点
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory: Path, fingerprint: Dict[str, Any], interval: int):
+        self.directory = Path(directory)
+        self.interval = max(1, int(interval))
+        data = dict(fingerprint, version=self.VERSION, interval=self.interval)
+        self.key = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    @property
+    def video_dir(self) -> Path:
+        """标注视频分段目录"""
+        return self.directory / 'video'
+
+    def due(self, frame_idx: int) -> bool:
+        """处理完第 frame_idx 帧（从 1 开始）后是否应保存检查点"""
+        return frame_idx % self.interval == 0
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """
+        读取可恢复的状态
+
+        Returns:
+            最后一次保存的状态；没有检查点、指纹不一致或文件损坏时清除检查点并返回 None
+        """
+        state_path = self.directory / 'state.pkl'
+        if not state_path.exists():
+            self.clear()
+            return None
+        try:
+            with open(state_path, 'rb') as f:
+                saved = pickle.load(f)
+        except Exception as e:
+            print(f"[TrackingCheckpoint] 检查点无法读取，重新开始: {e}")
+            self.clear()
+            return None
+        if saved.get('key') != self.key:
+            print(f"[TrackingCheckpoint] 参数已变化，丢弃旧检查点: {self.directory}")
+            self.clear()
+            return None
+
+        # 丢弃最后一次检查点之后写出的 part
+        state = saved['state']
+        for path in self.directory.glob('part_*.pkl'):
+            if path.name not in self._part_names(state['parts']):
+                path.unlink()
+        return state
+
+    def load_rows(self, state: Dict[str, Any]) -> Tuple[List[list], List[float], Dict[str, list]]:
+        """
+        按顺序读取状态引用的全部 part
+
+        Returns:
+            (MOT 行, 掩模面积, {帧名: 该帧 label})
+        """
+        rows: List[list] = []
+        mask_areas: List[float] = []
+        labels: Dict[str, list] = {}
+        for name in self._part_names(state['parts']):
+            with open(self.directory / name, 'rb') as f:
+                part = pickle.load(f)
+            rows.extend(part['rows'])
+            mask_areas.extend(part['mask_areas'])
+            labels.update(part['labels'])
+        return rows, mask_areas, labels
+
+    def save(self, state: Dict[str, Any], rows: List[list], mask_areas: List[float], labels: Dict[str, list]):
+        """
+        保存检查点
+
+        Args:
+            state: 恢复所需的状态（其中 parts 为保存后的 part 数量，由本方法填写）
+            rows / mask_areas / labels: 上一次检查点之后新增的 MOT 行、掩模面积和逐帧 label
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        parts = state.get('parts', 0)
+        part_path = self.directory / self._part_names(parts + 1)[-1]
+        self._dump(part_path, {'rows': rows, 'mask_areas': mask_areas, 'labels': labels})
+        state['parts'] = parts + 1
+        self._dump(self.directory / 'state.pkl', {'key': self.key, 'state': state})
+
+    def clear(self):
+        """删除检查点（处理完成、取消或参数变化时）"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def _part_names(count: int) -> List[str]:
+        return [f'part_{i:05d}.pkl' for i in range(count)]
+
+    @staticmethod
+    def _dump(path: Path, data):
+        # 先写临时文件再原子替换，进程在写入途中退出时保留上一次的文件
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
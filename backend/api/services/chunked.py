@@ -0,0 +1,273 @@
+"""
+单个长视频的分块并行处理
+把待处理的帧切成首尾重叠的若干块，每块在独立进程中各自运行 YOLO 推理 + DeepSORT 追踪；
+随后在重叠帧上按框 IoU 匹配相邻两块的轨迹，把各块的 track_id 拼接为全局 ID，
+最后在主进程中按拼接后的轨迹顺序生成 MOT / label / 标注视频（沿用 convert_results 的 ID 重映射）。
+"""
+
+import multiprocessing
+import os
+import queue
+from collections import Counter
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .convert_results import (YOLO, detect_in_batches, get_video_info, init_deepsort, iter_video_frames,
+                              track_frames, update_tracks)
+from .frame_reader import FrameRange
+from .mask_codec import PackedMask
+from .writers import FrameOutputPolicy, VideoEncoding
+
+# 子进程内的进度队列（由 _init_worker 设置）
+_progress_queue = None
+
+
+class Chunk:
+    """一个处理块：frames 为按顺序处理的原视频帧序号，前 overlap 帧与上一块重叠（仅用于拼接）"""
+
+    def __init__(self, frames: List[int], overlap: int):
+        self.frames = frames
+        self.overlap = overlap
+
+    def frame_range(self, stride: int) -> FrameRange:
+        return FrameRange(self.frames[0], self.frames[-1] + 1, stride=stride)
+
+
+def plan_chunks(frames: List[int], workers: int, overlap: int) -> List[Chunk]:
+    """
+    把帧序列均分为 workers 块，除第一块外每块向前多处理 overlap 帧
+
+    重叠帧数不超过任何一块的自身帧数，保证重叠区只落在相邻的上一块中。
+    """
+    n = len(frames)
+    workers = max(1, min(workers, n))
+    bounds = [round(i * n / workers) for i in range(workers + 1)]
+    overlap = max(0, min(overlap, min(bounds[i + 1] - bounds[i] for i in range(workers))))
+
+    chunks = []
+    for i in range(workers):
+        start = max(0, bounds[i] - overlap) if i > 0 else 0
+        chunks.append(Chunk(frames[start:bounds[i + 1]], bounds[i] - start))
+    return chunks
+
+
+def _init_worker(progress_queue, torch_threads: int):
+    """子进程初始化：记录进度队列，并按核数均分 torch 线程"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    import torch
+    torch.set_num_threads(max(1, torch_threads))
+
+
+def _track_chunk(model_path: str, video_path: str, frame_range: FrameRange, conf: float, imgsz: int,
+                 batch: int) -> Dict[int, List[tuple]]:
+    """
+    子进程：对一个块运行推理 + 追踪
+
+    Returns:
+        {原视频帧序号: [(track_box, 块内 track_id, class_id, PackedMask 或 None), ...]}
+    """
+    model = YOLO(model_path)
+    predictor = model.stream(conf=conf, imgsz=imgsz)
+    deepsort = init_deepsort()
+
+    tracks = {}
+    source = iter_video_frames(video_path, frame_range=frame_range)
+    for index, stem, img, det, masks in detect_in_batches(predictor, source, batch=batch):
+        if img is not None and det is not None:
+            tracks[index] = [(box, tid, cls, PackedMask.pack(mask) if mask is not None else None)
+                             for box, tid, cls, mask in update_tracks(deepsort, det, masks, img)]
+        if _progress_queue is not None:
+            _progress_queue.put(1)
+    return tracks
+
+
+def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """两组 xyxy 框之间的 IoU 矩阵 [len(a), len(b)]"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def _match_frame(cur: List[tuple], prev: List[tuple], iou_threshold: float) -> List[Tuple[int, int]]:
+    """同一帧内两组轨迹按 IoU 从大到小一对一贪心匹配，返回 [(当前块 id, 上一块 id), ...]"""
+    if not cur or not prev:
+        return []
+    iou = _iou_matrix(np.array([t[0] for t in cur], dtype=np.float64),
+                      np.array([t[0] for t in prev], dtype=np.float64))
+    pairs = []
+    used_cur, used_prev = set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        i, j = divmod(int(flat), iou.shape[1])
+        if iou[i, j] < iou_threshold:
+            break
+        if i in used_cur or j in used_prev:
+            continue
+        used_cur.add(i)
+        used_prev.add(j)
+        pairs.append((cur[i][1], prev[j][1]))
+    return pairs
+
+
+def stitch_chunk_tracks(chunks: List[Chunk], chunk_tracks: List[Dict[int, List[tuple]]],
+                        iou_threshold: float = 0.5) -> Dict[int, List[tuple]]:
+    """
+    拼接各块的追踪结果
+
+    相邻两块在重叠帧上按 IoU 匹配轨迹并投票，每条当前块轨迹继承得票最多的上一块全局 ID，
+    未匹配的轨迹分配新的全局 ID。重叠帧的输出以上一块为准（上一块在这些帧上已有完整历史）。
+
+    Returns:
+        {原视频帧序号: [(track_box, 全局 track_id, class_id, PackedMask 或 None), ...]}
+    """
+    merged: Dict[int, List[tuple]] = {}
+    next_global_id = 1
+    prev_tracks: Optional[Dict[int, List[tuple]]] = None
+    prev_ids: Dict[int, int] = {}
+
+    for chunk, tracks in zip(chunks, chunk_tracks):
+        ids: Dict[int, int] = {}    # {块内 track_id: 全局 track_id}
+
+        if prev_tracks is not None:
+            votes = Counter()
+            for index in chunk.frames[:chunk.overlap]:
+                for cur_id, prev_id in _match_frame(tracks.get(index, []), prev_tracks.get(index, []), iou_threshold):
+                    if prev_id in prev_ids:
+                        votes[(cur_id, prev_ids[prev_id])] += 1
+
+            used = set()
+            for (cur_id, global_id), _ in votes.most_common():
+                if cur_id in ids or global_id in used:
+                    continue
+                ids[cur_id] = global_id
+                used.add(global_id)
+
+        for index in chunk.frames[chunk.overlap:]:
+            frame_tracks = []
+            for box, tid, cls, mask in tracks.get(index, []):
+                if tid not in ids:
+                    ids[tid] = next_global_id
+                    next_global_id += 1
+                frame_tracks.append((box, ids[tid], cls, mask))
+            if frame_tracks:
+                merged[index] = frame_tracks
+
+        prev_tracks, prev_ids = tracks, ids
+
+    return merged
+
+
+def _terminate_pool(pool: ProcessPoolExecutor):
+    """取消尚未开始的块并终止进程池中的子进程"""
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def run_tracking_chunked(
+    model_path: str,
+    video_path: str,
+    output_dir: str,
+    conf: float = 0.25,
+    imgsz: int = 1024,
+    fps: int = 10,
+    batch: int = 1,
+    workers: int = 2,
+    overlap: int = 10,
+    frame_range: Optional[FrameRange] = None,
+    frame_output: Optional[FrameOutputPolicy] = None,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    video_encoding: Optional[VideoEncoding] = None
+) -> Tuple[Path, int]:
+    """
+    分块并行处理一个视频
+
+    Args:
+        model_path: 模型路径（每个子进程各自加载）
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        conf: 置信度阈值
+        imgsz: 图像尺寸
+        fps: 输出视频帧率
+        batch: 每次前向推理的帧数
+        workers: 并行进程数（即分块数）
+        overlap: 相邻块之间重叠的帧数（按被选中的帧计），用于拼接轨迹，至少 2 帧才能匹配到已确认的轨迹
+        frame_range: 帧选择范围，为空时处理整个视频
+        frame_output: 逐帧标注图片的输出策略
+        progress_callback: 进度回调 (阶段 'tracking' / 'rendering', 当前帧数, 总帧数)
+        video_encoding: 标注视频的编码配置
+
+    Returns:
+        (输出目录, 实际处理的帧数)
+    """
+    frame_range = frame_range or FrameRange()
+    total_frames, _ = get_video_info(video_path)
+    end = total_frames if frame_range.end_frame is None else min(frame_range.end_frame, total_frames)
+    frames = list(range(frame_range.start_frame, end, frame_range.stride))
+    if not frames:
+        raise ValueError(f"帧范围内没有可处理的帧: {frame_range}")
+
+    chunks = plan_chunks(frames, workers, overlap)
+
+    # 阶段1: 各块在独立进程中推理 + 追踪
+    ctx = multiprocessing.get_context('spawn')
+    progress_queue = ctx.Queue()
+    torch_threads = (os.cpu_count() or 1) // len(chunks)
+    total_work = sum(len(c.frames) for c in chunks)
+    done = 0
+    if progress_callback:
+        progress_callback('tracking', done, total_work)
+
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=ctx, initializer=_init_worker,
+                             initargs=(progress_queue, torch_threads)) as pool:
+        futures = [
+            pool.submit(_track_chunk, model_path, video_path, c.frame_range(frame_range.stride), conf, imgsz, batch)
+            for c in chunks
+        ]
+        pending = set(futures)
+        try:
+            while pending:
+                finished, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+                for f in finished:
+                    if f.exception() is not None:
+                        raise f.exception()
+                try:
+                    while True:
+                        done += progress_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                if progress_callback:
+                    progress_callback('tracking', done, total_work)
+        except BaseException:
+            # 某块失败或进度回调抛出异常（如任务被取消）：终止仍在运行的子进程，不等待它们处理完
+            _terminate_pool(pool)
+            raise
+        chunk_tracks = [f.result() for f in futures]
+
+    # 阶段2: 拼接各块的轨迹 ID
+    stitched = stitch_chunk_tracks(chunks, chunk_tracks)
+
+    # 阶段3: 按拼接后的轨迹重新解码并绘制、写出结果（ID 重映射与单进程流程一致）
+    return track_frames(
+        None,
+        iter_video_frames(video_path, frame_range=frame_range),
+        output_dir,
+        total_frames=len(frames),
+        fps=fps,
+        progress_callback=(lambda c, t: progress_callback('rendering', c, t)) if progress_callback else None,
+        frame_output=frame_output,
+        replay_tracks=stitched,
+        video_encoding=video_encoding
+    )
@@ -0,0 +1,203 @@
+"""
+按内容寻址的视频存储与结果缓存
+上传的视频在写入时计算 SHA-256，原始文件以 media/videos/<sha256><扩展名> 保存一份，
+各任务目录 original/ 下只是指向它的硬链接，同一录像重复上传不再占用额外空间。
+
+处理结果按 (视频哈希, 模型哈希, conf, imgsz, fps, 帧选择范围, 追踪配置, 输出选项) 建立索引
+(media/result_index/<key>.json -> 产生该结果的任务)，再次以相同参数处理时直接把已有结果
+以硬链接方式放入新任务目录并改写 manifest，无需重新推理和追踪。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .detection_cache import file_sha256
+from .frame_reader import FrameRange
+from .result_store import MANIFEST_NAME, RESULTS_DIRNAME, write_manifest
+
+VIDEOS_DIRNAME = 'videos'
+RESULT_INDEX_DIRNAME = 'result_index'
+# 任务目录中可被其他任务以硬链接共享的结果目录
+SHARED_DIRNAMES = ('output', RESULTS_DIRNAME)
+
+# 追踪参数配置文件（内容变化时结果缓存失效）
+DEEPSORT_CONFIG = (Path(__file__).parent.parent.parent.parent / 'libs' / 'ultralytics' / 'yolo' / 'v8' / 'segment'
+                   / 'deep_sort_pytorch' / 'configs' / 'deep_sort.yaml')
+
+# 结果缓存键的版本（结果格式变化时递增，使旧索引失效）
+RESULT_KEY_VERSION = 1
+
+
+def _link_or_copy(src: Path, dst: Path):
+    """创建硬链接，文件系统不支持时退化为复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ContentStore:
+    """
+    media 目录下的内容寻址存储
+
+    Args:
+        media_root: MEDIA_ROOT
+    """
+
+    def __init__(self, media_root: Path):
+        self.media_root = Path(media_root)
+        self.videos_dir = self.media_root / VIDEOS_DIRNAME
+        self.index_dir = self.media_root / RESULT_INDEX_DIRNAME
+
+    # ========== 原始视频 ==========
+
+    def video_blob(self, sha256: str, suffix: str) -> Path:
+        return self.videos_dir / f"{sha256}{suffix.lower()}"
+
+    def adopt_video(self, video_path: Path, sha256: str) -> Path:
+        """
+        把刚写入任务目录的上传视频纳入内容存储
+
+        已有相同内容的视频时删除新文件、改为指向已有文件的硬链接；否则把新文件链接进存储。
+
+        Returns:
+            存储中的视频路径
+        """
+        video_path = Path(video_path)
+        self.videos_dir.mkdir(parents=True, exist_ok=True)
+        blob = self.video_blob(sha256, video_path.suffix)
+        if blob.exists():
+            if not os.path.samefile(blob, video_path):
+                tmp_path = video_path.with_name(video_path.name + '.link')
+                _link_or_copy(blob, tmp_path)
+                os.replace(tmp_path, video_path)
+        else:
+            try:
+                os.link(video_path, blob)
+            except FileExistsError:
+                # 并发上传了相同内容，另一方已写入存储
+                return self.adopt_video(video_path, sha256)
+            except OSError:
+                shutil.copy2(video_path, blob)
+        return blob
+
+    def prune_videos(self) -> int:
+        """删除已没有任务引用的视频（硬链接数为 1），返回删除的文件数"""
+        removed = 0
+        if not self.videos_dir.exists():
+            return removed
+        for blob in self.videos_dir.iterdir():
+            if blob.is_file() and blob.stat().st_nlink == 1:
+                blob.unlink()
+                removed += 1
+        return removed
+
+    # ========== 结果缓存 ==========
+
+    @staticmethod
+    def result_key(video_sha256: str, model_path: Path, conf: float, imgsz: int, fps: int,
+                   frame_range: Optional[FrameRange] = None, output_options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        结果缓存键
+
+        Args:
+            video_sha256: 视频内容哈希
+            model_path: 模型文件路径（按内容哈希）
+            conf: 置信度阈值
+            imgsz: 图像尺寸
+            fps: 输出视频帧率
+            frame_range: 帧选择范围
+            output_options: 影响输出文件的其他选项（逐帧图片、视频编码等）
+        """
+        key_data = {
+            'version': RESULT_KEY_VERSION,
+            'video': video_sha256,
+            'model': file_sha256(model_path),
+            'conf': float(conf),
+            'imgsz': int(imgsz),
+            'fps': int(fps),
+            'frame_range': (frame_range or FrameRange()).to_dict(),
+            'tracker': file_sha256(DEEPSORT_CONFIG) if DEEPSORT_CONFIG.exists() else None,
+            'output': output_options or {},
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def lookup_result(self, key: str) -> Optional[str]:
+        """返回以相同参数处理过同一视频的任务 ID；该任务已被删除时清除索引并返回 None"""
+        index_path = self.index_dir / f"{key}.json"
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                task_id = json.load(f)['task_id']
+        except (OSError, ValueError, KeyError):
+            return None
+        if not (self.media_root / 'tasks' / task_id / MANIFEST_NAME).exists():
+            index_path.unlink(missing_ok=True)
+            return None
+        return task_id
+
+    def record_result(self, key: str, task_id: str):
+        """登记 key 对应的结果所在的任务"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        index_path = self.index_dir / f"{key}.json"
+        tmp_path = index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'task_id': task_id}, f)
+        os.replace(tmp_path, index_path)
+
+    def materialize_result(self, source_task_id: str, task_id: str, video_path: str) -> Dict[str, Any]:
+        """
+        把 source_task_id 的结果放入 task_id 的任务目录（文件为硬链接），并写出新任务的 manifest
+
+        Returns:
+            新任务的 manifest
+        """
+        tasks_dir = self.media_root / 'tasks'
+        source_dir, task_dir = tasks_dir / source_task_id, tasks_dir / task_id
+        with open(source_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if source_task_id == task_id:
+            return manifest
+
+        for dirname in SHARED_DIRNAMES:
+            if (task_dir / dirname).exists():
+                shutil.rmtree(task_dir / dirname)
+            for src in (source_dir / dirname).rglob('*'):
+                dst = task_dir / dirname / src.relative_to(source_dir / dirname)
+                if src.is_dir():
+                    dst.mkdir(parents=True, exist_ok=True)
+                else:
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    _link_or_copy(src, dst)
+
+        # 路径和 URL 指向新任务（与 VideoProcessor._generate_json_result 的格式一致）
+        annotated_video_url = f"/api/video/{task_id}"
+        manifest['annotated_video_path'] = str(task_dir / 'output' / 'tracking_result.mp4')
+        manifest['annotated_video_url'] = annotated_video_url
+        manifest['video_renditions'] = {name: f"{annotated_video_url}?rendition={name}"
+                                        for name in (manifest.get('video_renditions') or {})}
+        manifest['task_id'] = task_id
+        manifest['original_video_path'] = video_path
+        manifest['created_at'] = datetime.now().isoformat()
+        manifest['cached_from'] = source_task_id
+        write_manifest(task_dir, manifest)
+        return manifest
+
+
+def unshare_outputs(task_dir: Path):
+    """
+    删除任务结果目录中与其他任务共享（硬链接数 > 1）的文件
+
+    结果写出时以截断方式打开已有文件，若不先断开链接会改写共享该文件的其他任务的结果。
+    """
+    for dirname in SHARED_DIRNAMES:
+        root = Path(task_dir) / dirname
+        if not root.exists():
+            continue
+        for path in root.rglob('*'):
+            if path.is_file() and path.stat().st_nlink > 1:
+                path.unlink()
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 """
-增强版后处理脚本：重新运行推理，按 track_id 着色掩模 + 生成 PNG + 视频 + TXT 追踪结果
+增强版后处理脚本：重新运行推理，按 track_id 着色掩模 + 生成逐帧图片(可选) + 视频 + TXT 追踪结果
 适配旧版 ultralytics v8.0.3 API
+
+既可作为脚本对图像目录运行，也可在进程内直接调用 run_tracking_on_video，
+由 cv2.VideoCapture 解码的帧以内存数组形式直接送入 YOLO / DeepSORT / 绘制流程。
+解码、推理、追踪、绘制分阶段以有界队列并行执行（见 pipeline.py）。
 """
 
 import cv2
+import itertools
 import os
 import sys
 import numpy as np
@@ -12,12 +17,15 @@ import torch
 from pathlib import Path
 from tqdm import tqdm
 from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 # 添加路径
 # 从 services 目录到 web 目录需要 4 个 parent
 WEB_ROOT = Path(__file__).parent.parent.parent.parent
-ULTRALYTICS_DIR = WEB_ROOT / "libs" / "ultralytics"
+LIBS_DIR = WEB_ROOT / "libs"
+ULTRALYTICS_DIR = LIBS_DIR / "ultralytics"
 sys.path.insert(0, str(ULTRALYTICS_DIR))
+sys.path.insert(0, str(LIBS_DIR))
 
 # DeepSORT
 SEGMENT_DIR = ULTRALYTICS_DIR / "yolo" / "v8" / "segment"
@@ -27,9 +35,17 @@ from deep_sort_pytorch.deep_sort import DeepSort
 
 from ultralytics import YOLO
 
+if __package__:
+    from .frame_reader import FrameRange, read_video_frames
+    from .pipeline import FramePipeline
+    from .writers import AsyncFrameWriter, FrameOutputPolicy, IncrementalVideoWriter, VideoEncoding
+else:  # 作为脚本运行时 services 目录位于 sys.path[0]
+    from frame_reader import FrameRange, read_video_frames
+    from pipeline import FramePipeline
+    from writers import AsyncFrameWriter, FrameOutputPolicy, IncrementalVideoWriter, VideoEncoding
+
 # 颜色生成
 palette = (2 ** 11 - 1, 2 ** 15 - 1, 2 ** 20 - 1)
-data_deque = {}
 
 
 def compute_color_for_id(track_id):
@@ -38,8 +54,13 @@ def compute_color_for_id(track_id):
     return tuple(color)
 
 
-def init_deepsort():
-    """初始化 DeepSORT"""
+def init_deepsort(extractor=None):
+    """
+    初始化 DeepSORT（每次都重新读取 deep_sort.yaml）
+
+    Args:
+        extractor: 可选，已加载的 ReID 特征提取器，传入时不再重复加载权重
+    """
     cfg_deep = get_config()
     cfg_deep.merge_from_file(str(SEGMENT_DIR / "deep_sort_pytorch/configs/deep_sort.yaml"))
 
@@ -59,7 +80,8 @@ def init_deepsort():
         n_init=cfg_deep.DEEPSORT.N_INIT,
         nn_budget=cfg_deep.DEEPSORT.NN_BUDGET,
         use_cuda=True,
-        use_reid=getattr(cfg_deep.DEEPSORT, "USE_REID", True)
+        use_reid=getattr(cfg_deep.DEEPSORT, "USE_REID", True),
+        extractor=extractor
     )
 
 
@@ -86,11 +108,18 @@ def box_iou(box1, box2):
 
 
 def draw_mask_by_trackid(img, mask, track_id, alpha=0.5):
-    """用 track_id 的颜色绘制掩模"""
+    """
+    用 track_id 的颜色绘制掩模
+
+    Returns:
+        掩模在原图尺寸下的面积（像素数）
+    """
     color = compute_color_for_id(track_id)
     H, W = img.shape[:2]
 
-    if hasattr(mask, 'cpu'):
+    if isinstance(mask, np.ndarray):
+        mask_np = mask
+    elif hasattr(mask, 'cpu'):
         mask_np = mask.cpu().numpy()
     elif hasattr(mask, 'data'):
         mask_np = mask.data.cpu().numpy()
@@ -108,6 +137,7 @@ def draw_mask_by_trackid(img, mask, track_id, alpha=0.5):
     overlay = img.copy()
     overlay[binary] = color
     cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
+    return int(np.count_nonzero(binary))
 
 
 def draw_box_and_label(img, box, track_id, line_thickness=2):
@@ -125,19 +155,176 @@ def draw_box_and_label(img, box, track_id, line_thickness=2):
     cv2.putText(img, label, (x1 + 2, y1 - 4), 0, tl / 3, [255, 255, 255], thickness=tf, lineType=cv2.LINE_AA)
 
 
-def draw_trajectory(img, track_id, center):
-    """绘制轨迹"""
-    if track_id not in data_deque:
-        data_deque[track_id] = deque(maxlen=64)
+def draw_trajectory(img, track_id, center, trajectories):
+    """绘制轨迹（trajectories 为本次运行独立的 {track_id: deque}，避免并发任务互相干扰）"""
+    if track_id not in trajectories:
+        trajectories[track_id] = deque(maxlen=64)
 
-    data_deque[track_id].appendleft(center)
+    trajectories[track_id].appendleft(center)
     color = compute_color_for_id(track_id)
 
-    for j in range(1, len(data_deque[track_id])):
-        if data_deque[track_id][j - 1] is None or data_deque[track_id][j] is None:
+    for j in range(1, len(trajectories[track_id])):
+        if trajectories[track_id][j - 1] is None or trajectories[track_id][j] is None:
             continue
         thickness = int(np.sqrt(64 / float(j + 1)) * 1.5)
-        cv2.line(img, data_deque[track_id][j - 1], data_deque[track_id][j], color, max(thickness, 1))
+        cv2.line(img, trajectories[track_id][j - 1], trajectories[track_id][j], color, max(thickness, 1))
+
+
+def iter_image_files(image_files, frame_range: Optional[FrameRange] = None
+                     ) -> Iterator[Tuple[int, str, Optional[np.ndarray]]]:
+    """
+    逐张读取图像文件，产出 (原视频帧序号, 帧名, BGR 图像)；读取失败时图像为 None
+
+    Args:
+        image_files: 按帧顺序排列的图像文件
+        frame_range: 这些图像从原视频中抽取时使用的帧范围，用于还原原视频帧序号
+    """
+    frame_range = frame_range or FrameRange()
+    for i, img_file in enumerate(image_files):
+        img = cv2.imread(str(img_file))
+        if img is None:
+            print(f"无法读取: {img_file}")
+        yield frame_range.frame_number(i), img_file.stem, img
+
+
+def iter_video_frames(
+    video_path: str,
+    frames_dir: Optional[Path] = None,
+    frame_range: Optional[FrameRange] = None
+) -> Iterator[Tuple[int, str, np.ndarray]]:
+    """
+    用 cv2.VideoCapture 解码视频，产出 (原视频帧序号, 帧名, BGR 图像)
+
+    Args:
+        video_path: 视频文件路径
+        frames_dir: 调试用，若指定则同时把原始帧保存为 tNNNN.png
+        frame_range: 帧选择范围（起始帧 / 结束帧 / 帧间隔），为空时逐帧处理整个视频
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+
+    if frames_dir is not None:
+        frames_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        for index, frame in read_video_frames(cap, frame_range):
+            stem = f"t{index:04d}"
+            if frames_dir is not None:
+                cv2.imwrite(str(frames_dir / f"{stem}.png"), frame)
+
+            yield index, stem, frame
+    finally:
+        cap.release()
+
+
+def get_video_info(video_path: str) -> Tuple[int, float]:
+    """读取视频的 (帧数, 帧率)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"无法打开视频文件: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return total_frames, video_fps
+
+
+def print_progress(current: int, total: int):
+    """以 PROGRESS 行输出进度（用于 video_processor 以子进程方式运行时解析）"""
+    progress_pct = int((current - 1) / total * 100) if total > 0 else 0
+    print(f"PROGRESS: {current}/{total}|{progress_pct}", flush=True)
+
+
+def detect_in_batches(
+    predictor,
+    source_frames: Iterable[Tuple[int, str, Optional[np.ndarray]]],
+    batch: int = 1
+) -> Iterator[Tuple[int, str, Optional[np.ndarray], Optional[torch.Tensor], Optional[torch.Tensor]]]:
+    """
+    每 batch 帧做一次前向推理，按原始帧顺序逐帧产出 (原视频帧序号, 帧名, 图像, det, masks)
+
+    det 为 [N, 6] (x1, y1, x2, y2, conf, cls)，masks 与 det 逐行对应；无检测时均为 None。
+    """
+    def flush(chunk):
+        images = [img for _, _, img in chunk if img is not None]
+        preds = predictor.predict_frames(images) if images else ([], [])
+        dets, masks = preds if isinstance(preds, tuple) else (preds, [None] * len(preds))
+
+        i = 0
+        for index, stem, img in chunk:
+            if img is None:
+                yield index, stem, img, None, None
+                continue
+            det, mask = dets[i], masks[i]
+            i += 1
+            if det is None or len(det) == 0:
+                yield index, stem, img, None, None
+                continue
+            # 与旧版 predict 输出保持相同的检测顺序（逆序），追踪结果不变；掩模同步翻转以保持对应
+            yield index, stem, img, det[:, :6].flip(0), mask.flip(0) if mask is not None else None
+
+    chunk = []
+    for item in source_frames:
+        chunk.append(item)
+        if len(chunk) >= max(1, batch):
+            yield from flush(chunk)
+            chunk = []
+    if chunk:
+        yield from flush(chunk)
+
+
+def update_tracks(deepsort, det: torch.Tensor, masks: Optional[torch.Tensor], img: np.ndarray) -> List[tuple]:
+    """
+    用一帧的检测结果更新 DeepSORT，并为每条输出轨迹匹配掩模
+
+    Args:
+        deepsort: DeepSORT 追踪器
+        det: [N, 6] 检测结果 (x1, y1, x2, y2, conf, cls)
+        masks: 与 det 逐行对应的掩模，可为 None
+        img: 原始 BGR 图像
+
+    Returns:
+        [(track_box, 原始 track_id, class_id, mask 或 None), ...]
+    """
+    # 提取检测信息
+    det_boxes = det[:, :4].cpu().numpy()
+    det_confs = det[:, 4].cpu().numpy()
+    det_cls = det[:, 5].cpu().numpy()
+
+    # 准备 DeepSORT 输入
+    xywh_bboxs = []
+    confs = []
+    oids = []
+
+    for i in range(len(det_boxes)):
+        x1, y1, x2, y2 = det_boxes[i]
+        cx, cy, w, h = xyxy_to_xywh(x1, y1, x2, y2)
+        xywh_bboxs.append([cx, cy, w, h])
+        confs.append([det_confs[i]])
+        oids.append(int(det_cls[i]))
+
+    xywhs = torch.Tensor(xywh_bboxs)
+    confss = torch.Tensor(confs)
+
+    # DeepSORT 更新
+    outputs = deepsort.update(xywhs, confss, oids, img)
+
+    tracks = []
+    for output in outputs:
+        track_box = output[:4]
+
+        # 找到对应的掩模
+        best_iou = 0
+        best_idx = -1
+        for di, det_box in enumerate(det_boxes):
+            iou = box_iou(track_box, det_box)
+            if iou > best_iou:
+                best_iou = iou
+                best_idx = di
+
+        mask = masks[best_idx] if best_idx >= 0 and best_iou > 0.3 and masks is not None else None
+        tracks.append((track_box, int(output[-2]), int(output[-1]), mask))
+    return tracks
 
 
 def run_tracking_with_colored_masks(
@@ -146,20 +333,18 @@ def run_tracking_with_colored_masks(
     output_dir: str,
     conf: float = 0.25,
     imgsz: int = 1024,
-    fps: int = 10
+    fps: int = 10,
+    batch: int = 1,
+    frame_output: Optional[FrameOutputPolicy] = None,
+    frame_range: Optional[FrameRange] = None,
+    video_encoding: Optional[VideoEncoding] = None
 ):
     """
     运行跟踪并按 track_id 着色掩模，同时输出 TXT 追踪结果
-    """
-    print(f"加载模型: {model_path}")
-    model = YOLO(model_path)
-
-    print(f"初始化 DeepSORT...")
-    deepsort = init_deepsort()
 
+    frame_range 描述图像目录是如何从原视频抽帧得到的，MOT 结果中的帧号按它还原为原视频帧号。
+    """
     source_path = Path(source_dir)
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
 
     # 获取所有图像
     image_files = sorted(source_path.glob("*.tif")) + sorted(source_path.glob("*.png")) + sorted(source_path.glob("*.jpg"))
@@ -169,93 +354,291 @@ def run_tracking_with_colored_masks(
 
     print(f"找到 {len(image_files)} 张图像")
 
-    frames = []
-    # ========== TXT 输出相关 ==========
-    all_tracking_results = []   # MOT 汇总
-    per_frame_results = {}      # 每帧 label
+    print(f"加载模型: {model_path}")
+    model = YOLO(model_path)
 
-    # ========== Track ID 重映射: 按首次出现顺序从 1 连续编号 ==========
-    id_remap = {}               # {原始 track_id: 新连续 id}
-    next_remap_id = 1
+    output_path, _ = track_frames(
+        model,
+        iter_image_files(image_files, frame_range),
+        output_dir,
+        total_frames=len(image_files),
+        conf=conf,
+        imgsz=imgsz,
+        fps=fps,
+        batch=batch,
+        progress_callback=print_progress,
+        frame_output=frame_output,
+        video_encoding=video_encoding
+    )
+    return output_path
 
-    for frame_idx, img_file in enumerate(tqdm(image_files, desc="处理图像"), start=1):
-        # 输出进度信息（用于 video_processor 解析）
-        progress_pct = int((frame_idx - 1) / len(image_files) * 100)
-        print(f"PROGRESS: {frame_idx}/{len(image_files)}|{progress_pct}", flush=True)
 
-        # 读取原图
-        img = cv2.imread(str(img_file))
-        if img is None:
-            print(f"无法读取: {img_file}")
-            continue
+def run_tracking_on_video(
+    model,
+    video_path: str,
+    output_dir: str,
+    conf: float = 0.25,
+    imgsz: int = 1024,
+    fps: int = 10,
+    batch: int = 1,
+    frames_dir: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    deepsort=None,
+    frame_output: Optional[FrameOutputPolicy] = None,
+    frame_range: Optional[FrameRange] = None,
+    detection_cache=None,
+    video_encoding: Optional[VideoEncoding] = None,
+    checkpoint=None
+) -> Tuple[Path, int]:
+    """
+    流式处理视频：解码帧直接以内存数组送入推理与追踪，不经过 PNG 中转
+
+    Args:
+        model: 模型路径或已加载的 YOLO 对象
+        video_path: 视频文件路径
+        output_dir: 输出目录
+        conf: 置信度阈值
+        imgsz: 图像尺寸
+        fps: 输出视频帧率
+        batch: 每次前向推理的帧数
+        frames_dir: 调试用，若指定则同时保存原始帧 PNG
+        progress_callback: 进度回调函数 (current_frame, total_frames)
+        deepsort: 可选，已初始化的 DeepSORT（由常驻工作线程提供），为空时新建
+        frame_output: 逐帧标注图片的输出策略，默认每帧保存 PNG
+        frame_range: 帧选择范围（起始帧 / 结束帧 / 帧间隔），为空时逐帧处理整个视频
+        detection_cache: 可选，DetectionCache；缓存已存在时回放检测结果跳过推理（model 可为 None），否则记录本次检测结果
+        video_encoding: 标注视频的编码配置，默认自动选择后端、不生成预览版本
+        checkpoint: 可选，TrackingCheckpoint；存在有效检查点时从中断处继续，处理中按间隔保存检查点
+
+    Returns:
+        (输出目录, 实际处理的帧数)
+    """
+    cached = detection_cache is not None and detection_cache.exists()
+    if not cached and not isinstance(model, YOLO):
+        print(f"加载模型: {model}")
+        model = YOLO(model)
+
+    frame_range = frame_range or FrameRange()
+    total_frames, _ = get_video_info(video_path)
+    selected_frames = frame_range.count(total_frames)
+
+    resume = checkpoint.load() if checkpoint is not None else None
+    source_range = frame_range
+    if resume is not None:
+        print(f"从检查点恢复: 已处理 {resume['frame_idx']}/{selected_frames} 帧")
+        # 检测结果缓存只能由完整的一次推理写出，恢复的运行不记录
+        if not cached:
+            detection_cache = None
+    if resume is None:
+        source_frames = iter_video_frames(video_path, Path(frames_dir) if frames_dir else None, frame_range)
+    elif resume['frame_idx'] < selected_frames:
+        source_range = FrameRange(frame_range.frame_number(resume['frame_idx']), frame_range.end_frame,
+                                  frame_range.stride)
+        source_frames = iter_video_frames(video_path, Path(frames_dir) if frames_dir else None, source_range)
+    else:
+        source_frames = iter(())
+
+    return track_frames(
+        model,
+        source_frames,
+        output_dir,
+        total_frames=selected_frames,
+        conf=conf,
+        imgsz=imgsz,
+        fps=fps,
+        batch=batch,
+        progress_callback=progress_callback,
+        deepsort=deepsort,
+        frame_output=frame_output,
+        detection_cache=detection_cache,
+        video_encoding=video_encoding,
+        checkpoint=checkpoint,
+        resume=resume
+    )
 
-        im0 = img.copy()
-        img_h, img_w = im0.shape[:2]
 
-        # YOLO 推理
-        results = model.predict(source=str(img_file), conf=conf, imgsz=imgsz, verbose=False)
+def track_frames(
+    model,
+    source_frames: Iterable[Tuple[int, str, Optional[np.ndarray]]],
+    output_dir: str,
+    total_frames: int,
+    conf: float = 0.25,
+    imgsz: int = 1024,
+    fps: int = 10,
+    batch: int = 1,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    deepsort=None,
+    queue_size: int = 8,
+    frame_output: Optional[FrameOutputPolicy] = None,
+    replay_tracks: Optional[Dict[int, List[tuple]]] = None,
+    detection_cache=None,
+    video_encoding: Optional[VideoEncoding] = None,
+    checkpoint=None,
+    resume: Optional[dict] = None
+) -> Tuple[Path, int]:
+    """
+    对帧序列执行推理 + DeepSORT 追踪 + 绘制，并写出逐帧图片 / 视频 / TXT 结果
+
+    Args:
+        model: 已加载的 YOLO 对象
+        source_frames: 产出 (原视频帧序号, 帧名, BGR 图像) 的可迭代对象，图像为 None 表示该帧读取失败；
+            MOT 结果中的帧号为原视频帧序号 + 1
+        output_dir: 输出目录
+        total_frames: 预计总帧数（仅用于进度显示）
+        conf: 置信度阈值
+        imgsz: 图像尺寸
+        fps: 输出视频帧率
+        batch: 每次前向推理的帧数（追踪仍按帧顺序逐帧进行）
+        progress_callback: 进度回调函数 (current_frame, total_frames)
+        deepsort: 可选，已初始化的 DeepSORT，为空时新建
+        queue_size: 流水线各阶段之间队列的最大帧数（限制内存占用）
+        frame_output: 逐帧标注图片的输出策略，默认每帧保存 PNG
+        replay_tracks: 可选，{原视频帧序号: [(track_box, 原始 track_id, class_id, PackedMask 或 None), ...]}；
+            给定时不再推理和追踪，直接按这些轨迹（如分块并行追踪拼接后的结果）生成输出，model 可为 None
+        detection_cache: 可选，DetectionCache；缓存已存在时只回放检测结果重新追踪（model 可为 None），
+            否则在推理的同时记录检测结果，完整跑完后写出缓存
+        video_encoding: 标注视频的编码配置（后端 / CRF / 预设 / 预览版本），默认自动选择后端
+        checkpoint: 可选，TrackingCheckpoint；每处理 checkpoint.interval 帧保存一次检查点，全部输出写完后清除
+            （不能与 replay_tracks 同时使用）
+        resume: 可选，checkpoint.load() 返回的状态；source_frames 应从该状态之后的下一帧开始
+
+    Returns:
+        (输出目录, 实际处理的帧数)
+    """
+    if deepsort is None and replay_tracks is None:
+        print(f"初始化 DeepSORT...")
+        deepsort = init_deepsort()
 
-        if len(results) == 0:
-            save_path = output_path / f"{img_file.stem}.png"
-            cv2.imwrite(str(save_path), im0)
-            frames.append(im0.copy())
-            per_frame_results[img_file.stem] = []
-            continue
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
 
-        result = results[0]
+    # 标注帧逐帧写入视频，不在内存中累积
+    video_path = output_path / "tracking_result.mp4"
+    # 启用检查点时视频按检查点分段编码，恢复后接着写下一段，完成时拼接
+    video_writer = IncrementalVideoWriter(
+        video_path, fps, encoding=video_encoding,
+        segment_dir=checkpoint.video_dir if checkpoint is not None else None,
+        resume_state=resume['video'] if resume is not None else None
+    )
+    # 逐帧标注图片按输出策略交给后台线程池写盘
+    if frame_output is None:
+        frame_output = FrameOutputPolicy()
+    frame_writer = AsyncFrameWriter(output_path, frame_output)
+    # ========== TXT 输出相关 ==========
+    all_tracking_results = []   # MOT 汇总
+    mask_areas = []             # 与 MOT 汇总逐行对应的掩模面积（像素），无掩模为 NaN，由绘制阶段填入
+    per_frame_results = {}      # 每帧 label
 
-        # 检查结果格式
-        if isinstance(result, (list, tuple)) and len(result) >= 2:
-            det = result[0]
-            masks = result[1]
-        elif hasattr(result, 'boxes'):
-            det = torch.cat([result.boxes.xyxy, result.boxes.conf.unsqueeze(1), result.boxes.cls.unsqueeze(1)], dim=1)
-            masks = result.masks.data if result.masks is not None else None
+    # ========== Track ID 重映射: 按首次出现顺序从 1 连续编号 ==========
+    id_remap = {}               # {原始 track_id: 新连续 id}
+    next_remap_id = 1
+    trajectories = {}           # {track_id: deque}，本次运行独立
+
+    # ========== 从检查点恢复 ==========
+    frame_idx = 0
+    if resume is not None:
+        frame_idx = resume['frame_idx']
+        all_tracking_results, mask_areas, per_frame_results = checkpoint.load_rows(resume)
+        id_remap = resume['id_remap']
+        next_remap_id = resume['next_remap_id']
+        trajectories = resume['trajectories']
+        deepsort.tracker = resume['tracker']
+        frame_writer.saved_count = resume['saved_frames']
+    saved_rows = len(all_tracking_results)      # 已写入检查点的 MOT 行数
+    saved_labels = len(per_frame_results)       # 已写入检查点的帧 label 数
+    saved_parts = resume['parts'] if resume is not None else 0
+
+    if replay_tracks is not None:
+        detect_stage = 'replay'
+        detect = lambda src: ((index, stem, img, None, None) for index, stem, img in src)
+    elif detection_cache is not None and detection_cache.exists():
+        # 推理参数与视频均未变化：回放缓存的检测结果，只重新运行 DeepSORT
+        print(f"使用检测结果缓存: {detection_cache.path}")
+        detect_stage = 'cache'
+        detect = detection_cache.replay
+    else:
+        # 复用 YOLO 对象上常驻的预测器，常驻工作池中跨任务只包装 / 预热一次模型
+        predictor = model.stream(conf=conf, imgsz=imgsz)
+        detect_stage = 'infer'
+        if detection_cache is not None:
+            detect = lambda src: detection_cache.record(detect_in_batches(predictor, src, batch=batch))
         else:
-            save_path = output_path / f"{img_file.stem}.png"
-            cv2.imwrite(str(save_path), im0)
-            frames.append(im0.copy())
-            per_frame_results[img_file.stem] = []
-            continue
-
-        if det is None or len(det) == 0:
-            save_path = output_path / f"{img_file.stem}.png"
-            cv2.imwrite(str(save_path), im0)
-            frames.append(im0.copy())
-            per_frame_results[img_file.stem] = []
-            continue
-
-        # 提取检测信息
-        det_boxes = det[:, :4].cpu().numpy()
-        det_confs = det[:, 4].cpu().numpy()
-        det_cls = det[:, 5].cpu().numpy()
-
-        # 准备 DeepSORT 输入
-        xywh_bboxs = []
-        confs = []
-        oids = []
-
-        for i in range(len(det_boxes)):
-            x1, y1, x2, y2 = det_boxes[i]
-            cx, cy, w, h = xyxy_to_xywh(x1, y1, x2, y2)
-            xywh_bboxs.append([cx, cy, w, h])
-            confs.append([det_confs[i]])
-            oids.append(int(det_cls[i]))
-
-        xywhs = torch.Tensor(xywh_bboxs)
-        confss = torch.Tensor(confs)
-
-        # DeepSORT 更新
-        outputs = deepsort.update(xywhs, confss, oids, im0)
-
-        frame_labels = []
-
-        if len(outputs) > 0:
-            for output in outputs:
-                track_box = output[:4]
-                track_id_raw = int(output[-2])
-                class_id = int(output[-1])
+            detect = lambda src: detect_in_batches(predictor, src, batch=batch)
 
+    def render(job):
+        """绘制阶段：按追踪结果绘制掩模 / 框 / 轨迹，写入视频并提交逐帧图片"""
+        frame_idx, stem, img, draws = job
+        im0 = img.copy()
+        for track_box, track_id, mask, row in draws:
+            if mask is not None:
+                mask_areas[row] = draw_mask_by_trackid(im0, mask, track_id, alpha=0.5)
+
+            draw_box_and_label(im0, track_box, track_id)
+
+            center = (int((track_box[0] + track_box[2]) / 2), int((track_box[1] + track_box[3]) / 2))
+            draw_trajectory(im0, track_id, center, trajectories)
+
+        video_writer.write(im0)
+        frame_writer.submit(frame_idx, stem, im0)
+
+    def save_checkpoint(frame_idx: int):
+        """保存处理完第 frame_idx 帧后的检查点（在追踪线程中调用）"""
+        nonlocal saved_rows, saved_labels, saved_parts
+        # 先等绘制与写盘追上追踪进度，保存的状态与已写出的视频分段、图片一致
+        renderer.drain()
+        frame_writer.flush()
+        state = {
+            'frame_idx': frame_idx,
+            'parts': saved_parts,
+            'tracker': deepsort.tracker,
+            'id_remap': id_remap,
+            'next_remap_id': next_remap_id,
+            'trajectories': trajectories,
+            'saved_frames': frame_writer.saved_count,
+            'video': video_writer.checkpoint(),
+        }
+        checkpoint.save(
+            state,
+            all_tracking_results[saved_rows:],
+            mask_areas[saved_rows:],
+            dict(itertools.islice(per_frame_results.items(), saved_labels, None))
+        )
+        saved_rows = len(all_tracking_results)
+        saved_labels = len(per_frame_results)
+        saved_parts = state['parts']
+
+    # 解码 -> 推理 -> 追踪 -> 绘制 四个阶段以有界队列串联，追踪阶段在当前线程按帧顺序执行
+    with video_writer, frame_writer, FramePipeline(queue_size=queue_size) as pipeline:
+        decoded = pipeline.stage('decode', lambda: source_frames)
+        detections = pipeline.stage(detect_stage, detect, upstream=decoded)
+        renderer = pipeline.sink('render', render)
+        tracked = pipeline.timed('track', detections, downstream=renderer)
+
+        progress = tqdm(tracked, total=total_frames, initial=frame_idx, desc="处理图像")
+        for frame_idx, (frame_index, stem, img, det, masks) in enumerate(progress, start=frame_idx + 1):
+            # 输出进度信息
+            if progress_callback:
+                progress_callback(frame_idx, total_frames)
+
+            if img is None:
+                if checkpoint is not None and checkpoint.due(frame_idx):
+                    save_checkpoint(frame_idx)
+                continue
+
+            img_h, img_w = img.shape[:2]
+
+            if replay_tracks is not None:
+                tracks = [(box, tid, cls, mask.unpack() if mask is not None else None)
+                          for box, tid, cls, mask in replay_tracks.get(frame_index, [])]
+            elif det is None:
+                tracks = []
+            else:
+                tracks = update_tracks(deepsort, det, masks, img)
+
+            frame_labels = []
+            draws = []                  # 交给绘制阶段: (track_box, track_id, mask, MOT 行号)
+
+            for track_box, track_id_raw, class_id, mask in tracks:
                 # --- ID 重映射 ---
                 if track_id_raw not in id_remap:
                     id_remap[track_id_raw] = next_remap_id
@@ -268,13 +651,14 @@ def run_tracking_with_colored_masks(
                 bb_w = float(tx2 - tx1)
                 bb_h = float(ty2 - ty1)
 
-                # --- MOT 格式: frame, id, bb_left, bb_top, bb_width, bb_height, conf, class, visibility ---
+                # --- MOT 格式（帧号为原视频帧号）: frame, id, bb_left, bb_top, bb_width, bb_height, conf, class, visibility ---
                 all_tracking_results.append([
-                    frame_idx, track_id,
+                    frame_index + 1, track_id,
                     round(bb_left, 2), round(bb_top, 2),
                     round(bb_w, 2), round(bb_h, 2),
                     1.0, class_id, 1
                 ])
+                mask_areas.append(float('nan'))
 
                 # --- 每帧 label 格式 (归一化坐标): track_id class_id xc yc w h ---
                 xc_norm = round((bb_left + bb_w / 2) / img_w, 6)
@@ -283,31 +667,20 @@ def run_tracking_with_colored_masks(
                 h_norm = round(bb_h / img_h, 6)
                 frame_labels.append([track_id, class_id, xc_norm, yc_norm, w_norm, h_norm])
 
-                # 找到对应的掩模
-                best_iou = 0
-                best_idx = -1
-                for di, det_box in enumerate(det_boxes):
-                    iou = box_iou(track_box, det_box)
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_idx = di
-
-                if best_idx >= 0 and best_iou > 0.3 and masks is not None:
-                    draw_mask_by_trackid(im0, masks[best_idx], track_id, alpha=0.5)
+                draws.append((track_box, track_id, mask, len(all_tracking_results) - 1))
 
-                draw_box_and_label(im0, track_box, track_id)
+            per_frame_results[stem] = frame_labels
+            renderer.put((frame_idx, stem, img, draws))
 
-                center = (int((track_box[0] + track_box[2]) / 2), int((track_box[1] + track_box[3]) / 2))
-                draw_trajectory(im0, track_id, center)
+            if checkpoint is not None and checkpoint.due(frame_idx):
+                save_checkpoint(frame_idx)
 
-        per_frame_results[img_file.stem] = frame_labels
+        renderer.close()
 
-        # 保存 PNG
-        save_path = output_path / f"{img_file.stem}.png"
-        cv2.imwrite(str(save_path), im0)
-        frames.append(im0.copy())
-
-    print(f"\nPNG 图像已保存到: {output_path}")
+    print("\n流水线各阶段吞吐:")
+    print(pipeline.summary())
+    if frame_output.enabled:
+        print(f"\n逐帧图像已保存到: {output_path}  (共 {frame_writer.saved_count} 张, {frame_output})")
 
     # ========== 保存 TXT 追踪结果 ==========
 
@@ -319,6 +692,9 @@ def run_tracking_with_colored_masks(
             f.write(','.join(map(str, row)) + '\n')
     print(f"MOT 格式追踪结果已保存到: {mot_path}  (共 {len(all_tracking_results)} 条记录)")
 
+    # 与 MOT 逐行对应的掩模面积，供后处理计算细胞面积
+    np.save(output_path / "tracking_mask_areas.npy", np.asarray(mask_areas, dtype=np.float32))
+
     # 2. 每帧单独的 label 文件: track_id class_id x_center y_center width height (归一化坐标)
     labels_dir = output_path / "labels"
     labels_dir.mkdir(parents=True, exist_ok=True)
@@ -332,9 +708,19 @@ def run_tracking_with_colored_masks(
     # 3. 轨迹统计摘要
     if all_tracking_results:
         summary_path = output_path / "tracking_summary.txt"
-        track_ids = set(row[1] for row in all_tracking_results)
+        # 一次遍历统计每条轨迹的 [出现帧数, 首次出现帧, 最后出现帧]
+        track_stats = {}
+        for row in all_tracking_results:
+            stats = track_stats.get(row[1])
+            if stats is None:
+                track_stats[row[1]] = [1, row[0], row[0]]
+            else:
+                stats[0] += 1
+                stats[1] = min(stats[1], row[0])
+                stats[2] = max(stats[2], row[0])
+        track_ids = track_stats.keys()
         with open(summary_path, 'w') as f:
-            f.write(f"总帧数: {len(image_files)}\n")
+            f.write(f"总帧数: {frame_idx}\n")
             f.write(f"总检测记录数: {len(all_tracking_results)}\n")
             f.write(f"唯一轨迹数 (unique track IDs): {len(track_ids)}\n")
             f.write(f"Track ID 范围: {min(track_ids)} ~ {max(track_ids)}\n")
@@ -342,26 +728,20 @@ def run_tracking_with_colored_masks(
             f.write("track_id | 出现帧数 | 首次出现帧 | 最后出现帧\n")
             f.write("-" * 50 + "\n")
             for tid in sorted(track_ids):
-                tid_rows = [r for r in all_tracking_results if r[1] == tid]
-                frames_appeared = [r[0] for r in tid_rows]
-                f.write(f"  {tid:5d}  |  {len(tid_rows):5d}   |    {min(frames_appeared):5d}    |    {max(frames_appeared):5d}\n")
+                count, first_frame, last_frame = track_stats[tid]
+                f.write(f"  {tid:5d}  |  {count:5d}   |    {first_frame:5d}    |    {last_frame:5d}\n")
         print(f"轨迹统计摘要已保存到: {summary_path}")
 
     # ========== 生成视频 ==========
-    if len(frames) > 1:
-        video_path = output_path / "tracking_result.mp4"
-        h, w = frames[0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(str(video_path), fourcc, fps, (w, h))
-        for frame in frames:
-            writer.write(frame)
-        writer.release()
-        print(f"视频已保存到: {video_path}")
-
-    # 清理轨迹数据
-    data_deque.clear()
+    if video_writer.frame_count > 1:
+        print(f"视频已保存到: {video_path}  (编码后端: {video_writer.backend})")
+        for preview_path in video_writer.preview_paths:
+            print(f"预览版本已保存到: {preview_path}")
 
-    return output_path
+    if checkpoint is not None:
+        checkpoint.clear()
+
+    return output_path, frame_idx
 
 
 if __name__ == "__main__":
@@ -383,6 +763,26 @@ if __name__ == "__main__":
                         help="图像尺寸")
     parser.add_argument("--fps", type=int, default=10,
                         help="视频帧率")
+    parser.add_argument("--frame-output", type=str, default="png", choices=FrameOutputPolicy.FORMATS,
+                        help="逐帧标注图片格式 (none 表示不保存)")
+    parser.add_argument("--frame-quality", type=int, default=90,
+                        help="JPEG 质量 (1-100)")
+    parser.add_argument("--frame-every", type=int, default=1,
+                        help="每 N 帧保存一张标注图片")
+    parser.add_argument("--start-frame", type=int, default=0,
+                        help="输入图像在原视频中的起始帧（用于还原 MOT 帧号）")
+    parser.add_argument("--frame-stride", type=int, default=1,
+                        help="输入图像在原视频中的抽帧间隔（用于还原 MOT 帧号）")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="每次前向推理的帧数")
+    parser.add_argument("--video-encoder", type=str, default="auto", choices=VideoEncoding.BACKENDS,
+                        help="标注视频编码后端 (auto 依次尝试 ffmpeg / PyAV / cv2)")
+    parser.add_argument("--video-crf", type=int, default=23,
+                        help="H.264 CRF 质量参数 (0-51)")
+    parser.add_argument("--video-preset", type=str, default="veryfast", choices=VideoEncoding.PRESETS,
+                        help="x264 编码速度预设")
+    parser.add_argument("--video-previews", type=str, default="",
+                        help="额外生成的预览版本高度，逗号分隔，如 480,240")
 
     args = parser.parse_args()
 
@@ -392,5 +792,9 @@ if __name__ == "__main__":
         output_dir=args.output,
         conf=args.conf,
         imgsz=args.imgsz,
-        fps=args.fps
+        fps=args.fps,
+        batch=args.batch,
+        frame_output=FrameOutputPolicy(args.frame_output, args.frame_quality, args.frame_every),
+        frame_range=FrameRange(args.start_frame, stride=args.frame_stride),
+        video_encoding=VideoEncoding(args.video_encoder, args.video_crf, args.video_preset, args.video_previews)
     )
@@ -0,0 +1,179 @@
+"""
+检测结果缓存
+按 (视频内容哈希, 模型文件哈希, conf, imgsz, 帧选择范围) 缓存每帧的原始检测结果（框、置信度、类别、按位压缩的掩模），
+保存为任务目录下的紧凑二进制 .npz 文件。只修改 deep_sort.yaml 中的追踪参数重新运行任务时，
+直接回放缓存的检测结果给 DeepSORT，跳过整段 YOLO 推理。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .frame_reader import FrameRange
+from .mask_codec import PackedMask
+
+_hash_memo: Dict[Tuple[str, int, int], str] = {}
+_hash_memo_lock = threading.Lock()
+
+
+def file_sha256(path, chunk_size: int = 1 << 20) -> str:
+    """
+    计算文件内容的 SHA-256（按 路径 + 大小 + 修改时间 记忆，同一文件不重复计算）
+    """
+    path = Path(path)
+    st = path.stat()
+    memo_key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _hash_memo_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _hash_memo_lock:
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def remember_file_sha256(path, digest: str):
+    """登记已知的文件哈希（如上传时边写边算的结果），之后 file_sha256 不再重新读取文件"""
+    path = Path(path)
+    st = path.stat()
+    with _hash_memo_lock:
+        _hash_memo[(str(path.resolve()), st.st_size, st.st_mtime_ns)] = digest
+
+
+class _CachedMasks:
+    """一帧的缓存掩模，按下标访问时才解压（追踪只会用到与输出轨迹匹配的那部分掩模）"""
+
+    def __init__(self, packed: List[PackedMask]):
+        self.packed = packed
+
+    def __len__(self) -> int:
+        return len(self.packed)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        return self.packed[i].unpack()
+
+
+class DetectionCache:
+    """单个缓存文件：记录或回放一次运行中每帧的检测结果"""
+
+    VERSION = 1
+
+    def __init__(self, path: Path, key: str):
+        self.path = Path(path)
+        self.key = key
+
+    @classmethod
+    def for_video(cls, cache_dir: Path, video_path: str, model_path: str, conf: float, imgsz: int,
+                  frame_range: Optional[FrameRange] = None) -> 'DetectionCache':
+        """按视频内容、模型内容和推理参数确定缓存文件"""
+        key_data = {
+            'version': cls.VERSION,
+            'video': file_sha256(video_path),
+            'model': file_sha256(model_path),
+            'conf': float(conf),
+            'imgsz': int(imgsz),
+            'frame_range': (frame_range or FrameRange()).to_dict()
+        }
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+        return cls(Path(cache_dir) / f"detections_{key[:16]}.npz", key)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def record(self, detections: Iterable[tuple]) -> Iterator[tuple]:
+        """
+        透传 detect_in_batches 的输出并记录；完整迭代结束后才写出缓存文件（中途失败不会留下不完整的缓存）
+        """
+        frame_indices: List[int] = []
+        det_counts: List[int] = []
+        det_rows: List[np.ndarray] = []
+        masks: List[Optional[PackedMask]] = []
+        mask_shape = (0, 0)
+
+        for item in detections:
+            index, stem, img, det, frame_masks = item
+            if img is not None:
+                frame_indices.append(index)
+                n = 0 if det is None else len(det)
+                det_counts.append(n)
+                if n:
+                    det_rows.append(det.cpu().numpy().astype(np.float32))
+                    masks_np = frame_masks.cpu().numpy() if hasattr(frame_masks, 'cpu') else frame_masks
+                    for i in range(n):
+                        packed = PackedMask.pack(masks_np[i]) if masks_np is not None else None
+                        if packed is not None:
+                            mask_shape = packed.shape
+                        masks.append(packed)
+            yield item
+
+        self._save(frame_indices, det_counts, det_rows, masks, mask_shape)
+
+    def replay(self, source_frames: Iterable[Tuple[int, str, Optional[np.ndarray]]]) -> Iterator[tuple]:
+        """
+        用缓存的检测结果代替推理，产出与 detect_in_batches 相同格式的 (原视频帧序号, 帧名, 图像, det, masks)
+        """
+        import torch
+
+        data = np.load(self.path)
+        frame_indices = data['frame_indices']
+        det_offsets = data['det_offsets']
+        dets = data['dets']
+        has_mask = data['has_mask']
+        mask_boxes = data['mask_boxes']
+        bit_offsets = data['bit_offsets']
+        bits = data['mask_bits']
+        mask_shape = tuple(int(v) for v in data['mask_shape'])
+        rows_of = {int(index): (int(det_offsets[i]), int(det_offsets[i + 1])) for i, index in enumerate(frame_indices)}
+
+        for index, stem, img in source_frames:
+            start, end = rows_of.get(index, (0, 0))
+            if img is None or end == start:
+                yield index, stem, img, None, None
+                continue
+
+            det = torch.from_numpy(dets[start:end].copy())
+            frame_masks = None
+            if has_mask[start:end].all():
+                frame_masks = _CachedMasks([
+                    PackedMask(mask_shape, tuple(int(v) for v in mask_boxes[r]), bits[bit_offsets[r]:bit_offsets[r + 1]])
+                    for r in range(start, end)
+                ])
+            yield index, stem, img, det, frame_masks
+
+    def _save(self, frame_indices: List[int], det_counts: List[int], det_rows: List[np.ndarray],
+              masks: List[Optional[PackedMask]], mask_shape: Tuple[int, int]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        bit_lengths = [len(m.bits) if m is not None else 0 for m in masks]
+        arrays = {
+            'frame_indices': np.asarray(frame_indices, dtype=np.int64),
+            'det_offsets': np.concatenate([[0], np.cumsum(det_counts, dtype=np.int64)]).astype(np.int64),
+            'dets': np.concatenate(det_rows) if det_rows else np.zeros((0, 6), dtype=np.float32),
+            'has_mask': np.asarray([m is not None for m in masks], dtype=bool),
+            'mask_boxes': np.asarray([m.box if m is not None else (0, 0, 0, 0) for m in masks],
+                                     dtype=np.int32).reshape(-1, 4),
+            'bit_offsets': np.concatenate([[0], np.cumsum(bit_lengths, dtype=np.int64)]).astype(np.int64),
+            'mask_bits': np.concatenate([m.bits for m in masks if m is not None]) if any(bit_lengths)
+            else np.zeros(0, dtype=np.uint8),
+            'mask_shape': np.asarray(mask_shape, dtype=np.int32),
+        }
+
+        # 先写临时文件再原子替换，避免并发读取到写了一半的缓存
+        tmp_path = self.path.with_name(self.path.stem + '.tmp.npz')
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.path)
+        print(f"检测结果缓存已保存到: {self.path}  (共 {len(frame_indices)} 帧, {len(masks)} 个检测)")
@@ -0,0 +1,58 @@
+"""
+追踪数据流式导出
+按块从列式结果中读取行并逐块编码为 CSV 或 NDJSON（每行一个 JSON 对象），
+可选在生成过程中直接做 gzip 压缩；无论导出多少行，内存中只保留一个块。
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+from .result_store import ResultStore
+
+# 导出格式 -> (Content-Type, 文件扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'json': ('application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+
+def _chunk_columns(store: ResultStore, rows: np.ndarray, fields: List[str]) -> Iterator[tuple]:
+    return zip(*(store.field_values(name, rows) for name in fields))
+
+
+def iter_csv(store: ResultStore, row_chunks: Iterable[np.ndarray], fields: List[str]) -> Iterator[bytes]:
+    """产出 CSV 内容（第一块为表头）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode('utf-8')
+
+    for rows in row_chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_chunk_columns(store, rows, fields))
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(store: ResultStore, row_chunks: Iterable[np.ndarray], fields: List[str]) -> Iterator[bytes]:
+    """产出 NDJSON 内容，每行一条记录"""
+    for rows in row_chunks:
+        lines = [json.dumps(dict(zip(fields, values)), ensure_ascii=False)
+                 for values in _chunk_columns(store, rows, fields)]
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """对字节流逐块做 gzip 压缩"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
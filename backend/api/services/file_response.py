@@ -0,0 +1,138 @@
+"""
+支持断点 / 拖动播放的文件响应
+处理单段 HTTP Range 请求（206 Partial Content）和条件请求（ETag / Last-Modified → 304），
+<video> 拖动进度条时浏览器只请求需要的字节区间，重复播放时通过校验直接命中缓存。
+"""
+
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Range 响应每次读取的块大小
+CHUNK_SIZE = 256 * 1024
+
+
+def file_etag(path: Path) -> str:
+    """由文件大小和修改时间构成的 ETag（文件被重新生成时会变化）"""
+    st = path.stat()
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析单段 Range 请求头
+
+    Returns:
+        闭区间 (start, end)；多段或格式不支持时返回 None（按完整文件响应）
+
+    Raises:
+        ValueError: 区间无法满足（应返回 416）
+    """
+    match = _RANGE_RE.match(header.strip().replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # bytes=-N 表示最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def _iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = f.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _not_modified(request, etag: str, mtime: int) -> bool:
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and mtime <= since
+
+
+def _if_range_matches(request, etag: str, mtime: int) -> bool:
+    """If-Range 不匹配时（文件已变化）忽略 Range，返回完整文件"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and mtime <= since
+
+
+def ranged_file_response(request, path: Path, content_type: str, filename: str,
+                         as_attachment: bool = True) -> HttpResponse:
+    """
+    返回支持 Range 和条件请求的文件响应
+
+    Args:
+        request: 当前请求
+        path: 文件路径
+        content_type: 响应类型
+        filename: Content-Disposition 中的文件名
+        as_attachment: True 为下载（attachment），False 为内联播放（inline）
+    """
+    path = Path(path)
+    st = path.stat()
+    size, mtime = st.st_size, int(st.st_mtime)
+    etag = file_etag(path)
+
+    def add_headers(response: HttpResponse) -> HttpResponse:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Accept-Ranges'] = 'bytes'
+        # 允许缓存，但每次使用前用 ETag 校验（任务重新处理后视频会变化）
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    if _not_modified(request, etag, mtime):
+        return add_headers(HttpResponse(status=304))
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return add_headers(response)
+
+    disposition = 'attachment' if as_attachment else 'inline'
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type, as_attachment=as_attachment,
+                                filename=filename)
+        return add_headers(response)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_iter_file_range(path, start, end), status=206, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+    return add_headers(response)
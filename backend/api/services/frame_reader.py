@@ -0,0 +1,94 @@
+"""
+视频帧选择与读取
+按 起始帧 / 结束帧 / 帧间隔 从视频中读取部分帧：先用 CAP_PROP_POS_FRAMES 定位到起始帧，
+被跳过的帧只 grab() 不解码（与 LoadImages 的 vid_stride 相同），用于长视频的低成本预览。
+帧号一律使用原视频中的帧序号（从 0 开始），保证 MOT 输出的帧号与原视频对应。
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameRange:
+    """
+    帧选择范围：[start_frame, end_frame) 内每 stride 帧取一帧
+
+    Args:
+        start_frame: 起始帧（含，从 0 开始）
+        end_frame: 结束帧（不含），None 表示到视频结尾
+        stride: 帧间隔，1 表示逐帧处理
+    """
+
+    def __init__(self, start_frame: int = 0, end_frame: Optional[int] = None, stride: int = 1):
+        start_frame = int(start_frame)
+        end_frame = int(end_frame) if end_frame is not None else None
+        stride = int(stride)
+        if start_frame < 0:
+            raise ValueError(f"起始帧必须 >= 0: {start_frame}")
+        if end_frame is not None and end_frame <= start_frame:
+            raise ValueError(f"结束帧必须大于起始帧: {start_frame} ~ {end_frame}")
+        if stride < 1:
+            raise ValueError(f"帧间隔必须 >= 1: {stride}")
+
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.stride = stride
+
+    @property
+    def is_full(self) -> bool:
+        """是否为逐帧处理整个视频"""
+        return self.start_frame == 0 and self.end_frame is None and self.stride == 1
+
+    def count(self, total_frames: int) -> int:
+        """在总帧数为 total_frames 的视频中会选中的帧数"""
+        end = total_frames if self.end_frame is None else min(self.end_frame, total_frames)
+        return len(range(self.start_frame, end, self.stride)) if end > self.start_frame else 0
+
+    def frame_number(self, i: int) -> int:
+        """第 i 个被选中的帧在原视频中的帧序号（从 0 开始）"""
+        return self.start_frame + i * self.stride
+
+    def to_cli_args(self) -> List[str]:
+        """转换为 convert_results.py 的命令行参数（图像目录中的帧由本范围抽取而来）"""
+        return ['--start-frame', str(self.start_frame), '--frame-stride', str(self.stride)]
+
+    def to_dict(self) -> dict:
+        return {'start_frame': self.start_frame, 'end_frame': self.end_frame, 'frame_stride': self.stride}
+
+    def __repr__(self) -> str:
+        return f"FrameRange(start_frame={self.start_frame}, end_frame={self.end_frame}, stride={self.stride})"
+
+
+def read_video_frames(cap: cv2.VideoCapture, frame_range: Optional[FrameRange] = None
+                      ) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    按帧选择范围从已打开的 VideoCapture 中读取帧，产出 (原视频帧序号, BGR 图像)
+
+    Args:
+        cap: 已打开的 cv2.VideoCapture
+        frame_range: 帧选择范围，为空时逐帧读取整个视频
+    """
+    frame_range = frame_range or FrameRange()
+    pos = 0
+    if frame_range.start_frame > 0:
+        if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_range.start_frame):
+            pos = frame_range.start_frame
+        # 部分后端不支持定位时退化为逐帧 grab
+
+    index = frame_range.start_frame
+    while frame_range.end_frame is None or index < frame_range.end_frame:
+        # 跳过的帧只 grab 不解码
+        while pos < index:
+            if not cap.grab():
+                return
+            pos += 1
+
+        ret, frame = cap.read()
+        if not ret:
+            return
+        pos += 1
+
+        yield index, frame
+        index += frame_range.stride
@@ -0,0 +1,108 @@
+"""
+细胞运动学后处理
+任务完成时对全部轨迹一次性做向量化计算（不按轨迹循环）：逐行的中心位置、速度、速率、面积，
+以及每条轨迹的路径长度、净位移、平均速率、平均面积和均方位移 (MSD) 曲线，结果与追踪结果一起保存。
+
+单位：位置为像素，速度为 像素/帧（按原视频帧号差计算，帧间隔 > 1 时取平均速度），
+面积为像素数（来自分割掩模，无掩模时退化为边界框面积）。
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+# MSD 计算的最大时滞（以相邻观测为 1 步）
+MSD_MAX_LAG = 32
+
+
+def compute_kinematics(
+    frame: np.ndarray,
+    track_id: np.ndarray,
+    bbox: np.ndarray,
+    mask_area: Optional[np.ndarray] = None,
+    track_index: Optional[Dict[str, np.ndarray]] = None,
+    max_lag: int = MSD_MAX_LAG
+) -> Dict[str, np.ndarray]:
+    """
+    计算运动学指标
+
+    Args:
+        frame: [N] 帧号
+        track_id: [N] track_id
+        bbox: [N, 4] (bb_left, bb_top, bb_width, bb_height)
+        mask_area: [N] 掩模面积（像素），NaN 表示该行没有掩模；为空时全部使用边界框面积
+        track_index: result_store.build_track_index 的结果，为空时在此构建
+        max_lag: MSD 的最大时滞
+
+    Returns:
+        逐行列（与输入行顺序一致）: center [N, 2], velocity [N, 2], speed [N], area [N]
+        逐轨迹列（与 track_index_ids 顺序一致）: track_frame_count, track_first_frame, track_last_frame,
+        track_path_length, track_net_displacement, track_mean_speed, track_mean_area, track_msd [T, L]
+    """
+    from .result_store import build_track_index
+
+    if track_index is None:
+        track_index = build_track_index(track_id, frame)
+    order = np.asarray(track_index['track_rows'])
+    offsets = np.asarray(track_index['track_index_offsets'])
+    n, n_tracks = len(order), len(offsets) - 1
+    counts = np.diff(offsets)
+    starts, ends = offsets[:-1], offsets[1:] - 1
+
+    # 以下数组均按 (track_id, 帧号) 排序，seg 为每行所属轨迹在索引中的位置
+    seg = np.repeat(np.arange(n_tracks), counts)
+    box = np.asarray(bbox, dtype=np.float64)[order]
+    f = np.asarray(frame, dtype=np.float64)[order]
+    cx = box[:, 0] + box[:, 2] / 2
+    cy = box[:, 1] + box[:, 3] / 2
+
+    area = box[:, 2] * box[:, 3]
+    if mask_area is not None:
+        masked = np.asarray(mask_area, dtype=np.float64)[order]
+        area = np.where(np.isfinite(masked), masked, area)
+
+    # 相邻两行属于同一轨迹时才构成一步；每条轨迹的第一行速度为 0
+    same = seg[1:] == seg[:-1]
+    dt = np.maximum(np.diff(f), 1)
+    dx = np.where(same, np.diff(cx), 0)
+    dy = np.where(same, np.diff(cy), 0)
+    vx = np.concatenate([[0.0], dx / dt])
+    vy = np.concatenate([[0.0], dy / dt])
+    step = np.hypot(dx, dy)
+
+    path_length = np.bincount(seg[1:], weights=step, minlength=n_tracks) if n > 1 else np.zeros(n_tracks)
+    span = np.maximum(f[ends] - f[starts], 1) if n_tracks else np.zeros(0)
+    net_displacement = np.hypot(cx[ends] - cx[starts], cy[ends] - cy[starts]) if n_tracks else np.zeros(0)
+    mean_area = np.bincount(seg, weights=area, minlength=n_tracks) / np.maximum(counts, 1)
+
+    # MSD(k) = 同一轨迹中相隔 k 个观测的两点位移平方的均值
+    lags = int(min(max_lag, counts.max() - 1)) if n_tracks else 0
+    msd = np.full((n_tracks, max(lags, 0)), np.nan)
+    for k in range(1, lags + 1):
+        valid = seg[k:] == seg[:-k]
+        d2 = (cx[k:] - cx[:-k]) ** 2 + (cy[k:] - cy[:-k]) ** 2
+        lag_seg = seg[k:][valid]
+        sums = np.bincount(lag_seg, weights=d2[valid], minlength=n_tracks)
+        hits = np.bincount(lag_seg, minlength=n_tracks)
+        msd[:, k - 1] = np.where(hits > 0, sums / np.maximum(hits, 1), np.nan)
+
+    def unsort(values: np.ndarray) -> np.ndarray:
+        out = np.empty_like(values)
+        out[order] = values
+        return out
+
+    # 浮点结果保持 float64：位置等由 MOT 中的边界框计算，float32 会引入 32.68000030517578 这样的误差
+    return {
+        'center': unsort(np.stack([cx, cy], axis=1)),
+        'velocity': unsort(np.stack([vx, vy], axis=1)),
+        'speed': unsort(np.hypot(vx, vy)),
+        'area': unsort(area),
+        'track_frame_count': counts.astype(np.int32),
+        'track_first_frame': f[starts].astype(np.int32),
+        'track_last_frame': f[ends].astype(np.int32),
+        'track_path_length': path_length,
+        'track_net_displacement': net_displacement,
+        'track_mean_speed': path_length / span if n_tracks else np.zeros(0, np.float64),
+        'track_mean_area': mean_area,
+        'track_msd': msd,
+    }
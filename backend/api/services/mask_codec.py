@@ -0,0 +1,58 @@
+"""
+掩模紧凑编码
+二值掩模只保留非零区域的外接矩形，并用 np.packbits 按位压缩；
+用于在进程之间传递或缓存逐帧掩模，解码后与原掩模逐像素一致。
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+class PackedMask:
+    """按位压缩的二值掩模（仅保存非零外接矩形）"""
+
+    __slots__ = ('shape', 'box', 'bits')
+
+    def __init__(self, shape: Tuple[int, int], box: Tuple[int, int, int, int], bits: np.ndarray):
+        self.shape = shape      # 原掩模尺寸 (H, W)
+        self.box = box          # 非零区域 (y0, x0, h, w)
+        self.bits = bits        # np.packbits 后的 uint8 数组
+
+    @classmethod
+    def pack(cls, mask) -> 'PackedMask':
+        """
+        压缩掩模
+
+        Args:
+            mask: 二维掩模（torch.Tensor 或 np.ndarray），> 0.5 视为前景
+        """
+        if hasattr(mask, 'cpu'):
+            mask = mask.cpu().numpy()
+        mask = np.asarray(mask)
+        if mask.ndim > 2:
+            mask = mask.squeeze()
+        binary = mask > 0.5
+
+        rows = np.flatnonzero(binary.any(axis=1))
+        if len(rows) == 0:
+            return cls(binary.shape, (0, 0, 0, 0), np.zeros(0, dtype=np.uint8))
+        cols = np.flatnonzero(binary.any(axis=0))
+        y0, y1 = int(rows[0]), int(rows[-1]) + 1
+        x0, x1 = int(cols[0]), int(cols[-1]) + 1
+        return cls(binary.shape, (y0, x0, y1 - y0, x1 - x0), np.packbits(binary[y0:y1, x0:x1]))
+
+    def unpack(self) -> np.ndarray:
+        """还原为原尺寸的 float32 掩模（前景 1.0，背景 0.0）"""
+        mask = np.zeros(self.shape, dtype=np.float32)
+        y0, x0, h, w = self.box
+        if h and w:
+            crop = np.unpackbits(self.bits, count=h * w).reshape(h, w)
+            mask[y0:y0 + h, x0:x0 + w] = crop
+        return mask
+
+    def __getstate__(self):
+        return self.shape, self.box, self.bits
+
+    def __setstate__(self, state):
+        self.shape, self.box, self.bits = state
@@ -0,0 +1,186 @@
+"""
+常驻模型工作池
+按模型文件名（如 best_split.pt）维护长期存活的工作线程，每个线程持有已加载并预热的
+YOLO 模型，任务通过本地队列派发，避免每个任务重新导入 torch / 加载权重 / 初始化 DeepSORT。
+常驻模型数超过上限时按 LRU 淘汰空闲的工作线程。
+"""
+
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+
+class ModelWorker:
+    """单个模型的常驻工作线程，按提交顺序串行执行任务"""
+
+    def __init__(self, model_name: str, model_path: Path, warmup_imgsz: int = 1024,
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.model_name = model_name
+        self.model_path = model_path
+        self.warmup_imgsz = warmup_imgsz
+        self.on_idle = on_idle
+
+        self.model = None            # 已加载的 YOLO 对象
+        self.reid_extractor = None   # 复用的 ReID 特征提取器（仅 USE_REID 时存在）
+
+        self.jobs: queue.Queue = queue.Queue()
+        self.pending = 0             # 排队中 + 运行中的任务数
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name=f'model-worker-{model_name}', daemon=True)
+        self.thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        提交任务，fn 将在工作线程中以 fn(worker, *args, **kwargs) 的形式调用
+
+        Returns:
+            任务的 Future
+        """
+        future = Future()
+        with self.lock:
+            self.pending += 1
+        self.jobs.put((future, fn, args, kwargs))
+        return future
+
+    def is_idle(self) -> bool:
+        with self.lock:
+            return self.pending == 0
+
+    def stop(self):
+        """处理完已排队任务后退出线程并释放模型"""
+        self.jobs.put(None)
+
+    def new_deepsort(self):
+        """为一个新任务创建独立的 DeepSORT 追踪器（复用已加载的 ReID 权重）"""
+        from .convert_results import init_deepsort
+
+        deepsort = init_deepsort(extractor=self.reid_extractor)
+        if deepsort.extractor is not None:
+            self.reid_extractor = deepsort.extractor
+        return deepsort
+
+    def _load(self):
+        """加载模型并用空白帧预热"""
+        from .convert_results import YOLO
+
+        print(f"[ModelPool] 加载模型: {self.model_path}")
+        self.model = YOLO(str(self.model_path))
+        blank = np.zeros((self.warmup_imgsz, self.warmup_imgsz, 3), dtype=np.uint8)
+        self.model.stream(imgsz=self.warmup_imgsz, verbose=False).predict_frames([blank])
+
+    def _unload(self):
+        self.model = None
+        self.reid_extractor = None
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        print(f"[ModelPool] 已卸载模型: {self.model_name}")
+
+    def _run(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+
+            future, fn, args, kwargs = item
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        if self.model is None:
+                            self._load()
+                        future.set_result(fn(self, *args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                    idle = self.pending == 0
+                if idle and self.on_idle:
+                    self.on_idle()
+
+        self._unload()
+
+
+class ModelWorkerPool:
+    """按模型名索引的常驻工作池，带 LRU 淘汰"""
+
+    def __init__(self, model_dir: Path, max_models: int = 2, warmup_imgsz: int = 1024):
+        self.model_dir = Path(model_dir)
+        self.max_models = max(1, max_models)
+        self.warmup_imgsz = warmup_imgsz
+        self.workers: "OrderedDict[str, ModelWorker]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, model_name: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        把任务派发到对应模型的工作线程队列
+
+        Args:
+            model_name: 模型文件名
+            fn: 任务函数，签名为 fn(worker, *args, **kwargs)
+
+        Returns:
+            任务的 Future
+        """
+        model_path = self.model_dir / model_name
+        if not model_path.exists():
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+
+        with self.lock:
+            worker = self.workers.get(model_name)
+            if worker is None:
+                worker = ModelWorker(model_name, model_path, self.warmup_imgsz, on_idle=self._evict)
+                self.workers[model_name] = worker
+            self.workers.move_to_end(model_name)
+            # 在持锁状态下提交，保证 _evict 不会淘汰刚分配了任务的工作线程
+            future = worker.submit(fn, *args, **kwargs)
+            self._evict_locked()
+
+        return future
+
+    def resident_models(self) -> List[str]:
+        """当前常驻的模型名（按最近使用从旧到新）"""
+        with self.lock:
+            return list(self.workers.keys())
+
+    def _evict(self):
+        with self.lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """常驻模型数超过上限时，从最久未使用的开始淘汰空闲工作线程"""
+        for name in list(self.workers.keys()):
+            if len(self.workers) <= self.max_models:
+                break
+            worker = self.workers[name]
+            if worker.is_idle():
+                del self.workers[name]
+                worker.stop()
+
+
+_model_pool: Optional[ModelWorkerPool] = None
+_model_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> ModelWorkerPool:
+    """获取全局模型工作池实例"""
+    global _model_pool
+    with _model_pool_lock:
+        if _model_pool is None:
+            from django.conf import settings
+            from .video_processor import MODEL_DIR
+
+            _model_pool = ModelWorkerPool(
+                MODEL_DIR,
+                max_models=getattr(settings, 'MODEL_POOL_MAX_MODELS', 2),
+                warmup_imgsz=getattr(settings, 'MODEL_POOL_WARMUP_IMGSZ', 1024)
+            )
+        return _model_pool
@@ -0,0 +1,260 @@
+"""
+分阶段帧流水线
+把 解码 / 推理 / 追踪 / 绘制编码 拆成独立阶段，阶段之间用有界队列连接：
+后台阶段各占一个线程，追踪阶段留在调用线程中按帧顺序执行，
+这样第 t+1 帧的推理可以与第 t 帧的绘制、写盘重叠。
+每个阶段记录处理帧数、忙碌时间与阻塞时间，用于定位瓶颈阶段。
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+_END = object()      # 阶段结束标记
+_POLL_INTERVAL = 0.1  # 队列阻塞时检查停止标志的间隔（秒）
+
+
+class StageStats:
+    """单个阶段的吞吐计数"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0        # 已处理的帧数
+        self.busy = 0.0       # 实际处理耗时（秒），不含队列等待
+        self.stalled = 0.0    # 等待上游 / 下游队列的耗时（秒）
+
+    @property
+    def fps(self) -> float:
+        """仅按忙碌时间计算的吞吐（帧/秒），数值最低的阶段即为瓶颈"""
+        return self.items / self.busy if self.busy > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.name}: {self.items} 帧, {self.fps:.1f} 帧/秒, "
+                f"忙碌 {self.busy:.2f}s, 阻塞 {self.stalled:.2f}s")
+
+
+class _QueueReader:
+    """从阶段输出队列中逐项读取，等待时间计入消费方阶段的 stalled"""
+
+    def __init__(self, pipeline: 'FramePipeline', q: queue.Queue):
+        self.pipeline = pipeline
+        self.queue = q
+        self.stats: Optional[StageStats] = None  # 消费方阶段，由消费方绑定
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        item = self.pipeline._get(self.queue)
+        if self.stats is not None:
+            self.stats.stalled += time.perf_counter() - t0
+        if item is _END:
+            raise StopIteration
+        return item
+
+
+class _Sink:
+    """流水线末端阶段：在后台线程中对每个输入项调用 fn(item)"""
+
+    def __init__(self, pipeline: 'FramePipeline', stats: StageStats, fn: Callable[[Any], None], maxsize: int):
+        self.pipeline = pipeline
+        self.stats = stats
+        self.fn = fn
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.producer_stats: Optional[StageStats] = None  # 上游阶段，put 阻塞时间计入其 stalled
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name=f'pipeline-{stats.name}', daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        t0 = time.perf_counter()
+        self.pipeline._put(self.queue, item)
+        if self.producer_stats is not None:
+            self.producer_stats.stalled += time.perf_counter() - t0
+
+    def close(self):
+        """通知末端阶段输入结束，并等待其处理完剩余项"""
+        if not self.closed:
+            self.closed = True
+            self.pipeline._put(self.queue, _END)
+            self.thread.join()
+
+    def drain(self):
+        """等待已提交的项全部处理完（不结束末端阶段，如保存检查点前调用）；流水线出错时抛出其异常"""
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks and not self.pipeline._stop.is_set():
+                self.queue.all_tasks_done.wait(_POLL_INTERVAL)
+        if self.pipeline.error is not None:
+            raise self.pipeline.error
+
+    def _run(self):
+        reader = _QueueReader(self.pipeline, self.queue)
+        reader.stats = self.stats
+        try:
+            for item in reader:
+                t0 = time.perf_counter()
+                try:
+                    self.fn(item)
+                finally:
+                    self.queue.task_done()
+                self.stats.busy += time.perf_counter() - t0
+                self.stats.items += 1
+        except BaseException as e:
+            self.pipeline._fail(e)
+
+
+class FramePipeline:
+    """
+    有界队列连接的多线程帧流水线
+
+    用法:
+        with FramePipeline(queue_size=8) as pipeline:
+            decoded = pipeline.stage('decode', lambda: frames)
+            detections = pipeline.stage('infer', lambda src: detect(src), upstream=decoded)
+            renderer = pipeline.sink('render', render_one)
+            for item in pipeline.timed('track', detections, downstream=renderer):
+                renderer.put(track(item))
+            renderer.close()
+
+    任一阶段抛出异常时，其余阶段会尽快停止，异常在退出 with 块时重新抛出。
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = max(1, queue_size)
+        self.stats: List[StageStats] = []
+        self.threads: List[threading.Thread] = []
+        self.sinks: List[_Sink] = []
+        self.error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'FramePipeline':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._stop.set()
+        for sink in self.sinks:
+            sink.close()
+        for thread in self.threads:
+            thread.join()
+        if exc_type is None and self.error is not None:
+            raise self.error
+        return False
+
+    def stage(self, name: str, fn: Callable[..., Iterable], upstream: Optional[Iterator] = None) -> Iterator:
+        """
+        新建后台阶段：在独立线程中迭代 fn()（有上游时为 fn(upstream)），输出写入有界队列
+
+        Args:
+            name: 阶段名称（用于吞吐统计）
+            fn: 返回可迭代对象的函数
+            upstream: 上游阶段返回的迭代器
+
+        Returns:
+            本阶段输出的迭代器，可作为下一阶段的 upstream
+        """
+        stats = self._new_stats(name, upstream)
+        out_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        def run():
+            try:
+                it = iter(fn(upstream) if upstream is not None else fn())
+                while not self._stop.is_set():
+                    t0 = time.perf_counter()
+                    stalled0 = stats.stalled
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        break
+                    stats.busy += time.perf_counter() - t0 - (stats.stalled - stalled0)
+                    stats.items += 1
+
+                    t0 = time.perf_counter()
+                    self._put(out_queue, item)
+                    stats.stalled += time.perf_counter() - t0
+            except BaseException as e:
+                self._fail(e)
+            finally:
+                self._put(out_queue, _END)
+
+        thread = threading.Thread(target=run, name=f'pipeline-{name}', daemon=True)
+        self.threads.append(thread)
+        thread.start()
+        return _QueueReader(self, out_queue)
+
+    def sink(self, name: str, fn: Callable[[Any], None]) -> _Sink:
+        """
+        新建末端阶段：后台线程按提交顺序对每一项调用 fn(item)
+
+        Returns:
+            末端阶段对象，put(item) 提交，close() 结束并等待处理完毕
+        """
+        sink = _Sink(self, self._new_stats(name), fn, self.queue_size)
+        self.sinks.append(sink)
+        return sink
+
+    def timed(self, name: str, upstream: Iterator, downstream: Optional[_Sink] = None) -> Iterator:
+        """
+        在调用线程中运行的阶段（如必须按帧顺序执行的追踪）：统计两次取值之间的循环体耗时
+
+        Args:
+            name: 阶段名称
+            upstream: 上游阶段返回的迭代器
+            downstream: 可选，循环体向其 put 的末端阶段，put 的阻塞时间不计入忙碌时间
+        """
+        stats = self._new_stats(name, upstream)
+        if downstream is not None:
+            downstream.producer_stats = stats
+
+        def run():
+            for item in upstream:
+                t0 = time.perf_counter()
+                stalled0 = stats.stalled
+                yield item
+                stats.busy += time.perf_counter() - t0 - (stats.stalled - stalled0)
+                stats.items += 1
+
+        return run()
+
+    def summary(self) -> str:
+        """各阶段吞吐统计，并标出瓶颈阶段"""
+        lines = [str(s) for s in self.stats]
+        active = [s for s in self.stats if s.items > 0]
+        if active:
+            bottleneck = max(active, key=lambda s: s.busy)
+            lines.append(f"瓶颈阶段: {bottleneck.name}")
+        return '\n'.join(lines)
+
+    def _new_stats(self, name: str, upstream: Optional[Iterator] = None) -> StageStats:
+        stats = StageStats(name)
+        self.stats.append(stats)
+        if isinstance(upstream, _QueueReader):
+            upstream.stats = stats
+        return stats
+
+    def _fail(self, e: BaseException):
+        with self._lock:
+            if self.error is None:
+                self.error = e
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item):
+        """阻塞写入队列；流水线停止后放弃写入"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        """阻塞读取队列；流水线停止后视为结束"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
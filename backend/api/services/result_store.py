@@ -0,0 +1,482 @@
+"""
+列式结果存储
+追踪结果按列保存为任务目录 results/ 下的若干 .npy 文件（帧号、track_id、边界框、置信度……），
+读取时以 mmap 方式打开，不需要整体解析；任务的汇总字段单独写入一个很小的 manifest.json，
+状态查询、任务列表等接口只读取 manifest。
+
+旧版任务只有一个包含全部逐行数据的 result.json，读取时自动回退兼容。
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .kinematics import compute_kinematics
+
+RESULTS_DIRNAME = 'results'
+MANIFEST_NAME = 'manifest.json'
+LEGACY_RESULT_NAME = 'result.json'
+STORE_VERSION = 1
+
+# 逐行数据字段（旧版 result.json 中才有），manifest 中不包含
+ROW_FIELDS = ('tracking_data', 'frame_labels')
+
+# 列名 -> dtype；bbox 为 [N, 4] (bb_left, bb_top, bb_width, bb_height)
+# 浮点列使用 float64：与 MOT 文件中的十进制值逐位一致（float32 会把 123.45 变成 123.44999694824219）
+TRACK_COLUMNS = {
+    'frame': np.int32,
+    'track_id': np.int32,
+    'bbox': np.float64,
+    'conf': np.float64,
+    'class': np.int16,
+    'visibility': np.float64,
+}
+
+# 逐行数据对外的字段名（与旧版 result.json 的 tracking_data 一致）；bb_* 取自 bbox 列
+TRACK_FIELDS = ('frame', 'track_id', 'bb_left', 'bb_top', 'bb_width', 'bb_height', 'conf', 'class', 'visibility')
+BBOX_FIELDS = ('bb_left', 'bb_top', 'bb_width', 'bb_height')
+
+# 运动学派生字段 -> (列名, 列内下标)，见 services/kinematics.py
+KINEMATIC_FIELDS = {
+    'x': ('center', 0),
+    'y': ('center', 1),
+    'vx': ('velocity', 0),
+    'vy': ('velocity', 1),
+    'speed': ('speed', None),
+    'area': ('area', None),
+}
+# 可查询 / 导出的全部逐行字段
+QUERY_FIELDS = TRACK_FIELDS + tuple(KINEMATIC_FIELDS)
+
+# 运动学结果列（逐行 + 逐轨迹）
+KINEMATIC_COLUMNS = (
+    'center', 'velocity', 'speed', 'area',
+    'track_frame_count', 'track_first_frame', 'track_last_frame', 'track_path_length',
+    'track_net_displacement', 'track_mean_speed', 'track_mean_area', 'track_msd',
+)
+
+# label_frame 为 label_stems 中的下标；label_xywh 为 [N, 4] 归一化 (x_center, y_center, width, height)
+LABEL_COLUMNS = {
+    'label_frame': np.int32,
+    'label_track_id': np.int32,
+    'label_class': np.int16,
+    'label_xywh': np.float64,
+}
+
+
+def read_mot_columns(mot_path: Path) -> Dict[str, np.ndarray]:
+    """
+    按列读取 tracking_results_mot.txt
+
+    同目录下如有 convert_results 写出的 tracking_mask_areas.npy（与 MOT 逐行对应），一并读取为 mask_area 列。
+
+    Returns:
+        TRACK_COLUMNS 中各列及 mask_area 列的数组，按帧号升序（文件不存在或为空时为长度 0 的数组）
+    """
+    data = np.zeros((0, 9), dtype=np.float64)
+    mot_path = Path(mot_path)
+    if mot_path.exists():
+        with open(mot_path, 'r', encoding='utf-8') as f:
+            rows = [line for line in f if line.strip() and not line.startswith('#')]
+        if rows:
+            data = np.loadtxt(rows, delimiter=',', ndmin=2, usecols=range(9))
+
+    mask_area = np.full(len(data), np.nan, dtype=np.float32)
+    area_path = mot_path.parent / 'tracking_mask_areas.npy'
+    if area_path.exists():
+        areas = np.load(area_path)
+        if len(areas) == len(data):
+            mask_area = areas.astype(np.float32)
+
+    # 按帧号排序（稳定排序，同帧内保持写出顺序），读取时按帧范围二分查找
+    order = np.argsort(data[:, 0], kind='stable')
+    data, mask_area = data[order], mask_area[order]
+
+    columns = {
+        'frame': data[:, 0],
+        'track_id': data[:, 1],
+        'bbox': data[:, 2:6],
+        'conf': data[:, 6],
+        'class': data[:, 7],
+        'visibility': data[:, 8],
+    }
+    result = {name: columns[name].astype(dtype) for name, dtype in TRACK_COLUMNS.items()}
+    result['mask_area'] = mask_area
+    return result
+
+
+def read_label_columns(labels_dir: Path) -> Dict[str, np.ndarray]:
+    """
+    按列读取每帧的 label 文件 (track_id class x_center y_center width height)
+
+    Returns:
+        LABEL_COLUMNS 中各列的数组，另加 label_stems（按文件名排序的帧名）
+    """
+    stems: List[str] = []
+    frame_idx: List[int] = []
+    values: List[List[float]] = []
+
+    labels_dir = Path(labels_dir)
+    label_files = sorted(labels_dir.glob('*.txt')) if labels_dir.exists() else []
+    for i, label_file in enumerate(label_files):
+        stems.append(label_file.stem)
+        with open(label_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 6:
+                    frame_idx.append(i)
+                    values.append([float(v) for v in parts[:6]])
+
+    data = np.asarray(values, dtype=np.float64).reshape(-1, 6)
+    columns = {
+        'label_frame': np.asarray(frame_idx),
+        'label_track_id': data[:, 0],
+        'label_class': data[:, 1],
+        'label_xywh': data[:, 2:6],
+    }
+    result = {name: columns[name].astype(dtype) for name, dtype in LABEL_COLUMNS.items()}
+    result['label_stems'] = np.asarray(stems, dtype=str)
+    return result
+
+
+def build_track_index(track_id: np.ndarray, frame: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    构建轨迹索引
+
+    track_rows 为按 (track_id, 帧号) 排序后的行下标；第 i 条轨迹 track_index_ids[i] 的全部行为
+    track_rows[track_index_offsets[i]:track_index_offsets[i + 1]]，且按帧号升序。
+    """
+    order = np.lexsort((frame, track_id))
+    ids, starts = np.unique(np.asarray(track_id)[order], return_index=True)
+    return {
+        'track_rows': order.astype(np.int64),
+        'track_index_ids': ids.astype(np.int32),
+        'track_index_offsets': np.append(starts, len(order)).astype(np.int64),
+    }
+
+
+def write_manifest(task_dir: Path, manifest: Dict[str, Any]):
+    """原子写入 manifest（临时文件 + 替换）"""
+    manifest_path = Path(task_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def write_result_store(task_dir: Path, manifest: Dict[str, Any], columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """
+    写出列式结果和 manifest
+
+    manifest 最后写入（临时文件 + 原子替换），读取方以 manifest 存在作为结果完整的标志。
+
+    Args:
+        task_dir: 任务目录
+        manifest: 汇总字段（不含逐行数据）
+        columns: 列名 -> 数组
+
+    Returns:
+        写入的 manifest（附带 store 字段：版本、行数、列名）
+    """
+    task_dir = Path(task_dir)
+    results_dir = task_dir / RESULTS_DIRNAME
+    results_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = task_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    if 'track_id' in columns and 'track_rows' not in columns:
+        columns = {**columns, **build_track_index(columns['track_id'], columns['frame'])}
+    if 'track_id' in columns and 'speed' not in columns:
+        # 运动学指标在写出时一次算好，查询接口直接读取
+        columns = {**columns, **compute_kinematics(columns['frame'], columns['track_id'], columns['bbox'],
+                                                   columns.get('mask_area'), columns)}
+
+    for name, array in columns.items():
+        np.save(results_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+    manifest = dict(manifest)
+    manifest['store'] = {
+        'version': STORE_VERSION,
+        'rows': int(len(columns['frame'])) if 'frame' in columns else 0,
+        'label_rows': int(len(columns['label_frame'])) if 'label_frame' in columns else 0,
+        'columns': sorted(columns),
+    }
+    if 'speed' in columns:
+        manifest['kinematics'] = {
+            'position_unit': 'px',
+            'velocity_unit': 'px/frame',
+            'area_unit': 'px',
+            'msd_max_lag': int(columns['track_msd'].shape[1]),
+        }
+
+    write_manifest(task_dir, manifest)
+
+    # 旧版结果文件已被替代
+    legacy_path = task_dir / LEGACY_RESULT_NAME
+    if legacy_path.exists():
+        legacy_path.unlink()
+
+    return manifest
+
+
+class ResultStore:
+    """
+    一个任务的结果读取器
+
+    Args:
+        task_dir: 任务目录（media/tasks/<task_id>）
+    """
+
+    def __init__(self, task_dir: Path):
+        self.task_dir = Path(task_dir)
+        self.results_dir = self.task_dir / RESULTS_DIRNAME
+        self.manifest_path = self.task_dir / MANIFEST_NAME
+        self.legacy_path = self.task_dir / LEGACY_RESULT_NAME
+        self._manifest: Optional[Dict[str, Any]] = None
+        self._legacy: Optional[Dict[str, Any]] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._track_index: Optional[Dict[str, np.ndarray]] = None
+
+    @property
+    def is_legacy(self) -> bool:
+        """是否为只有 result.json 的旧版任务"""
+        return not self.manifest_path.exists() and self.legacy_path.exists()
+
+    def exists(self) -> bool:
+        return self.manifest_path.exists() or self.legacy_path.exists()
+
+    def manifest(self) -> Dict[str, Any]:
+        """汇总字段（不含逐行数据）"""
+        if self._manifest is None:
+            if self.manifest_path.exists():
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {k: v for k, v in self._load_legacy().items() if k not in ROW_FIELDS}
+        return self._manifest
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        以 mmap 方式打开一列（只读，按需从磁盘分页读取）
+
+        旧版任务由 result.json 转换为内存数组；没有保存运动学结果的任务首次使用时在内存中计算。
+        """
+        if name not in self._columns:
+            if name in KINEMATIC_COLUMNS and (self.is_legacy or not (self.results_dir / f"{name}.npy").exists()):
+                self._columns.update(self._compute_kinematics())
+            elif self.is_legacy:
+                if 'frame' not in self._columns:
+                    self._columns.update(self._legacy_columns())
+                if name not in self._columns:
+                    raise KeyError(f"旧版结果不包含列: {name}")
+            else:
+                path = self.results_dir / f"{name}.npy"
+                if not path.exists():
+                    raise FileNotFoundError(f"结果列不存在: {path}")
+                self._columns[name] = np.load(path, mmap_mode='r')
+        return self._columns[name]
+
+    def track_ids(self) -> np.ndarray:
+        """所有 track_id（升序）"""
+        return self._get_track_index()['track_index_ids']
+
+    def track_rows(self, track_id: int) -> np.ndarray:
+        """
+        一条轨迹的全部行下标（按帧号升序），轨迹不存在时返回空数组
+
+        通过轨迹索引二分查找定位，耗时与总行数无关。
+        """
+        index = self._get_track_index()
+        ids = index['track_index_ids']
+        i = int(np.searchsorted(ids, track_id))
+        if i >= len(ids) or ids[i] != track_id:
+            return np.zeros(0, dtype=np.int64)
+        offsets = index['track_index_offsets']
+        return np.asarray(index['track_rows'][offsets[i]:offsets[i + 1]])
+
+    def select_rows(self, frame_start: Optional[int] = None, frame_end: Optional[int] = None,
+                    track_ids: Optional[List[int]] = None) -> np.ndarray:
+        """
+        按帧范围和 track_id 筛选行
+
+        行按帧号升序存储，帧范围用二分查找直接定位；指定 track_ids 时改为从轨迹索引取各轨迹的行，
+        再在每条轨迹内按帧范围二分截取，不扫描其他轨迹的数据。
+
+        Args:
+            frame_start: 起始帧号（含，与 MOT 中的帧号一致），为空时不限
+            frame_end: 结束帧号（含），为空时不限
+            track_ids: 只保留这些 track_id，为空时不限
+
+        Returns:
+            升序的行下标
+        """
+        frame = self.column('frame')
+
+        if track_ids is not None:
+            parts = [np.zeros(0, dtype=np.int64)]
+            for tid in np.unique(np.asarray(track_ids, dtype=np.int64)).tolist():
+                rows = self.track_rows(tid)
+                if frame_start is not None or frame_end is not None:
+                    track_frames = frame[rows]
+                    lo = np.searchsorted(track_frames, frame_start, side='left') if frame_start is not None else 0
+                    hi = np.searchsorted(track_frames, frame_end, side='right') if frame_end is not None else len(rows)
+                    rows = rows[lo:hi]
+                parts.append(rows)
+            return np.sort(np.concatenate(parts))
+
+        lo, hi = self._frame_bounds(frame_start, frame_end)
+        return np.arange(lo, hi)
+
+    def iter_rows(self, frame_start: Optional[int] = None, frame_end: Optional[int] = None,
+                  track_ids: Optional[List[int]] = None, chunk_size: int = 10000) -> Iterator[np.ndarray]:
+        """
+        与 select_rows 相同的筛选，按块产出行下标（每块最多 chunk_size 行）
+
+        不指定 track_ids 时结果是一段连续的行，逐块生成下标，内存占用与总行数无关。
+        """
+        if track_ids is not None:
+            rows = self.select_rows(frame_start, frame_end, track_ids)
+            for start in range(0, len(rows), chunk_size):
+                yield rows[start:start + chunk_size]
+            return
+
+        lo, hi = self._frame_bounds(frame_start, frame_end)
+        for start in range(lo, hi, chunk_size):
+            yield np.arange(start, min(start + chunk_size, hi))
+
+    def field_values(self, name: str, rows: Optional[np.ndarray] = None) -> List[Any]:
+        """取一个字段（QUERY_FIELDS 之一）在指定行上的值，转换为 Python 原生类型"""
+        if name in BBOX_FIELDS:
+            values = self.column('bbox')[:, BBOX_FIELDS.index(name)]
+        elif name in KINEMATIC_FIELDS:
+            column, i = KINEMATIC_FIELDS[name]
+            values = self.column(column) if i is None else self.column(column)[:, i]
+        elif name in TRACK_FIELDS:
+            values = self.column(name)
+        else:
+            raise KeyError(f"未知字段: {name}")
+        if rows is not None:
+            values = values[rows]
+        if values.dtype == np.float32:
+            # 早先写出的结果以 float32 保存，按最短十进制表示还原为 MOT 文件中的值
+            return np.asarray(values).astype(str).astype(np.float64).tolist()
+        return np.asarray(values, dtype=np.float64 if values.dtype.kind == 'f' else np.int64).tolist()
+
+    def tracking_data(self, rows: Optional[np.ndarray] = None,
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        按旧版 result.json 的 tracking_data 格式返回逐行数据
+
+        Args:
+            rows: 要返回的行下标，为空时返回全部行
+            fields: 要返回的字段（QUERY_FIELDS 的子集），为空时返回 TRACK_FIELDS
+        """
+        fields = list(fields or TRACK_FIELDS)
+        values = [self.field_values(name, rows) for name in fields]
+        return [dict(zip(fields, row)) for row in zip(*values)]
+
+    def cell_frames(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """按前端 CellFrameData 的结构返回逐帧数据（位置、面积、速度、边界框）"""
+        names = ('frame', 'x', 'y', 'area', 'vx', 'vy', 'speed', 'bb_left', 'bb_top', 'bb_width', 'bb_height')
+        return [
+            {
+                'frame_number': f,
+                'position': {'x': x, 'y': y},
+                'area': area,
+                'velocity': {'vx': vx, 'vy': vy, 'speed': speed},
+                'bounding_box': {'x': left, 'y': top, 'width': w, 'height': h}
+            }
+            for f, x, y, area, vx, vy, speed, left, top, w, h in zip(*(self.field_values(n, rows) for n in names))
+        ]
+
+    def cell_stats(self, track_id: int) -> Optional[Dict[str, Any]]:
+        """一条轨迹的运动学汇总（路径长度、净位移、平均速率、平均面积、MSD 曲线），轨迹不存在时返回 None"""
+        ids = self.track_ids()
+        i = int(np.searchsorted(ids, track_id))
+        if i >= len(ids) or ids[i] != track_id:
+            return None
+
+        msd = self.column('track_msd')[i]
+        msd = np.asarray(msd[np.isfinite(msd)], dtype=np.float64)
+        return {
+            'frame_count': int(self.column('track_frame_count')[i]),
+            'first_frame': int(self.column('track_first_frame')[i]),
+            'last_frame': int(self.column('track_last_frame')[i]),
+            'path_length': float(self.column('track_path_length')[i]),
+            'net_displacement': float(self.column('track_net_displacement')[i]),
+            'mean_speed': float(self.column('track_mean_speed')[i]),
+            'mean_area': float(self.column('track_mean_area')[i]),
+            'msd': msd.tolist(),
+        }
+
+    def frame_labels(self) -> Dict[str, List[Dict[str, Any]]]:
+        """按旧版 result.json 的 frame_labels 格式返回每帧的 label"""
+        if self.is_legacy:
+            return self._load_legacy().get('frame_labels', {})
+
+        stems = self.column('label_stems').tolist()
+        frame_labels: Dict[str, List[Dict[str, Any]]] = {stem: [] for stem in stems}
+        for i, t, k, xywh in zip(self.column('label_frame').tolist(), self.column('label_track_id').tolist(),
+                                 self.column('label_class').tolist(),
+                                 self.column('label_xywh').tolist()):
+            frame_labels[stems[i]].append({
+                'track_id': t, 'class': k,
+                'x_center': xywh[0], 'y_center': xywh[1], 'width': xywh[2], 'height': xywh[3]
+            })
+        return frame_labels
+
+    def to_result(self) -> Dict[str, Any]:
+        """组装为旧版 result.json 的完整结构（兼容 /api/result/ 接口）"""
+        if self.is_legacy:
+            return self._load_legacy()
+        result = {k: v for k, v in self.manifest().items() if k != 'store'}
+        result['tracking_data'] = self.tracking_data()
+        result['frame_labels'] = self.frame_labels()
+        return result
+
+    def _frame_bounds(self, frame_start: Optional[int], frame_end: Optional[int]) -> Tuple[int, int]:
+        """帧范围 [frame_start, frame_end] 对应的连续行区间 [lo, hi)"""
+        frame = self.column('frame')
+        lo = int(np.searchsorted(frame, frame_start, side='left')) if frame_start is not None else 0
+        hi = int(np.searchsorted(frame, frame_end, side='right')) if frame_end is not None else len(frame)
+        return lo, max(lo, hi)
+
+    def _compute_kinematics(self) -> Dict[str, np.ndarray]:
+        mask_area = None
+        if not self.is_legacy and (self.results_dir / 'mask_area.npy').exists():
+            mask_area = self.column('mask_area')
+        return compute_kinematics(np.asarray(self.column('frame')), np.asarray(self.column('track_id')),
+                                  np.asarray(self.column('bbox')), mask_area, self._get_track_index())
+
+    def _get_track_index(self) -> Dict[str, np.ndarray]:
+        if self._track_index is None:
+            if not self.is_legacy and (self.results_dir / 'track_rows.npy').exists():
+                self._track_index = {name: self.column(name)
+                                     for name in ('track_rows', 'track_index_ids', 'track_index_offsets')}
+            else:
+                # 旧版结果没有保存索引，首次使用时在内存中构建
+                self._track_index = build_track_index(np.asarray(self.column('track_id')),
+                                                      np.asarray(self.column('frame')))
+        return self._track_index
+
+    def _load_legacy(self) -> Dict[str, Any]:
+        if self._legacy is None:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                self._legacy = json.load(f)
+        return self._legacy
+
+    def _legacy_columns(self) -> Dict[str, np.ndarray]:
+        rows = self._load_legacy().get('tracking_data', [])
+        return {
+            'frame': np.asarray([r['frame'] for r in rows], dtype=np.int32),
+            'track_id': np.asarray([r['track_id'] for r in rows], dtype=np.int32),
+            'bbox': np.asarray([[r['bb_left'], r['bb_top'], r['bb_width'], r['bb_height']] for r in rows],
+                               dtype=np.float64).reshape(-1, 4),
+            'conf': np.asarray([r['conf'] for r in rows], dtype=np.float64),
+            'class': np.asarray([r['class'] for r in rows], dtype=np.int16),
+            'visibility': np.asarray([r['visibility'] for r in rows], dtype=np.float64),
+        }
@@ -0,0 +1,266 @@
+"""
+有界任务调度器
+处理任务不再每个请求新建一个线程，而是进入有界的优先级队列，由固定数量的执行线程取出运行：
+- 同时运行的任务数有上限（JOB_MAX_CONCURRENT），超出的任务排队等待；
+- 队列按优先级从高到低、同优先级先进先出；
+- 每个模型同时运行的任务数有上限（JOB_MAX_PER_MODEL，按模型准入），某个模型已满时
+  跳过它的排队任务、先运行其他模型的任务，避免占着执行线程等待模型工作线程；
+- 队列长度有上限（JOB_MAX_QUEUE），满时拒绝新任务而不是无限堆积；
+- 运行中的任务可以取消；高优先级任务入队且没有空位时，抢占优先级更低的运行中任务（JOB_PREEMPTION），
+  被抢占的任务停止后按原顺序重新排队。
+
+取消和抢占都是协作式的：调度器只设置 Job 上的标记，任务函数在进度回调等检查点调用
+Job.check_cancelled() 抛出 JobCancelled，由任务函数自己终止子进程、释放资源。
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+# 任务停止的原因
+CANCELLED = 'cancelled'
+PREEMPTED = 'preempted'
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class JobCancelled(Exception):
+    """
+    任务被取消或被抢占（任务函数在检查点抛出）
+
+    Args:
+        reason: CANCELLED（不再运行）或 PREEMPTED（停止后重新排队）
+    """
+
+    def __init__(self, reason: str = CANCELLED):
+        super().__init__('任务被更高优先级的任务抢占' if reason == PREEMPTED else '任务已取消')
+        self.reason = reason
+
+
+class Job:
+    """一个排队 / 运行中的任务"""
+
+    def __init__(self, task_id: str, model_name: str, fn: Callable[['Job'], Any], priority: int, seq: int):
+        self.task_id = task_id
+        self.model_name = model_name
+        self.fn = fn
+        self.priority = priority
+        self.seq = seq
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.preemptions = 0
+        self.cancel_reason: Optional[str] = None
+        self._cancel_event = threading.Event()
+
+    def sort_key(self) -> tuple:
+        return -self.priority, self.seq
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def request_cancel(self, reason: str = CANCELLED):
+        """请求停止任务；取消优先于抢占（已请求取消的任务不会再被改为重新排队）"""
+        if self.cancel_reason != CANCELLED:
+            self.cancel_reason = reason
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        """检查点：已请求停止时抛出 JobCancelled"""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.cancel_reason or CANCELLED)
+
+    def _reset(self):
+        self.started_at = None
+        self.cancel_reason = None
+        self._cancel_event.clear()
+
+
+class JobScheduler:
+    """
+    优先级队列 + 固定数量执行线程
+
+    Args:
+        max_concurrent: 同时运行的任务数上限（执行线程数）
+        max_per_model: 每个模型同时运行的任务数上限
+        max_queue: 排队任务数上限
+        preemption: 是否允许高优先级任务抢占低优先级的运行中任务
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_per_model: int = 1, max_queue: int = 100,
+                 preemption: bool = True):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_per_model = max(1, int(max_per_model))
+        self.max_queue = max(1, int(max_queue))
+        self.preemption = bool(preemption)
+
+        self.queued: List[Job] = []               # 按 sort_key 排序
+        self.running: Dict[str, Job] = {}         # task_id -> Job
+        self.running_per_model: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f'job-runner-{i}', daemon=True)
+            for i in range(self.max_concurrent)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, task_id: str, model_name: str, fn: Callable[[Job], Any], priority: int = 0) -> int:
+        """
+        任务入队
+
+        Args:
+            task_id: 任务 ID（同一任务不能重复排队）
+            model_name: 任务使用的模型（按模型准入）
+            fn: 任务函数，在执行线程中以 Job 为参数调用（用于检查取消 / 抢占）
+            priority: 优先级，越大越先运行
+
+        Returns:
+            入队后的排队位置（从 1 开始）
+
+        Raises:
+            QueueFullError: 队列已满
+            ValueError: 任务已在队列中或正在运行
+        """
+        with self._cond:
+            if task_id in self.running or any(job.task_id == task_id for job in self.queued):
+                raise ValueError(f'任务已在队列中: {task_id}')
+            if len(self.queued) >= self.max_queue:
+                raise QueueFullError(f'任务队列已满（{self.max_queue} 个），请稍后重试')
+
+            job = Job(task_id, model_name, fn, int(priority), next(self._seq))
+            self.queued.append(job)
+            self.queued.sort(key=Job.sort_key)
+            if self.preemption:
+                self._preempt_for_locked(job)
+            self._cond.notify_all()
+            return self.queued.index(job) + 1
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        取消任务：排队中的任务直接移出队列，运行中的任务请求停止（在下一个检查点停止）
+
+        Returns:
+            任务是否在本调度器中（排队或运行）
+        """
+        with self._cond:
+            for i, job in enumerate(self.queued):
+                if job.task_id == task_id:
+                    del self.queued[i]
+                    return True
+            job = self.running.get(task_id)
+            if job is None:
+                return False
+            job.request_cancel(CANCELLED)
+            return True
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        """任务在队列中的位置（从 1 开始，按调度顺序），不在队列中时返回 None"""
+        with self._cond:
+            for i, job in enumerate(self.queued):
+                if job.task_id == task_id:
+                    return i + 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器当前状态"""
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_per_model': self.max_per_model,
+                'max_queue': self.max_queue,
+                'running': len(self.running),
+                'queued': len(self.queued),
+                'running_per_model': dict(self.running_per_model),
+                'preemption': self.preemption,
+            }
+
+    def _preempt_for_locked(self, job: Job):
+        """
+        新任务无法立即运行时，请求优先级最低（同优先级中最晚开始）的更低优先级运行中任务让出位置
+
+        正在停止的任务视为已让出位置，同一位置不会重复抢占。
+        """
+        running = [j for j in self.running.values() if not j.cancel_requested]
+        same_model = [j for j in running if j.model_name == job.model_name]
+        if len(same_model) >= self.max_per_model:
+            # 模型已满：只有抢占同一模型的任务才能让新任务运行
+            candidates = same_model
+        elif len(running) >= self.max_concurrent:
+            candidates = running
+        else:
+            return
+        victims = [j for j in candidates if j.priority < job.priority]
+        if victims:
+            victim = min(victims, key=lambda j: (j.priority, -j.started_at))
+            print(f"[JobScheduler] 任务 {job.task_id}（优先级 {job.priority}）"
+                  f"抢占任务 {victim.task_id}（优先级 {victim.priority}）")
+            victim.request_cancel(PREEMPTED)
+
+    def _next_job_locked(self) -> Optional[Job]:
+        """按调度顺序取出第一个所属模型仍有空位的任务"""
+        for i, job in enumerate(self.queued):
+            if self.running_per_model.get(job.model_name, 0) < self.max_per_model:
+                return self.queued.pop(i)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next_job_locked()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job_locked()
+                job.started_at = time.time()
+                self.running[job.task_id] = job
+                self.running_per_model[job.model_name] = self.running_per_model.get(job.model_name, 0) + 1
+
+            requeue = False
+            try:
+                job.fn(job)
+            except JobCancelled as e:
+                # 被抢占的任务保留原来的序号重新排队，同优先级中仍排在后来的任务之前
+                requeue = e.reason == PREEMPTED and job.cancel_reason == PREEMPTED
+                print(f"[JobScheduler] 任务 {job.task_id} 已停止: {e}")
+            except Exception as e:
+                # 任务函数自行记录失败状态，这里只防止执行线程退出
+                print(f"[JobScheduler] 任务 {job.task_id} 异常: {e}")
+            finally:
+                with self._cond:
+                    del self.running[job.task_id]
+                    self.running_per_model[job.model_name] -= 1
+                    if not self.running_per_model[job.model_name]:
+                        del self.running_per_model[job.model_name]
+                    if requeue:
+                        job._reset()
+                        job.preemptions += 1
+                        self.queued.append(job)
+                        self.queued.sort(key=Job.sort_key)
+                    # 模型有了空位，被跳过的任务可能可以运行了
+                    self._cond.notify_all()
+
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler() -> JobScheduler:
+    """获取全局任务调度器实例"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from django.conf import settings
+
+            _scheduler = JobScheduler(
+                max_concurrent=getattr(settings, 'JOB_MAX_CONCURRENT', 2),
+                max_per_model=getattr(settings, 'JOB_MAX_PER_MODEL', 1),
+                max_queue=getattr(settings, 'JOB_MAX_QUEUE', 100),
+                preemption=getattr(settings, 'JOB_PREEMPTION', True)
+            )
+        return _scheduler
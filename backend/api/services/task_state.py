@@ -0,0 +1,287 @@
+"""
+持久化的任务状态
+任务状态保存在 TaskState 表中（SQLite WAL 模式，见 settings.DATABASES），代替 views 中的进程内字典：
+服务重启后状态仍在，多个 Web 工作进程之间共享。
+
+状态切换用带条件的 UPDATE 完成（比较并设置），不依赖进程内的锁；
+逐帧进度经 ProgressReporter 合并后按时间间隔写入，每帧调用的开销只是一次时间比较。
+
+取消请求也经数据库传递：处理中的任务被改为 cancelling 后，负责它的工作进程（可能不是收到取消请求的进程）
+在下一次写入进度时发现状态已变化，抛出 JobCancelled 停止处理。
+
+状态变化和逐帧进度同时经 channel layer 推送给订阅该任务的 WebSocket 连接（见 websocket.py），
+逐帧进度的推送频率由 ProgressReporter 限制为每秒不超过 PROGRESS_PUSH_MAX_RATE 条。
+
+负责任务的工作进程退出（重启、崩溃）后，之后启动的工作进程通过 claim_interrupted_tasks 接管排队 / 处理中的任务
+重新排队；启用追踪检查点（TRACKING_CHECKPOINT_INTERVAL）时从最后一个检查点继续（见 checkpoint.py），否则从头重新处理。
+"""
+
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import TaskState
+from ..websocket import broadcast_progress, broadcast_status
+from .scheduler import CANCELLED, JobCancelled
+
+# 当前工作进程的标识
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+# 逐帧进度写入数据库的最小间隔（秒）
+PROGRESS_FLUSH_INTERVAL = 0.5
+
+# 状态变化时推送给 WebSocket 订阅者的字段
+_PUSHED_FIELDS = ('stage', 'progress', 'message', 'current_frame', 'total_frames', 'error')
+
+
+def create_task(task_id: str, video_name: str, video_path: str, video_sha256: str = '') -> Dict[str, Any]:
+    """登记新上传的任务（状态 uploaded）"""
+    state = TaskState.objects.create(
+        task_id=task_id,
+        video_name=video_name,
+        video_path=str(video_path),
+        video_sha256=video_sha256 or '',
+        status=TaskState.UPLOADED,
+    )
+    return state.to_dict()
+
+
+def get_task(task_id: str) -> Optional[Dict[str, Any]]:
+    """
+    读取任务状态，不存在时返回 None
+
+    负责任务的工作进程已退出时，正在取消的任务先标记为已取消；排队 / 处理中的任务保持原状态，
+    由 claim_interrupted_tasks 接管后恢复处理。
+    """
+    state = TaskState.objects.filter(task_id=task_id).first()
+    if state is None:
+        return None
+    if state.status == TaskState.CANCELLING and _worker_gone(state.worker):
+        if transition_task(task_id, [TaskState.CANCELLING], expected_worker=state.worker,
+                           status=TaskState.CANCELLED, stage='cancelled', message='任务已取消',
+                           cancelled_at=timezone.now()):
+            state.refresh_from_db()
+    return state.to_dict()
+
+
+def claim_interrupted_tasks() -> List[Dict[str, Any]]:
+    """
+    接管负责的工作进程已退出的任务
+
+    排队 / 处理中的任务改为由当前进程负责并回到排队状态（保留原入队时间），由调用方重新提交给调度器；
+    正在取消的任务直接标记为已取消。同一任务只会被一个进程接管（按原 worker 比较并设置）。
+
+    Returns:
+        被接管、需要重新提交的任务
+    """
+    claimed = []
+    orphans = TaskState.objects.filter(status__in=TaskState.ACTIVE_STATUSES).exclude(worker=WORKER_ID)
+    for state in orphans:
+        if not _worker_gone(state.worker):
+            continue
+        if state.status == TaskState.CANCELLING:
+            transition_task(state.task_id, [TaskState.CANCELLING], expected_worker=state.worker,
+                            status=TaskState.CANCELLED, stage='cancelled', message='任务已取消',
+                            cancelled_at=timezone.now())
+        elif transition_task(state.task_id, [state.status], expected_worker=state.worker,
+                             status=TaskState.QUEUED, stage='queued', worker=WORKER_ID,
+                             message='处理进程已退出，等待重新处理'):
+            state.refresh_from_db()
+            claimed.append(state.to_dict())
+    return claimed
+
+
+def update_task(task_id: str, **fields) -> bool:
+    """更新任务字段，返回任务是否存在"""
+    fields.setdefault('updated_at', timezone.now())
+    updated = TaskState.objects.filter(task_id=task_id).update(**fields) > 0
+    if updated and 'status' in fields:
+        _push_status(task_id, fields)
+    return updated
+
+
+def transition_task(task_id: str, from_statuses: Iterable[str], expected_worker: Optional[str] = None,
+                    **fields) -> bool:
+    """
+    仅当任务当前状态属于 from_statuses 时更新（原子的比较并设置）
+
+    Args:
+        task_id: 任务 ID
+        from_statuses: 允许的当前状态
+        expected_worker: 可选，同时要求 worker 字段等于该值
+        **fields: 要更新的字段
+
+    Returns:
+        是否更新成功
+    """
+    query = TaskState.objects.filter(task_id=task_id, status__in=list(from_statuses))
+    if expected_worker is not None:
+        query = query.filter(worker=expected_worker)
+    fields.setdefault('updated_at', timezone.now())
+    updated = query.update(**fields) > 0
+    if updated and 'status' in fields:
+        _push_status(task_id, fields)
+    return updated
+
+
+def request_cancel(task_id: str) -> Optional[str]:
+    """
+    请求取消任务
+
+    排队中的任务直接改为 cancelled（执行线程取到它时跳过）；处理中的任务改为 cancelling，
+    由负责它的工作进程在下一个检查点停止、释放资源后改为 cancelled。
+
+    Returns:
+        取消后的状态（cancelled / cancelling），任务不在排队或处理中时返回 None
+    """
+    # 两次比较之间任务可能刚开始运行，或刚被抢占而重新排队，因此多试一轮
+    for _ in range(2):
+        if transition_task(task_id, [TaskState.QUEUED], status=TaskState.CANCELLED, stage='cancelled',
+                           message='任务已取消', cancelled_at=timezone.now()):
+            return TaskState.CANCELLED
+        if transition_task(task_id, [TaskState.PROCESSING], status=TaskState.CANCELLING, stage='cancelling',
+                           message='正在取消...'):
+            return TaskState.CANCELLING
+    if TaskState.objects.filter(task_id=task_id, status=TaskState.CANCELLING).exists():
+        return TaskState.CANCELLING
+    return None
+
+
+def delete_task(task_id: str) -> bool:
+    """
+    删除任务状态；正在处理（或正在取消）的任务不删除
+
+    排队中的任务可以删除：执行线程取到它时发现状态已不存在，直接跳过。
+
+    Returns:
+        是否允许删除（任务不存在也返回 True）
+    """
+    TaskState.objects.filter(task_id=task_id).exclude(
+        status__in=[TaskState.PROCESSING, TaskState.CANCELLING]).delete()
+    return not TaskState.objects.filter(task_id=task_id).exists()
+
+
+def queue_position(task_id: str) -> Tuple[Optional[int], int]:
+    """
+    任务在所有工作进程的排队任务中的位置（按 优先级降序、入队时间升序）
+
+    Returns:
+        (位置（从 1 开始，不在排队时为 None）, 排队任务总数)
+    """
+    queued = TaskState.objects.filter(status=TaskState.QUEUED)
+    state = queued.filter(task_id=task_id).values('priority', 'queued_at').first()
+    length = queued.count()
+    if state is None:
+        return None, length
+    ahead = queued.filter(
+        Q(priority__gt=state['priority']) |
+        Q(priority=state['priority'], queued_at__lt=state['queued_at'])
+    ).count()
+    return ahead + 1, length
+
+
+class ProgressReporter:
+    """
+    合并写入的进度回调
+
+    可以在每一帧调用：阶段变化、进度到 100 或距上次写入超过 min_interval 时才写数据库，
+    其余调用只更新内存中的最新值，处理结束时 flush() 写出并推送最后一次的值。
+
+    逐帧进度同时推送给 WebSocket 订阅者，与写数据库分别限流（写数据库不会触发推送）：阶段变化、进度到 100
+    或距上次推送超过 1 / push_rate 秒时才推送（中间的进度被最新值覆盖），推送次数与订阅人数无关。
+
+    每次调用同时是取消检查点：cancel_check 抛出 JobCancelled（本进程的调度器请求停止），
+    或写入时发现任务已不在 processing 状态（其他进程请求了取消）时抛出 JobCancelled。
+
+    Args:
+        task_id: 任务 ID
+        min_interval: 两次写入数据库的最小间隔（秒）
+        cancel_check: 可选，每次调用时执行的取消检查（如 Job.check_cancelled）
+        push_rate: 每秒最多推送的进度消息数，0 表示不推送，为空时使用 settings.PROGRESS_PUSH_MAX_RATE
+    """
+
+    def __init__(self, task_id: str, min_interval: float = PROGRESS_FLUSH_INTERVAL,
+                 cancel_check: Optional[Callable[[], None]] = None, push_rate: Optional[float] = None):
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.cancel_check = cancel_check
+        if push_rate is None:
+            push_rate = getattr(settings, 'PROGRESS_PUSH_MAX_RATE', 4)
+        self.push_interval = 1.0 / push_rate if push_rate > 0 else None
+        self._last_write = 0.0
+        self._last_stage: Optional[str] = None
+        self._pending: Optional[Dict[str, Any]] = None
+        self._last_push = 0.0
+        self._last_pushed_stage: Optional[str] = None
+        self._unpushed: Optional[Dict[str, Any]] = None
+
+    def __call__(self, stage: str, progress: int, data: dict):
+        if self.cancel_check is not None:
+            self.cancel_check()
+        self._pending = {
+            'stage': stage,
+            'progress': int(progress),
+            'message': (data.get('message') or '')[:255],
+            'current_frame': data.get('current_frame'),
+            'total_frames': data.get('total_frames'),
+        }
+        now = time.monotonic()
+        if self.push_interval is not None:
+            self._unpushed = self._pending
+            if stage != self._last_pushed_stage or progress >= 100 or now - self._last_push >= self.push_interval:
+                self._push(now)
+        if stage != self._last_stage or progress >= 100 or now - self._last_write >= self.min_interval:
+            self._last_stage = stage
+            self._last_write = now
+            if not self._write():
+                raise JobCancelled(CANCELLED)
+
+    def flush(self) -> bool:
+        """处理结束时写出并推送最后一次的进度，返回任务是否仍在 processing 状态"""
+        self._push(time.monotonic())
+        return self._write()
+
+    def _write(self) -> bool:
+        """把最后一次的进度写入数据库（不推送），返回任务是否仍在 processing 状态"""
+        if self._pending is None:
+            return True
+        pending, self._pending = self._pending, None
+        return transition_task(self.task_id, [TaskState.PROCESSING], **pending)
+
+    def _push(self, now: float):
+        if self._unpushed is None:
+            return
+        pending, self._unpushed = self._unpushed, None
+        self._last_push = now
+        self._last_pushed_stage = pending['stage']
+        broadcast_progress(self.task_id, pending['stage'], pending['progress'], {
+            'message': pending['message'],
+            'current_frame': pending['current_frame'],
+            'total_frames': pending['total_frames'],
+        })
+
+
+def _push_status(task_id: str, fields: Dict[str, Any]):
+    """把状态变化推送给订阅该任务的 WebSocket 连接"""
+    broadcast_status(task_id, fields['status'], data={k: fields[k] for k in _PUSHED_FIELDS if k in fields})
+
+
+def _worker_gone(worker: str) -> bool:
+    """worker 所在进程是否已不存在（只能判断本机进程，其他主机的一律视为仍在运行）"""
+    host, _, pid = worker.rpartition(':')
+    if not worker or host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
@@ -0,0 +1,274 @@
+"""
+分块 / 断点续传上传
+大视频按块上传：init 创建会话 -> 按偏移 PUT 各块 -> complete 校验 SHA-256。
+每块直接写入任务目录 original/ 下的最终文件（不经过临时文件再复制），
+会话状态保存在任务目录的 upload.json 中，网络中断或服务重启后可查询已接收的偏移继续上传。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+# 会话状态文件名（上传完成后删除）
+SESSION_NAME = 'upload.json'
+# 建议的客户端块大小，以及单个块允许的最大字节数
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# 从请求体读取 / 写盘的缓冲大小
+READ_SIZE = 1024 * 1024
+
+ALLOWED_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+
+class UploadError(Exception):
+    """上传请求无效（对应 4xx 响应）"""
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        # 偏移不连续时告知客户端服务端已接收的字节数
+        self.offset = offset
+
+
+# 进程内的增量 SHA-256：{task_id: (已计算到的偏移, hashlib 对象)}
+# 按顺序上传时完成校验无需重新读取整个文件；服务重启或块被重传后失效，完成时退回到重新读取文件计算
+_hashers: Dict[str, tuple] = {}
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _session_lock(task_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(task_id, threading.Lock())
+
+
+class UploadSession:
+    """
+    一个任务的分块上传会话
+
+    Args:
+        task_dir: 任务目录（media/tasks/<task_id>）
+    """
+
+    def __init__(self, task_dir: Path):
+        self.task_dir = Path(task_dir)
+        self.task_id = self.task_dir.name
+        self.state_path = self.task_dir / SESSION_NAME
+        self._state: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def create(cls, task_dir: Path, filename: str, size: int, sha256: Optional[str] = None) -> 'UploadSession':
+        """
+        创建上传会话并建立空的目标文件
+
+        Args:
+            task_dir: 任务目录
+            filename: 原始文件名
+            size: 文件总字节数
+            sha256: 可选，整个文件的 SHA-256（十六进制），完成时也可再提供
+        """
+        filename = Path(str(filename or '')).name
+        if not filename:
+            raise UploadError('缺少文件名')
+        if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+            raise UploadError(f'不支持的视频格式，支持的格式: {", ".join(ALLOWED_EXTENSIONS)}')
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise UploadError(f'无效的文件大小: {size}')
+        if size <= 0:
+            raise UploadError(f'无效的文件大小: {size}')
+
+        session = cls(task_dir)
+        video_path = session.task_dir / 'original' / filename
+        video_path.parent.mkdir(parents=True, exist_ok=True)
+        open(video_path, 'wb').close()
+
+        session._state = {
+            'task_id': session.task_id,
+            'filename': filename,
+            'video_path': str(video_path),
+            'size': size,
+            'offset': 0,
+            'sha256': _normalize_digest(sha256) if sha256 else None,
+            'chunk_size': DEFAULT_CHUNK_SIZE,
+        }
+        session._save()
+        _hashers[session.task_id] = (0, hashlib.sha256())
+        return session
+
+    def exists(self) -> bool:
+        return self.state_path.exists()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        if self._state is None:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+        return self._state
+
+    @property
+    def video_path(self) -> Path:
+        return Path(self.state['video_path'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """会话信息（客户端据 offset 决定从哪里继续上传）"""
+        state = self.state
+        return {
+            'task_id': state['task_id'],
+            'filename': state['filename'],
+            'size': state['size'],
+            'offset': state['offset'],
+            'chunk_size': state['chunk_size'],
+            'complete': state['offset'] >= state['size'],
+        }
+
+    def write_chunk(self, offset: int, stream: BinaryIO, length: int, chunk_sha256: Optional[str] = None) -> int:
+        """
+        把一个块直接写入目标文件的 offset 处
+
+        offset 可以小于已接收的偏移（重传已写过的块），但不能超过它（不允许留下空洞）。
+        重传的块先校验再覆盖，不完整或校验和不匹配的块不会改写已接收的数据。
+
+        Args:
+            offset: 块在文件中的起始字节
+            stream: 请求体（按 READ_SIZE 分段读取；只有与已接收数据重叠的块才整块读入内存）
+            length: 块的字节数（Content-Length）
+            chunk_sha256: 可选，本块的 SHA-256，不匹配时不推进偏移
+
+        Returns:
+            写入后已连续接收的字节数
+        """
+        with _session_lock(self.task_id):
+            if not self.exists():
+                # 等待锁期间上传已完成
+                raise UploadError('上传会话不存在', status_code=404)
+            self._state = None
+            state = self.state
+            size, received = state['size'], state['offset']
+            if offset < 0 or offset > received:
+                raise UploadError(f'块偏移不连续: {offset}，已接收 {received} 字节', status_code=409, offset=received)
+            if length <= 0 or length > MAX_CHUNK_SIZE:
+                raise UploadError(f'块大小必须在 1-{MAX_CHUNK_SIZE} 字节之间: {length}')
+            if offset + length > size:
+                raise UploadError(f'块超出文件大小: {offset} + {length} > {size}', status_code=416, offset=received)
+
+            cached = _hashers.get(self.task_id)
+            hasher = cached[1] if cached is not None and cached[0] == offset == received else None
+            chunk_hasher = hashlib.sha256() if chunk_sha256 else None
+
+            if offset < received:
+                # 重传的块与已接收的字节重叠：先整块读入内存（不超过 MAX_CHUNK_SIZE）并校验，
+                # 通过后才覆盖写入，连接中断或校验失败时已接收的数据保持不变
+                buffer = bytearray()
+                for data in _iter_stream(stream, length):
+                    buffer += data
+                    if chunk_hasher is not None:
+                        chunk_hasher.update(data)
+                self._verify_chunk(len(buffer), length, chunk_hasher, chunk_sha256, received)
+                with open(self.video_path, 'r+b') as f:
+                    f.seek(offset)
+                    f.write(buffer)
+            else:
+                # 新的数据直接写入文件，校验失败时不推进偏移，之后的写入会覆盖它
+                written = 0
+                with open(self.video_path, 'r+b') as f:
+                    f.seek(offset)
+                    for data in _iter_stream(stream, length):
+                        f.write(data)
+                        written += len(data)
+                        if hasher is not None:
+                            hasher.update(data)
+                        if chunk_hasher is not None:
+                            chunk_hasher.update(data)
+                self._verify_chunk(written, length, chunk_hasher, chunk_sha256, received)
+
+            if hasher is not None:
+                _hashers[self.task_id] = (offset + length, hasher)
+            else:
+                # 重传了已写过的数据，增量哈希不再可靠，完成时重新读取文件计算
+                _hashers.pop(self.task_id, None)
+            state['offset'] = max(received, offset + length)
+            self._save()
+            return state['offset']
+
+    def finalize(self, sha256: Optional[str] = None) -> Tuple[Path, str]:
+        """
+        完成上传：检查是否收齐并校验整个文件的 SHA-256，成功后删除会话状态
+
+        Args:
+            sha256: 整个文件的 SHA-256；为空时使用 init 时提供的值，两者都没有则不校验
+
+        Returns:
+            (上传完成的视频文件路径, 文件的 SHA-256)
+        """
+        with _session_lock(self.task_id):
+            self._state = None
+            state = self.state
+            if state['offset'] < state['size']:
+                raise UploadError(f"上传未完成: 已接收 {state['offset']}/{state['size']} 字节",
+                                  status_code=409, offset=state['offset'])
+            if self.video_path.stat().st_size != state['size']:
+                raise UploadError('文件大小与会话记录不一致', status_code=409, offset=0)
+
+            expected = _normalize_digest(sha256) if sha256 else state.get('sha256')
+            actual = self.file_sha256()
+            if expected and actual != expected:
+                raise UploadError(f'文件校验和不匹配: {actual}', status_code=422)
+
+            self.state_path.unlink()
+            _hashers.pop(self.task_id, None)
+            with _locks_guard:
+                _locks.pop(self.task_id, None)
+            return self.video_path, actual
+
+    def file_sha256(self) -> str:
+        """整个文件的 SHA-256（顺序上传时直接取增量结果，否则重新读取文件）"""
+        cached = _hashers.get(self.task_id)
+        if cached is not None and cached[0] == self.state['size']:
+            return cached[1].hexdigest()
+        hasher = hashlib.sha256()
+        with open(self.video_path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_SIZE), b''):
+                hasher.update(data)
+        return hasher.hexdigest()
+
+    def _verify_chunk(self, written: int, length: int, chunk_hasher, chunk_sha256: Optional[str], received: int):
+        """块不完整或校验和不匹配时丢弃增量哈希并拒绝该块（不推进偏移）"""
+        if written < length:
+            # 连接中断：已写入的数据不计入，客户端重传本块
+            _hashers.pop(self.task_id, None)
+            raise UploadError(f'块数据不完整: 收到 {written}/{length} 字节', offset=received)
+        if chunk_hasher is not None and chunk_hasher.hexdigest() != _normalize_digest(chunk_sha256):
+            _hashers.pop(self.task_id, None)
+            raise UploadError('块校验和不匹配', status_code=422, offset=received)
+
+    def _save(self):
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+
+def _iter_stream(stream: BinaryIO, length: int) -> Iterator[bytes]:
+    """按 READ_SIZE 从请求体读取至多 length 字节，连接中断时提前结束"""
+    remaining = length
+    while remaining > 0:
+        data = stream.read(min(READ_SIZE, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+def _normalize_digest(value: str) -> str:
+    """接受 'hex' 或 'sha256=hex' 形式"""
+    value = str(value).strip().lower()
+    if value.startswith('sha256='):
+        value = value[len('sha256='):]
+    if len(value) != 64 or any(c not in '0123456789abcdef' for c in value):
+        raise UploadError(f'无效的 SHA-256: {value}')
+    return value
@@ -1,17 +1,26 @@
 """
 视频处理服务
-将上传的视频分解为帧，调用 YOLO 模型进行细胞分割和追踪，返回 JSON 结果
+将上传的视频解码为帧，调用 YOLO 模型进行细胞分割和追踪，返回 JSON 结果
+
+默认以流式模式在进程内运行：cv2.VideoCapture 解码的帧以内存数组直接送入
+YOLO / DeepSORT / 绘制流程；旧的“分解为 PNG + 子进程 convert_results.py”
+方式保留为 streaming=False。
 """
 
 import os
 import cv2
-import json
+import numpy as np
 import sys
 import subprocess
 from pathlib import Path
 from typing import Callable, Optional, Dict, Any, Tuple
 from datetime import datetime
 
+from .content_store import DEEPSORT_CONFIG, unshare_outputs
+from .frame_reader import FrameRange, read_video_frames
+from .result_store import read_label_columns, read_mot_columns, write_result_store
+from .writers import FrameOutputPolicy, VideoEncoding, concat_backend
+
 # 添加模型路径到 sys.path
 # 从 web/backend/api/services/video_processor.py 到 backend 目录需要 3 个 parent
 BACKEND_DIR = Path(__file__).parent.parent.parent
@@ -26,12 +35,15 @@ sys.path.insert(0, str(YOLO_SOURCE_DIR))
 class VideoProcessor:
     """视频处理器"""
 
-    def __init__(self, model_path: str, output_base_dir: str):
+    def __init__(self, model_path: str, output_base_dir: str, model_pool=None):
         self.model_path = model_path
         self.output_base_dir = Path(output_base_dir)
         self.output_base_dir.mkdir(parents=True, exist_ok=True)
+        # 常驻模型工作池（ModelWorkerPool），为空时每个任务在当前线程内加载模型
+        self.model_pool = model_pool
 
-    def extract_frames(self, video_path: str, output_dir: Path, progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[int, float]:
+    def extract_frames(self, video_path: str, output_dir: Path, progress_callback: Optional[Callable[[int, int], None]] = None,
+                       frame_range: Optional[FrameRange] = None) -> Tuple[int, float]:
         """
         将视频分解为帧图像
 
@@ -39,6 +51,7 @@ class VideoProcessor:
             video_path: 视频文件路径
             output_dir: 输出目录
             progress_callback: 进度回调函数 (current_frame, total_frames)
+            frame_range: 帧选择范围，为空时分解全部帧；文件名使用原视频帧序号
 
         Returns:
             (提取的帧数, 视频时长秒数)
@@ -51,24 +64,22 @@ class VideoProcessor:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         video_fps = cap.get(cv2.CAP_PROP_FPS)
         video_duration = total_frames / video_fps if video_fps > 0 else 0
+        frame_range = frame_range or FrameRange()
+        selected_frames = frame_range.count(total_frames)
 
         output_dir.mkdir(parents=True, exist_ok=True)
 
         frame_count = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
+        for index, frame in read_video_frames(cap, frame_range):
             # 保存帧为 PNG
-            frame_filename = output_dir / f"t{frame_count:04d}.png"
+            frame_filename = output_dir / f"t{index:04d}.png"
             cv2.imwrite(str(frame_filename), frame)
 
             frame_count += 1
 
             # 调用进度回调
             if progress_callback:
-                progress_callback(frame_count, total_frames)
+                progress_callback(frame_count, selected_frames)
 
         cap.release()
 
@@ -82,10 +93,19 @@ class VideoProcessor:
         imgsz: int = 1024,
         fps: int = 10,
         model_name: str = 'best_split.pt',
-        progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None
+        progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None,
+        batch: int = 1,
+        streaming: bool = True,
+        save_frames: bool = False,
+        frame_output: Optional[FrameOutputPolicy] = None,
+        frame_range: Optional[FrameRange] = None,
+        workers: int = 1,
+        chunk_overlap: int = 10,
+        video_encoding: Optional[VideoEncoding] = None,
+        checkpoint_interval: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        处理视频：分解帧 -> 调用模型 -> 生成 JSON 结果
+        处理视频：解码帧 -> 调用模型 -> 写出结果
 
         Args:
             video_path: 视频文件路径
@@ -95,13 +115,336 @@ class VideoProcessor:
             fps: 输出视频帧率
             model_name: 模型文件名
             progress_callback: 进度回调函数 (stage, progress, data)
+            batch: 每次前向推理的帧数
+            streaming: 是否在进程内流式处理（不落盘 PNG、不启动子进程）
+            save_frames: 流式模式下是否额外把原始帧保存到 frames/ 目录（调试用）
+            frame_output: 逐帧标注图片的输出策略，默认不保存（API 不提供逐帧图片下载）
+            frame_range: 帧选择范围（起始帧 / 结束帧 / 帧间隔），为空时逐帧处理整个视频
+            workers: 流式模式下 > 1 时把视频切成重叠的块，在多个进程中并行推理和追踪
+            chunk_overlap: 分块并行时相邻块重叠的帧数（用于拼接轨迹 ID）
+            video_encoding: 标注视频的编码配置（后端 / CRF / 预设 / 预览版本），为空时使用 settings 中的默认值
+            checkpoint_interval: 单进程流式模式下每处理多少帧保存一次检查点（中断后从检查点继续），
+                0 表示不保存，为空时使用 settings 中的默认值；分块并行 / 子进程模式不保存检查点
 
         Returns:
-            处理结果 JSON
+            结果 manifest（汇总字段，逐行数据通过 ResultStore 读取）
         """
         task_dir = self.output_base_dir / task_id
         task_dir.mkdir(parents=True, exist_ok=True)
+        # 复用其他任务结果时文件是硬链接，重新处理前先断开，避免改写其他任务的结果
+        unshare_outputs(task_dir)
+        if frame_output is None:
+            frame_output = FrameOutputPolicy('none')
+        frame_range = frame_range or FrameRange()
+        if video_encoding is None:
+            video_encoding = default_video_encoding()
+        if checkpoint_interval is None:
+            checkpoint_interval = default_checkpoint_interval()
+        if checkpoint_interval > 0 and not (streaming and workers <= 1):
+            # 检查点只在单进程流式处理中保存，分块并行 / 子进程模式中断后从头重新处理
+            mode = '分块并行' if streaming else '子进程'
+            print(f"[VideoProcessor] 任务 {task_id} 使用{mode}模式，不保存追踪检查点，处理中断后将从头重新处理")
+            checkpoint_interval = 0
+
+        if streaming and workers > 1:
+            output_dir = task_dir / 'output'
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            total_frames, video_duration = self._run_chunked(
+                video_path,
+                output_dir,
+                conf=conf,
+                imgsz=imgsz,
+                fps=fps,
+                model_name=model_name,
+                batch=batch,
+                workers=workers,
+                chunk_overlap=chunk_overlap,
+                progress_callback=progress_callback,
+                frame_output=frame_output,
+                frame_range=frame_range,
+                video_encoding=video_encoding
+            )
+        elif streaming:
+            output_dir = task_dir / 'output'
+            output_dir.mkdir(parents=True, exist_ok=True)
+            frames_dir = task_dir / 'frames' if save_frames else None
+
+            total_frames, video_duration = self._run_streaming(
+                video_path,
+                output_dir,
+                conf=conf,
+                imgsz=imgsz,
+                fps=fps,
+                model_name=model_name,
+                batch=batch,
+                frames_dir=frames_dir,
+                progress_callback=progress_callback,
+                frame_output=frame_output,
+                frame_range=frame_range,
+                video_encoding=video_encoding,
+                checkpoint_interval=checkpoint_interval
+            )
+        else:
+            output_dir, total_frames, video_duration = self._run_subprocess(
+                video_path,
+                task_dir,
+                conf=conf,
+                imgsz=imgsz,
+                fps=fps,
+                model_name=model_name,
+                batch=batch,
+                progress_callback=progress_callback,
+                frame_output=frame_output,
+                frame_range=frame_range,
+                video_encoding=video_encoding
+            )
+
+        # 阶段3: 写出结果
+        if progress_callback:
+            progress_callback('packaging', 0, {'message': '写出结果文件...'})
+
+        result = self._generate_json_result(
+            task_id,
+            output_dir,
+            total_frames,
+            video_duration,
+            video_path,
+            model_name,
+            progress_callback=lambda prog: progress_callback('packaging', prog, {'message': '写出结果文件...'}),
+            frame_range=frame_range
+        )
+
+        if progress_callback:
+            progress_callback('packaging', 100, {'message': '处理完成'})
+
+        return result
+
+    def _run_streaming(
+        self,
+        video_path: str,
+        output_dir: Path,
+        conf: float,
+        imgsz: int,
+        fps: int,
+        model_name: str,
+        batch: int = 1,
+        frames_dir: Optional[Path] = None,
+        progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None,
+        frame_output: Optional[FrameOutputPolicy] = None,
+        frame_range: Optional[FrameRange] = None,
+        video_encoding: Optional[VideoEncoding] = None,
+        checkpoint_interval: int = 0
+    ) -> Tuple[int, float]:
+        """
+        在当前进程内流式运行推理和追踪
+
+        checkpoint_interval > 0 时按间隔在任务目录 checkpoint/ 下保存检查点，
+        同一任务以相同参数重新运行时从最后一个检查点继续。
+
+        Returns:
+            (处理的帧数, 视频时长秒数)
+        """
+        # 延迟导入，避免 Django 启动时加载 torch / ultralytics
+        from .convert_results import get_video_info, run_tracking_on_video
+
+        total_frames, video_fps = get_video_info(video_path)
+        video_duration = total_frames / video_fps if video_fps > 0 else 0
 
+        # 检测结果缓存：同一视频 + 模型 + 推理参数重新运行时只回放检测结果重跑 DeepSORT
+        detection_cache = self._detection_cache(output_dir, video_path, model_name, conf, imgsz, frame_range)
+        cached = detection_cache.exists()
+        checkpoint = None
+        if checkpoint_interval > 0 and concat_backend() is None:
+            print("[VideoProcessor] 未找到 ffmpeg 或 PyAV，无法拼接分段编码的标注视频，不保存追踪检查点")
+        elif checkpoint_interval > 0:
+            checkpoint = self._tracking_checkpoint(output_dir, video_path, model_name, checkpoint_interval,
+                                                   conf=conf, imgsz=imgsz, fps=fps, batch=batch,
+                                                   frame_output=frame_output, frame_range=frame_range,
+                                                   video_encoding=video_encoding)
+
+        if progress_callback:
+            message = '使用缓存的检测结果重新追踪...' if cached else '开始 YOLO 推理和追踪...'
+            progress_callback('processing', 0, {'message': message})
+
+        def on_frame(current_frame: int, total: int):
+            if progress_callback:
+                progress_callback('processing', int((current_frame - 1) / total * 100) if total > 0 else 0, {
+                    'message': f'处理帧 {current_frame}/{total}',
+                    'current_frame': current_frame,
+                    'total_frames': total
+                })
+
+        def run(model, deepsort=None):
+            return run_tracking_on_video(
+                model,
+                video_path,
+                str(output_dir),
+                conf=conf,
+                imgsz=imgsz,
+                fps=fps,
+                batch=batch,
+                frames_dir=str(frames_dir) if frames_dir else None,
+                progress_callback=on_frame,
+                deepsort=deepsort,
+                frame_output=frame_output,
+                frame_range=frame_range,
+                detection_cache=detection_cache,
+                video_encoding=video_encoding,
+                checkpoint=checkpoint
+            )
+
+        if cached:
+            # 无需推理，不占用模型工作线程
+            _, processed_frames = run(None)
+        elif self.model_pool is not None:
+            # 派发到常驻工作线程，复用已加载并预热的模型
+            future = self.model_pool.submit(
+                model_name,
+                lambda worker: run(worker.model, worker.new_deepsort())
+            )
+            _, processed_frames = future.result()
+        else:
+            _, processed_frames = run(str(MODEL_DIR / model_name))
+
+        if progress_callback:
+            progress_callback('processing', 100, {'message': 'YOLO 处理完成'})
+
+        return processed_frames, video_duration
+
+    def _detection_cache(self, output_dir: Path, video_path: str, model_name: str, conf: float, imgsz: int,
+                         frame_range: Optional[FrameRange] = None):
+        """任务目录 cache/ 下与本次视频、模型和推理参数对应的检测结果缓存"""
+        from .detection_cache import DetectionCache
+
+        model_path = MODEL_DIR / model_name
+        if not model_path.exists():
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+        return DetectionCache.for_video(output_dir.parent / 'cache', video_path, str(model_path),
+                                        conf=conf, imgsz=imgsz, frame_range=frame_range)
+
+    def _tracking_checkpoint(self, output_dir: Path, video_path: str, model_name: str, interval: int, conf: float,
+                             imgsz: int, fps: int, batch: int, frame_output: Optional[FrameOutputPolicy],
+                             frame_range: Optional[FrameRange], video_encoding: Optional[VideoEncoding]):
+        """任务目录 checkpoint/ 下的追踪检查点，视频、模型、追踪配置或任一输出参数变化时不会从旧检查点恢复"""
+        from .checkpoint import TrackingCheckpoint
+        from .detection_cache import file_sha256
+
+        fingerprint = {
+            'video': file_sha256(video_path),
+            'model': file_sha256(MODEL_DIR / model_name),
+            'deep_sort': file_sha256(DEEPSORT_CONFIG) if DEEPSORT_CONFIG.exists() else '',
+            'conf': float(conf),
+            'imgsz': int(imgsz),
+            'fps': fps,
+            'batch': int(batch),
+            'frame_output': repr(frame_output),
+            'frame_range': (frame_range or FrameRange()).to_dict(),
+            'video_encoding': repr(video_encoding),
+        }
+        # 检查点对齐到推理批次边界，恢复后各批次包含的帧与不中断时相同
+        batch = max(1, int(batch))
+        interval = -(-int(interval) // batch) * batch
+        return TrackingCheckpoint(output_dir.parent / 'checkpoint', fingerprint, interval)
+
+    def _run_chunked(
+        self,
+        video_path: str,
+        output_dir: Path,
+        conf: float,
+        imgsz: int,
+        fps: int,
+        model_name: str,
+        batch: int = 1,
+        workers: int = 2,
+        chunk_overlap: int = 10,
+        progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None,
+        frame_output: Optional[FrameOutputPolicy] = None,
+        frame_range: Optional[FrameRange] = None,
+        video_encoding: Optional[VideoEncoding] = None
+    ) -> Tuple[int, float]:
+        """
+        分块并行处理：每块在独立进程中推理和追踪，拼接轨迹后在当前进程绘制并写出结果
+        （已有检测结果缓存时无需推理，直接按单进程流程回放缓存）
+
+        Returns:
+            (处理的帧数, 视频时长秒数)
+        """
+        if self._detection_cache(output_dir, video_path, model_name, conf, imgsz, frame_range).exists():
+            return self._run_streaming(video_path, output_dir, conf=conf, imgsz=imgsz, fps=fps, model_name=model_name,
+                                       batch=batch, progress_callback=progress_callback, frame_output=frame_output,
+                                       frame_range=frame_range, video_encoding=video_encoding)
+
+        # 延迟导入，避免 Django 启动时加载 torch / ultralytics
+        from .chunked import run_tracking_chunked
+        from .convert_results import get_video_info
+
+        model_path = MODEL_DIR / model_name
+        if not model_path.exists():
+            raise FileNotFoundError(f"模型文件不存在: {model_path}")
+
+        total_frames, video_fps = get_video_info(video_path)
+        video_duration = total_frames / video_fps if video_fps > 0 else 0
+
+        if progress_callback:
+            progress_callback('processing', 0, {'message': f'开始分块并行推理和追踪（{workers} 个进程）...'})
+
+        def on_progress(phase: str, current: int, total: int):
+            if not progress_callback or total <= 0:
+                return
+            # 并行推理追踪占 0-80%，拼接后的绘制与写出占 80-100%
+            if phase == 'tracking':
+                progress_callback('processing', int(current / total * 80), {
+                    'message': f'并行推理追踪 {current}/{total}'
+                })
+            else:
+                progress_callback('processing', 80 + int((current - 1) / total * 20), {
+                    'message': f'绘制结果 {current}/{total}',
+                    'current_frame': current,
+                    'total_frames': total
+                })
+
+        _, processed_frames = run_tracking_chunked(
+            str(model_path),
+            video_path,
+            str(output_dir),
+            conf=conf,
+            imgsz=imgsz,
+            fps=fps,
+            batch=batch,
+            workers=workers,
+            overlap=chunk_overlap,
+            frame_range=frame_range,
+            frame_output=frame_output,
+            progress_callback=on_progress,
+            video_encoding=video_encoding
+        )
+
+        if progress_callback:
+            progress_callback('processing', 100, {'message': 'YOLO 处理完成'})
+
+        return processed_frames, video_duration
+
+    def _run_subprocess(
+        self,
+        video_path: str,
+        task_dir: Path,
+        conf: float,
+        imgsz: int,
+        fps: int,
+        model_name: str,
+        batch: int = 1,
+        progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None,
+        frame_output: Optional[FrameOutputPolicy] = None,
+        frame_range: Optional[FrameRange] = None,
+        video_encoding: Optional[VideoEncoding] = None
+    ) -> Tuple[Path, int, float]:
+        """
+        旧流程：先把视频分解为 PNG，再以子进程运行 convert_results.py
+
+        Returns:
+            (输出目录, 总帧数, 视频时长秒数)
+        """
         # 阶段1: 分解视频为帧
         if progress_callback:
             progress_callback('extracting', 0, {'message': '开始分解视频...'})
@@ -114,7 +457,8 @@ class VideoProcessor:
                 'extracting',
                 int(current / total * 100) if total > 0 else 0,
                 {'message': f'分解帧 {current}/{total}'}
-            )
+            ),
+            frame_range=frame_range
         )
 
         if progress_callback:
@@ -141,8 +485,15 @@ class VideoProcessor:
             '--output', str(output_dir),
             '--conf', str(conf),
             '--imgsz', str(imgsz),
-            '--fps', str(fps)
+            '--fps', str(fps),
+            '--batch', str(batch)
         ]
+        if frame_output is not None:
+            cmd += frame_output.to_cli_args()
+        if frame_range is not None:
+            cmd += frame_range.to_cli_args()
+        if video_encoding is not None:
+            cmd += video_encoding.to_cli_args()
 
         # 运行命令
         process = subprocess.Popen(
@@ -153,7 +504,27 @@ class VideoProcessor:
             cwd=str(YOLO_SOURCE_DIR)
         )
 
-        # 读取输出以更新进度
+        # 读取输出以更新进度；进度回调抛出异常（如任务被取消）时终止子进程
+        try:
+            self._follow_subprocess(process, progress_callback)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+
+        if process.returncode != 0:
+            error_output = process.stderr.read()
+            raise RuntimeError(f"YOLO 处理失败: {error_output}")
+
+        if progress_callback:
+            progress_callback('processing', 100, {'message': 'YOLO 处理完成'})
+
+        return output_dir, total_frames, video_duration
+
+    @staticmethod
+    def _follow_subprocess(process: subprocess.Popen,
+                           progress_callback: Optional[Callable[[str, int, Dict[str, Any]], None]] = None):
+        """读取 convert_results.py 子进程的输出并转换为进度回调，直到子进程退出"""
         for line in process.stdout:
             line = line.strip()
             print(f"[YOLO] {line}")
@@ -183,32 +554,6 @@ class VideoProcessor:
 
         process.wait()
 
-        if process.returncode != 0:
-            error_output = process.stderr.read()
-            raise RuntimeError(f"YOLO 处理失败: {error_output}")
-
-        if progress_callback:
-            progress_callback('processing', 100, {'message': 'YOLO 处理完成'})
-
-        # 阶段3: 生成 JSON 结果
-        if progress_callback:
-            progress_callback('packaging', 0, {'message': '生成 JSON 结果...'})
-
-        result = self._generate_json_result(
-            task_id,
-            output_dir,
-            total_frames,
-            video_duration,
-            video_path,
-            model_name,
-            progress_callback=lambda prog: progress_callback('packaging', prog, {'message': '生成 JSON 结果...'})
-        )
-
-        if progress_callback:
-            progress_callback('packaging', 100, {'message': '处理完成'})
-
-        return result
-
     def _generate_json_result(
         self,
         task_id: str,
@@ -217,10 +562,11 @@ class VideoProcessor:
         video_duration: float,
         video_path: str,
         model_name: str,
-        progress_callback: Optional[Callable[[int], None]] = None
+        progress_callback: Optional[Callable[[int], None]] = None,
+        frame_range: Optional[FrameRange] = None
     ) -> Dict[str, Any]:
         """
-        生成 JSON 格式的处理结果
+        生成处理结果：逐行数据写为列式 .npy 文件，汇总字段写为 manifest.json
 
         Args:
             task_id: 任务ID
@@ -230,9 +576,10 @@ class VideoProcessor:
             video_path: 原始视频路径
             model_name: 模型文件名
             progress_callback: 进度回调函数
+            frame_range: 本次处理的帧选择范围
 
         Returns:
-            JSON 结果字典
+            manifest 字典（不含逐行数据，逐行数据通过 ResultStore 读取）
         """
         # 读取 tracking_summary.txt
         summary_path = output_dir / 'tracking_summary.txt'
@@ -241,49 +588,48 @@ class VideoProcessor:
         # 从 summary 中获取总帧数（更准确）
         actual_total_frames = summary.get('总帧数', total_frames)
 
-        # 读取 tracking_results_mot.txt
-        mot_path = output_dir / 'tracking_results_mot.txt'
-        tracking_data = self._parse_mot_file(mot_path)
-
-        # 读取每帧的 label 文件
-        labels_dir = output_dir / 'labels'
-        frame_labels = self._parse_labels(labels_dir)
+        # 按列读取 tracking_results_mot.txt 和每帧的 label 文件
+        columns = read_mot_columns(output_dir / 'tracking_results_mot.txt')
+        columns.update(read_label_columns(output_dir / 'labels'))
 
         # 统计信息
         # 细胞总数应该是唯一 track_id 的数量
-        track_ids = set(row['track_id'] for row in tracking_data) if tracking_data else set()
-        cell_count = len(track_ids)
+        cell_count = int(len(np.unique(columns['track_id'])))
 
         # 获取标注视频路径
         annotated_video_path = output_dir / 'tracking_result.mp4'
         annotated_video_url = f"/api/video/{task_id}"
-
-        result = {
+        # 低分辨率预览版本: {'480p': '/api/video/<task_id>?rendition=480p'}，按高度从大到小
+        renditions = {}
+        for path in sorted(output_dir.glob('tracking_result_*p.mp4'),
+                           key=lambda p: -int(p.stem.rsplit('_', 1)[-1][:-1] or 0)):
+            name = path.stem.rsplit('_', 1)[-1]
+            if name[:-1].isdigit():
+                renditions[name] = f"{annotated_video_url}?rendition={name}"
+
+        manifest = {
             'task_id': task_id,
             'status': 'completed',
             'progress': 100,
             'total_frames': actual_total_frames,
+            'frame_range': (frame_range or FrameRange()).to_dict(),
             'cell_count': cell_count,
             'video_duration': round(video_duration, 2),
             'model_name': model_name,
             'annotated_video_path': str(annotated_video_path),
             'annotated_video_url': annotated_video_url,
+            'video_renditions': renditions,
             'original_video_path': video_path,
             'created_at': datetime.now().isoformat(),
-            'summary': summary,
-            'tracking_data': tracking_data,
-            'frame_labels': frame_labels
+            'summary': summary
         }
 
-        # 保存 JSON 文件
-        json_path = self.output_base_dir / task_id / 'result.json'
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        manifest = write_result_store(self.output_base_dir / task_id, manifest, columns)
 
         if progress_callback:
             progress_callback(100)
 
-        return result
+        return manifest
 
     def _parse_summary(self, summary_path: Path) -> Dict[str, Any]:
         """解析 tracking_summary.txt"""
@@ -317,71 +663,38 @@ class VideoProcessor:
 
         return summary
 
-    def _parse_mot_file(self, mot_path: Path) -> list:
-        """解析 tracking_results_mot.txt"""
-        if not mot_path.exists():
-            return []
 
-        tracking_data = []
-        with open(mot_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-
-            parts = line.split(',')
-            if len(parts) >= 9:
-                tracking_data.append({
-                    'frame': int(parts[0]),
-                    'track_id': int(parts[1]),
-                    'bb_left': float(parts[2]),
-                    'bb_top': float(parts[3]),
-                    'bb_width': float(parts[4]),
-                    'bb_height': float(parts[5]),
-                    'conf': float(parts[6]),
-                    'class': int(parts[7]),
-                    'visibility': float(parts[8])
-                })
-
-        return tracking_data
-
-    def _parse_labels(self, labels_dir: Path) -> Dict[str, list]:
-        """解析每帧的 label 文件"""
-        if not labels_dir.exists():
-            return {}
-
-        frame_labels = {}
-
-        for label_file in labels_dir.glob('*.txt'):
-            frame_name = label_file.stem
-            labels = []
-
-            with open(label_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            for line in lines:
-                line = line.strip()
-                if line:
-                    parts = line.split()
-                    if len(parts) >= 6:
-                        labels.append({
-                            'track_id': int(parts[0]),
-                            'class': int(parts[1]),
-                            'x_center': float(parts[2]),
-                            'y_center': float(parts[3]),
-                            'width': float(parts[4]),
-                            'height': float(parts[5])
-                        })
-
-            frame_labels[frame_name] = labels
-
-        return frame_labels
+def default_video_encoding() -> VideoEncoding:
+    """settings 中配置的默认视频编码（非 Django 环境下使用 VideoEncoding 的默认值）"""
+    try:
+        from django.conf import settings
+    except ImportError:
+        return VideoEncoding()
+    if not settings.configured:
+        return VideoEncoding()
+    return VideoEncoding(
+        backend=getattr(settings, 'VIDEO_ENCODER_BACKEND', 'auto'),
+        crf=getattr(settings, 'VIDEO_CRF', 23),
+        preset=getattr(settings, 'VIDEO_PRESET', 'veryfast'),
+        previews=getattr(settings, 'VIDEO_PREVIEW_HEIGHTS', ())
+    )
+
+
+def default_checkpoint_interval() -> int:
+    """settings 中配置的检查点间隔（帧数，非 Django 环境下为 0，即不保存检查点）"""
+    try:
+        from django.conf import settings
+    except ImportError:
+        return 0
+    if not settings.configured:
+        return 0
+    return int(getattr(settings, 'TRACKING_CHECKPOINT_INTERVAL', 0))
 
 
 def get_video_processor():
     """获取视频处理器实例"""
+    from .model_pool import get_model_pool
+
     model_path = str(MODEL_DIR / MODEL_NAME)
     output_base_dir = Path(__file__).parent.parent.parent / 'media' / 'tasks'
-    return VideoProcessor(model_path, str(output_base_dir))
\ No newline at end of file
+    return VideoProcessor(model_path, str(output_base_dir), model_pool=get_model_pool())
\ No newline at end of file
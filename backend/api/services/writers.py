@@ -0,0 +1,647 @@
+"""
+结果输出写入器
+追踪过程中产生的标注帧边生成边写出，不在内存中累积整段视频；
+标注视频按编码配置选择 ffmpeg 管道 / PyAV / cv2 编码（H.264 + faststart，可附带低分辨率预览版本）；
+启用追踪检查点时标注视频按检查点分段编码，完成后由 mp4_concat 调用 ffmpeg / PyAV 拼接（只复制码流，不重新编码）；
+逐帧图片按输出策略（不保存 / PNG / JPEG / 每 N 帧一张）由后台线程池写盘。
+"""
+
+import importlib.util
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class VideoEncoding:
+    """
+    标注视频的编码配置
+
+    Args:
+        backend: 'auto' 依次尝试 ffmpeg 可执行文件 / PyAV / cv2；也可指定 'ffmpeg' / 'pyav' / 'cv2'
+        crf: H.264 质量参数 (0-51，越小质量越高、文件越大)
+        preset: x264 编码速度预设
+        previews: 额外生成的低分辨率预览版本高度（像素），如 (480,)；不小于原视频高度的会被忽略
+    """
+
+    BACKENDS = ('auto', 'ffmpeg', 'pyav', 'cv2')
+    PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+
+    def __init__(self, backend: str = 'auto', crf: int = 23, preset: str = 'veryfast', previews: Sequence[int] = ()):
+        backend = str(backend).lower()
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的视频编码后端: {backend}，可选: {', '.join(self.BACKENDS)}")
+        crf = int(crf)
+        if not 0 <= crf <= 51:
+            raise ValueError(f"CRF 必须在 0-51 之间: {crf}")
+        if preset not in self.PRESETS:
+            raise ValueError(f"不支持的编码预设: {preset}，可选: {', '.join(self.PRESETS)}")
+        if isinstance(previews, str):
+            previews = [p for p in previews.split(',') if p.strip()]
+        previews = sorted({int(p) for p in previews}, reverse=True)
+        if any(p < 16 for p in previews):
+            raise ValueError(f"预览版本高度必须 >= 16: {previews}")
+
+        self.backend = backend
+        self.crf = crf
+        self.preset = preset
+        self.previews = tuple(previews)
+
+    def resolve_backend(self) -> str:
+        """确定实际使用的编码后端（auto 时按可用性选择）"""
+        if self.backend == 'auto':
+            if shutil.which('ffmpeg'):
+                return 'ffmpeg'
+            if importlib.util.find_spec('av') is not None:
+                return 'pyav'
+            return 'cv2'
+        if self.backend == 'ffmpeg' and not shutil.which('ffmpeg'):
+            raise RuntimeError("未找到 ffmpeg 可执行文件")
+        if self.backend == 'pyav' and importlib.util.find_spec('av') is None:
+            raise RuntimeError("未安装 PyAV (pip install av)")
+        return self.backend
+
+    @staticmethod
+    def preview_path(video_path: Path, height: int) -> Path:
+        """预览版本的文件路径，如 tracking_result_480p.mp4"""
+        video_path = Path(video_path)
+        return video_path.with_name(f"{video_path.stem}_{height}p{video_path.suffix}")
+
+    def to_cli_args(self) -> List[str]:
+        """转换为 convert_results.py 的命令行参数"""
+        return ['--video-encoder', self.backend, '--video-crf', str(self.crf), '--video-preset', self.preset,
+                '--video-previews', ','.join(str(p) for p in self.previews)]
+
+    def __repr__(self) -> str:
+        return (f"VideoEncoding(backend={self.backend!r}, crf={self.crf}, preset={self.preset!r}, "
+                f"previews={self.previews})")
+
+
+def _even_size(width: int, height: int) -> Tuple[int, int]:
+    """yuv420p 要求宽高为偶数"""
+    return max(2, width - width % 2), max(2, height - height % 2)
+
+
+class _FfmpegEncoder:
+    """通过管道把 BGR 原始帧送入 ffmpeg 子进程编码为 H.264（moov 前置）"""
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int], encoding: VideoEncoding):
+        width, height = size
+        out_w, out_h = _even_size(width, height)
+        cmd = [
+            shutil.which('ffmpeg'), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-an', '-vf', f'crop={out_w}:{out_h}:0:0',
+            '-c:v', 'libx264', '-preset', encoding.preset, '-crf', str(encoding.crf),
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart', str(path)
+        ]
+        self.path = path
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def write(self, frame: np.ndarray):
+        try:
+            self._proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+        except BrokenPipeError:
+            self._raise_error()
+
+    def close(self):
+        if self._proc.stdin and not self._proc.stdin.closed:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self._proc.wait() != 0:
+            self._raise_error()
+        self._stderr.close()
+
+    def _raise_error(self):
+        self._proc.wait()
+        self._stderr.seek(0)
+        message = self._stderr.read().decode('utf-8', errors='replace').strip()
+        raise IOError(f"ffmpeg 编码失败 ({self.path}): {message[-500:]}")
+
+
+class _PyAVEncoder:
+    """使用 PyAV (libx264) 编码为 H.264（moov 前置）"""
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int], encoding: VideoEncoding):
+        import av
+        from fractions import Fraction
+
+        self._av = av
+        self._container = av.open(str(path), mode='w', options={'movflags': 'faststart'})
+        self._stream = self._container.add_stream('libx264', rate=Fraction(fps).limit_denominator(1001))
+        self._stream.width, self._stream.height = _even_size(*size)
+        self._stream.pix_fmt = 'yuv420p'
+        self._stream.options = {'crf': str(encoding.crf), 'preset': encoding.preset}
+
+    def write(self, frame: np.ndarray):
+        height, width = self._stream.height, self._stream.width
+        video_frame = self._av.VideoFrame.from_ndarray(np.ascontiguousarray(frame[:height, :width]), format='bgr24')
+        for packet in self._stream.encode(video_frame):
+            self._container.mux(packet)
+
+    def close(self):
+        for packet in self._stream.encode():
+            self._container.mux(packet)
+        self._container.close()
+
+
+class _Cv2Encoder:
+    """cv2.VideoWriter 编码（无 H.264 编码器时的兜底），关闭后把 moov 移到文件头"""
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int], fourcc: str = 'mp4v'):
+        self.path = path
+        self._writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self._writer.isOpened():
+            raise IOError(f"无法创建视频文件: {path}")
+
+    def write(self, frame: np.ndarray):
+        self._writer.write(frame)
+
+    def close(self):
+        self._writer.release()
+        mp4_faststart(self.path)
+
+
+def _iter_atoms(f, start: int, end: int):
+    """遍历 [start, end) 内的 MP4 box，产出 (类型, 偏移, 总长度)"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack('>I4s', f.read(8))
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+        elif size == 0:
+            size = end - pos
+        if size < 8:
+            break
+        yield kind, pos, size
+        pos += size
+
+
+def _shift_chunk_offsets(moov: bytearray, start: int, end: int, delta: int) -> bool:
+    """递归修正 moov 中 stco / co64 的 chunk 偏移；32 位偏移溢出时返回 False"""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', moov, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', moov, pos + 8)[0]
+            header = 16
+        if size < header:
+            return False
+        if kind in (b'moov', b'trak', b'mdia', b'minf', b'stbl'):
+            if not _shift_chunk_offsets(moov, pos + header, pos + size, delta):
+                return False
+        elif kind in (b'stco', b'co64'):
+            count = struct.unpack_from('>I', moov, pos + header + 4)[0]
+            fmt, width = ('>I', 4) if kind == b'stco' else ('>Q', 8)
+            base = pos + header + 8
+            for i in range(count):
+                value = struct.unpack_from(fmt, moov, base + i * width)[0] + delta
+                if kind == b'stco' and value > 0xFFFFFFFF:
+                    return False
+                struct.pack_into(fmt, moov, base + i * width, value)
+        pos += size
+    return True
+
+
+def mp4_faststart(path: Path) -> bool:
+    """
+    把 MP4 的 moov box 移到 mdat 之前（与 ffmpeg -movflags +faststart 相同），浏览器无需下载完整文件即可开始播放
+
+    Returns:
+        是否改写了文件（moov 已在前面或文件结构不支持时返回 False）
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        atoms = list(_iter_atoms(f, 0, size))
+        kinds = [kind for kind, _, _ in atoms]
+        if b'moov' not in kinds or b'mdat' not in kinds or kinds.index(b'moov') < kinds.index(b'mdat'):
+            return False
+
+        _, moov_pos, moov_size = atoms[kinds.index(b'moov')]
+        f.seek(moov_pos)
+        moov = bytearray(f.read(moov_size))
+        if not _shift_chunk_offsets(moov, 0, len(moov), moov_size):
+            return False
+
+        # moov 插入到第一个 mdat 之前，其后（到原 moov 位置为止）的数据整体后移 moov_size
+        insert_at = atoms[kinds.index(b'mdat')][1]
+        tmp_path = path.with_name(path.name + '.faststart')
+        with open(tmp_path, 'wb') as out:
+            for kind, pos, length in atoms:
+                if pos == insert_at:
+                    out.write(moov)
+                if kind == b'moov':
+                    continue
+                f.seek(pos)
+                remaining = length
+                while remaining > 0:
+                    data = f.read(min(1 << 20, remaining))
+                    if not data:
+                        break
+                    out.write(data)
+                    remaining -= len(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def concat_backend() -> Optional[str]:
+    """拼接视频分段使用的工具：ffmpeg 可执行文件或 PyAV，都没有时返回 None（无法分段编码）"""
+    if shutil.which('ffmpeg'):
+        return 'ffmpeg'
+    if importlib.util.find_spec('av') is not None:
+        return 'pyav'
+    return None
+
+
+def _ffmpeg_concat(parts: Sequence[Path], path: Path):
+    """ffmpeg concat demuxer：按列表文件顺序读取分段，只复制码流"""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        for part in parts:
+            escaped = str(Path(part).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_path = f.name
+    cmd = [
+        shutil.which('ffmpeg'), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-c', 'copy', '-map_metadata', '-1', '-fflags', '+bitexact', '-movflags', '+faststart',
+        '-f', 'mp4', str(path)
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    finally:
+        os.unlink(list_path)
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip()
+        raise IOError(f"ffmpeg 拼接视频分段失败 ({path}): {message[-500:]}")
+
+
+def _pyav_concat(parts: Sequence[Path], path: Path):
+    """PyAV 重新封装：依次复制各分段的视频包，时间戳按前面分段的总时长顺延"""
+    import av
+
+    with av.open(str(path), mode='w', format='mp4', options={'movflags': 'faststart'}) as out:
+        stream = None
+        offset = 0
+        for part in parts:
+            with av.open(str(part)) as src:
+                src_stream = src.streams.video[0]
+                if stream is None:
+                    if hasattr(out, 'add_stream_from_template'):
+                        stream = out.add_stream_from_template(src_stream)
+                    else:
+                        # PyAV < 14
+                        stream = out.add_stream(template=src_stream)
+                end = offset
+                for packet in src.demux(src_stream):
+                    if packet.dts is None:
+                        continue
+                    if packet.pts is not None:
+                        packet.pts += offset
+                        end = max(end, packet.pts + (packet.duration or 0))
+                    packet.dts += offset
+                    packet.stream = stream
+                    out.mux(packet)
+                offset = end
+
+
+def mp4_concat(parts: Sequence[Path], path: Path):
+    """
+    把同一编码器、相同参数编码的多个 MP4 分段拼接为一个文件（只复制码流，不重新编码，moov 前置）
+
+    优先使用 ffmpeg 的 concat demuxer，没有 ffmpeg 可执行文件时用 PyAV 重新封装。
+
+    Args:
+        parts: 按播放顺序排列的分段文件
+        path: 输出文件
+    """
+    if not parts:
+        raise ValueError("没有可拼接的分段")
+    backend = concat_backend()
+    if backend is None:
+        raise RuntimeError("拼接视频分段需要 ffmpeg 可执行文件或 PyAV (pip install av)")
+
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.stem}.concat{path.suffix}")
+    try:
+        if backend == 'ffmpeg':
+            _ffmpeg_concat(parts, tmp_path)
+        else:
+            _pyav_concat(parts, tmp_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+
+
+class IncrementalVideoWriter:
+    """
+    逐帧写入的标注视频写入器
+
+    与旧版“收集全部帧后统一写出”的行为保持一致：只有帧数 > 1 时才生成视频文件。
+    为此第一帧会暂存，收到第二帧时才真正打开编码器，内存中最多保留一帧。
+    编码后端和预览版本由 VideoEncoding 决定，预览版本与主视频同步逐帧缩放写入。
+
+    指定 segment_dir 时按分段编码：checkpoint() 结束当前分段（之后的帧写入新分段）并返回恢复写入所需的状态，
+    close() 时把各分段拼接为最终文件（需要 ffmpeg 或 PyAV，见 concat_backend）。分段总在相同的帧位置切换，
+    因此中断后以 resume_state 恢复写入与不中断运行得到的分段相同，拼接出的视频解码结果相同。
+    """
+
+    def __init__(self, video_path: Path, fps: float, fourcc: str = 'mp4v', encoding: Optional[VideoEncoding] = None,
+                 segment_dir: Optional[Path] = None, resume_state: Optional[dict] = None):
+        self.video_path = Path(video_path)
+        self.fps = fps
+        self.fourcc = fourcc
+        self.encoding = encoding or VideoEncoding()
+        self.segment_dir = Path(segment_dir) if segment_dir is not None else None
+        self.backend: Optional[str] = None
+        self.frame_count = 0
+        self.preview_paths: List[Path] = []
+        self._first: Optional[np.ndarray] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._targets: List[Tuple[Path, Optional[Tuple[int, int]]]] = []     # (输出路径, 缩放尺寸)
+        self._encoders: List[Tuple[Optional[Tuple[int, int]], object]] = []   # (缩放尺寸, 编码器)
+        self._segments = 0      # 已完成的分段数
+        if resume_state is not None:
+            self._restore(resume_state)
+
+    def __enter__(self) -> 'IncrementalVideoWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.segment_dir is not None:
+            # 分段模式下出错时不拼接，保留已完成的分段供恢复
+            self._close_encoders(raise_errors=False)
+        else:
+            self.close()
+        return False
+
+    def write(self, frame: np.ndarray):
+        """写入一帧 BGR 图像（尺寸以第一帧为准）"""
+        self.frame_count += 1
+        if self.frame_count == 1:
+            self._first = frame
+            return
+
+        if not self._encoders:
+            size_frame = self._first if self._first is not None else frame
+            self._open(size_frame.shape[1], size_frame.shape[0])
+            if self._first is not None:
+                self._write_all(self._first)
+                self._first = None
+        self._write_all(frame)
+
+    def checkpoint(self) -> dict:
+        """
+        结束当前分段并返回恢复写入所需的状态（仅分段模式）
+
+        Returns:
+            可序列化的状态，传给新写入器的 resume_state 后从下一帧继续写入
+        """
+        if self.segment_dir is None:
+            raise ValueError("只有分段模式的视频写入器可以保存检查点")
+        if self._encoders:
+            self._close_encoders()
+            self._segments += 1
+        return {
+            'frame_count': self.frame_count,
+            'segments': self._segments,
+            'backend': self.backend,
+            'size': self._size,
+            'first': self._first,
+        }
+
+    def close(self) -> bool:
+        """
+        结束写入
+
+        Returns:
+            是否生成了视频文件（帧数 > 1）
+        """
+        self._first = None
+        if self.segment_dir is None:
+            if not self._encoders:
+                return False
+            self._close_encoders()
+            return True
+
+        if self._encoders:
+            self._close_encoders()
+            self._segments += 1
+        if self.frame_count <= 1 or not self._segments:
+            return False
+        # 分段文件留在 segment_dir 中由调用方清理：拼接之后的步骤失败时仍可从检查点重新拼接
+        for path, _ in self._targets:
+            mp4_concat([self._segment_path(path, i) for i in range(self._segments)], path)
+        return True
+
+    def _open(self, width: int, height: int):
+        if not self._targets:
+            self._plan(width, height)
+
+        for path, scaled in self._targets:
+            size = scaled or (width, height)
+            if self.segment_dir is not None:
+                path = self._segment_path(path, self._segments)
+            if self.backend == 'ffmpeg':
+                encoder = _FfmpegEncoder(path, self.fps, size, self.encoding)
+            elif self.backend == 'pyav':
+                encoder = _PyAVEncoder(path, self.fps, size, self.encoding)
+            else:
+                encoder = _Cv2Encoder(path, self.fps, size, self.fourcc)
+            self._encoders.append((scaled, encoder))
+
+    def _plan(self, width: int, height: int):
+        """按第一帧尺寸确定编码后端和输出文件（主视频 + 预览版本）"""
+        if self.backend is None:
+            self.backend = self.encoding.resolve_backend()
+        self._size = (width, height)
+        self._targets = [(self.video_path, None)]
+        for preview_height in self.encoding.previews:
+            if preview_height < height:
+                preview_width = max(2, round(width * preview_height / height / 2) * 2)
+                path = VideoEncoding.preview_path(self.video_path, preview_height)
+                self._targets.append((path, (preview_width, preview_height)))
+                self.preview_paths.append(path)
+        if self.segment_dir is not None:
+            self.segment_dir.mkdir(parents=True, exist_ok=True)
+
+    def _restore(self, state: dict):
+        self.frame_count = state['frame_count']
+        self._segments = state['segments']
+        self._first = state['first']
+        self.backend = state['backend']
+        if state['size'] is not None:
+            self._plan(*state['size'])
+        # 删除中断的运行在检查点之后写出的分段
+        if self.segment_dir is not None and self.segment_dir.exists():
+            keep = {self._segment_path(path, i) for path, _ in self._targets for i in range(self._segments)}
+            for part in self.segment_dir.glob(f"*{self.video_path.suffix}"):
+                if part not in keep:
+                    part.unlink()
+
+    def _segment_path(self, path: Path, index: int) -> Path:
+        return self.segment_dir / f"{path.stem}.{index:04d}{path.suffix}"
+
+    def _close_encoders(self, raise_errors: bool = True):
+        encoders, self._encoders = self._encoders, []
+        errors = []
+        for _, encoder in encoders:
+            try:
+                encoder.close()
+            except Exception as e:
+                errors.append(e)
+        if errors and raise_errors:
+            raise errors[0]
+
+    def _write_all(self, frame: np.ndarray):
+        for scaled, encoder in self._encoders:
+            encoder.write(frame if scaled is None else cv2.resize(frame, scaled, interpolation=cv2.INTER_AREA))
+
+
+class FrameOutputPolicy:
+    """
+    逐帧标注图片的输出策略
+
+    Args:
+        format: 'none' 不保存 / 'png' / 'jpeg'
+        quality: JPEG 质量 (1-100)，仅 format='jpeg' 时生效
+        every: 每 N 帧保存一张（从第 1 帧开始）
+    """
+
+    FORMATS = ('none', 'png', 'jpeg')
+
+    def __init__(self, format: str = 'png', quality: int = 90, every: int = 1):
+        format = str(format).lower()
+        if format == 'jpg':
+            format = 'jpeg'
+        if format not in self.FORMATS:
+            raise ValueError(f"不支持的帧输出格式: {format}，可选: {', '.join(self.FORMATS)}")
+        quality = int(quality)
+        if not 1 <= quality <= 100:
+            raise ValueError(f"JPEG 质量必须在 1-100 之间: {quality}")
+        every = int(every)
+        if every < 1:
+            raise ValueError(f"帧输出间隔必须 >= 1: {every}")
+
+        self.format = format
+        self.quality = quality
+        self.every = every
+
+    @property
+    def enabled(self) -> bool:
+        return self.format != 'none'
+
+    @property
+    def suffix(self) -> str:
+        return '.jpg' if self.format == 'jpeg' else '.png'
+
+    def should_save(self, frame_idx: int) -> bool:
+        """frame_idx 从 1 开始"""
+        return self.enabled and (frame_idx - 1) % self.every == 0
+
+    def imwrite_params(self) -> List[int]:
+        if self.format == 'jpeg':
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        return []
+
+    def to_cli_args(self) -> List[str]:
+        """转换为 convert_results.py 的命令行参数"""
+        return ['--frame-output', self.format, '--frame-quality', str(self.quality), '--frame-every', str(self.every)]
+
+    def __repr__(self) -> str:
+        return f"FrameOutputPolicy(format={self.format!r}, quality={self.quality}, every={self.every})"
+
+
+class AsyncFrameWriter:
+    """
+    后台线程池写出逐帧标注图片，追踪循环只负责提交，不等待磁盘 I/O
+
+    同时在途的写入数有上限（超过时 submit 阻塞），避免写盘跟不上时内存无限增长。
+    """
+
+    def __init__(self, output_dir: Path, policy: FrameOutputPolicy, workers: int = 2, max_pending: int = 16):
+        self.output_dir = Path(output_dir)
+        self.policy = policy
+        self.saved_count = 0
+        self.error: Optional[BaseException] = None
+        self._max_pending = max(1, max_pending)
+        self._slots = threading.BoundedSemaphore(self._max_pending)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='frame-writer') \
+            if policy.enabled else None
+
+    def __enter__(self) -> 'AsyncFrameWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._shutdown()  # 已有异常在传播，不再抛出写入错误
+        else:
+            self.close()
+        return False
+
+    def submit(self, frame_idx: int, stem: str, image: np.ndarray):
+        """
+        按输出策略提交一帧，调用方之后不能再修改 image
+
+        Args:
+            frame_idx: 帧序号（从 1 开始）
+            stem: 文件名（不含扩展名）
+            image: BGR 图像
+        """
+        if self._executor is None or not self.policy.should_save(frame_idx):
+            return
+        if self.error is not None:
+            raise self.error
+
+        self._slots.acquire()
+        path = self.output_dir / f"{stem}{self.policy.suffix}"
+        self._executor.submit(self._write, path, image)
+
+    def flush(self):
+        """等待已提交的写入全部完成（不关闭线程池）；若有写入失败则抛出第一个错误"""
+        # 占满全部名额即说明没有在途的写入
+        for _ in range(self._max_pending):
+            self._slots.acquire()
+        for _ in range(self._max_pending):
+            self._slots.release()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """等待所有写入完成；若有写入失败则抛出第一个错误"""
+        self._shutdown()
+        if self.error is not None:
+            raise self.error
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _write(self, path: Path, image: np.ndarray):
+        try:
+            if not cv2.imwrite(str(path), image, self.policy.imwrite_params()):
+                raise IOError(f"写入图片失败: {path}")
+            with self._lock:
+                self.saved_count += 1
+        except BaseException as e:
+            with self._lock:
+                if self.error is None:
+                    self.error = e
+        finally:
+            self._slots.release()
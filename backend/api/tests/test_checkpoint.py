@@ -0,0 +1,165 @@
+"""
+追踪检查点：中断后恢复的运行与不中断的运行结果一致
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from django.test import SimpleTestCase
+
+from api.services.checkpoint import TrackingCheckpoint
+from api.services.convert_results import iter_video_frames, run_tracking_on_video
+from api.services.detection_cache import DetectionCache
+from api.services.writers import FrameOutputPolicy, VideoEncoding, concat_backend
+
+WIDTH, HEIGHT = 160, 96
+FRAMES = 30
+INTERVAL = 8
+
+
+class _Interrupted(Exception):
+    """模拟处理进程在中途退出"""
+
+
+def _object_boxes(index: int) -> list:
+    """两个匀速移动的目标"""
+    return [
+        (10 + 3 * index, 20, 30 + 3 * index, 40, 0),
+        (120 - 2 * index, 50, 140 - 2 * index, 74, 1),
+    ]
+
+
+def _write_video(path: Path):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 10, (WIDTH, HEIGHT))
+    for index in range(FRAMES):
+        frame = np.full((HEIGHT, WIDTH, 3), 40, dtype=np.uint8)
+        for x1, y1, x2, y2, cls in _object_boxes(index):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (200, 200 - 100 * cls, 50), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def _write_detection_cache(video_path: Path, cache: DetectionCache):
+    """用已知的目标位置代替推理，生成检测结果缓存（回放时不需要模型）"""
+    def detections():
+        for index, stem, img in iter_video_frames(str(video_path)):
+            boxes = _object_boxes(index)
+            det = torch.tensor([[x1, y1, x2, y2, 0.9, cls] for x1, y1, x2, y2, cls in boxes], dtype=torch.float32)
+            masks = np.zeros((len(boxes), HEIGHT, WIDTH), dtype=bool)
+            for i, (x1, y1, x2, y2, _) in enumerate(boxes):
+                masks[i, y1:y2, x1:x2] = True
+            yield index, stem, img, det, masks
+
+    for _ in cache.record(detections()):
+        pass
+
+
+def _decoded_frames(path: Path) -> list:
+    cap = cv2.VideoCapture(str(path))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+@unittest.skipIf(concat_backend() is None, '拼接视频分段需要 ffmpeg 或 PyAV')
+class CheckpointRoundTripTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = Path(tempfile.mkdtemp())
+        cls.video_path = cls.tmp_dir / 'video.mp4'
+        _write_video(cls.video_path)
+        cls.cache = DetectionCache(cls.tmp_dir / 'detections.npz', 'test')
+        _write_detection_cache(cls.video_path, cls.cache)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def _run(self, name: str, checkpoint: TrackingCheckpoint = None, stop_at: int = None) -> Path:
+        def on_progress(current, total):
+            if current == stop_at:
+                raise _Interrupted()
+
+        output_dir, processed = run_tracking_on_video(
+            None, str(self.video_path), str(self.tmp_dir / name),
+            fps=10,
+            progress_callback=on_progress,
+            frame_output=FrameOutputPolicy('png'),
+            detection_cache=self.cache,
+            video_encoding=VideoEncoding('cv2'),
+            checkpoint=checkpoint
+        )
+        self.assertEqual(processed, FRAMES)
+        return output_dir
+
+    def _checkpoint(self, name: str) -> TrackingCheckpoint:
+        return TrackingCheckpoint(self.tmp_dir / name, {'video': 'test'}, INTERVAL)
+
+    def assertSameOutputs(self, a: Path, b: Path, video: bool = True):
+        self.assertEqual((a / 'tracking_results_mot.txt').read_text(), (b / 'tracking_results_mot.txt').read_text())
+        np.testing.assert_array_equal(np.load(a / 'tracking_mask_areas.npy'), np.load(b / 'tracking_mask_areas.npy'))
+        labels = sorted(p.name for p in (a / 'labels').iterdir())
+        self.assertEqual(labels, sorted(p.name for p in (b / 'labels').iterdir()))
+        self.assertEqual(len(labels), FRAMES)
+        for name in labels:
+            self.assertEqual((a / 'labels' / name).read_text(), (b / 'labels' / name).read_text(), name)
+        images = sorted(p.name for p in a.glob('*.png'))
+        self.assertEqual(len(images), FRAMES)
+        for name in images:
+            np.testing.assert_array_equal(cv2.imread(str(a / name)), cv2.imread(str(b / name)), name)
+        if video:
+            frames_a = _decoded_frames(a / 'tracking_result.mp4')
+            frames_b = _decoded_frames(b / 'tracking_result.mp4')
+            self.assertEqual(len(frames_a), FRAMES)
+            self.assertEqual(len(frames_b), FRAMES)
+            for i, (frame_a, frame_b) in enumerate(zip(frames_a, frames_b)):
+                np.testing.assert_array_equal(frame_a, frame_b, f'frame {i}')
+
+    def test_resume_matches_uninterrupted_run(self):
+        uninterrupted = self._run('uninterrupted', self._checkpoint('ckpt-uninterrupted'))
+        self.assertFalse((self.tmp_dir / 'ckpt-uninterrupted').exists())
+
+        checkpoint = self._checkpoint('ckpt-resumed')
+        # 第 2 个检查点（16 帧）之后、第 3 个之前中断
+        with self.assertRaises(_Interrupted):
+            self._run('resumed', checkpoint, stop_at=2 * INTERVAL + 3)
+        state = checkpoint.load()
+        self.assertEqual(state['frame_idx'], 2 * INTERVAL)
+        self.assertEqual(state['parts'], 2)
+
+        resumed = self._run('resumed', self._checkpoint('ckpt-resumed'))
+
+        self.assertFalse((self.tmp_dir / 'ckpt-resumed').exists())
+        self.assertSameOutputs(uninterrupted, resumed)
+
+    def test_interrupt_right_after_checkpoint(self):
+        uninterrupted = self._run('plain')
+
+        with self.assertRaises(_Interrupted):
+            self._run('edge', self._checkpoint('ckpt-edge'), stop_at=INTERVAL + 1)
+        resumed = self._run('edge', self._checkpoint('ckpt-edge'))
+
+        # 分段编码的视频与不分段的编码不同，只比较追踪结果和逐帧图片
+        self.assertSameOutputs(uninterrupted, resumed, video=False)
+        self.assertEqual(len(_decoded_frames(resumed / 'tracking_result.mp4')), FRAMES)
+
+    def test_changed_fingerprint_starts_over(self):
+        with self.assertRaises(_Interrupted):
+            self._run('changed', self._checkpoint('ckpt-changed'), stop_at=INTERVAL + 3)
+
+        changed = TrackingCheckpoint(self.tmp_dir / 'ckpt-changed', {'video': 'other'}, INTERVAL)
+        self.assertIsNone(changed.load())
+        self.assertFalse((self.tmp_dir / 'ckpt-changed').exists())
@@ -0,0 +1,147 @@
+"""
+分块并行处理：分块规划与跨块轨迹拼接
+"""
+
+from django.test import SimpleTestCase
+
+from api.services.chunked import Chunk, plan_chunks, stitch_chunk_tracks
+
+
+def _box(x: float, y: float = 0.0, size: float = 10.0) -> list:
+    return [x, y, x + size, y + size]
+
+
+class PlanChunksTests(SimpleTestCase):
+
+    def test_overlap_frames_belong_to_previous_chunk(self):
+        frames = list(range(0, 60, 2))
+        chunks = plan_chunks(frames, workers=3, overlap=4)
+
+        self.assertEqual([c.overlap for c in chunks], [0, 4, 4])
+        self.assertEqual(chunks[0].frames, frames[:10])
+        self.assertEqual(chunks[1].frames, frames[6:20])
+        self.assertEqual(chunks[2].frames, frames[16:])
+        for prev, cur in zip(chunks, chunks[1:]):
+            self.assertEqual(cur.frames[:cur.overlap], prev.frames[-cur.overlap:])
+        # 去掉重叠帧后各块恰好覆盖全部帧一次
+        self.assertEqual([f for c in chunks for f in c.frames[c.overlap:]], frames)
+
+    def test_overlap_clamped_to_smallest_chunk(self):
+        frames = list(range(10))
+        chunks = plan_chunks(frames, workers=4, overlap=100)
+
+        smallest = min(len(c.frames) - c.overlap for c in chunks)
+        self.assertEqual(smallest, 2)
+        self.assertEqual([c.overlap for c in chunks], [0, 2, 2, 2])
+        for prev, cur in zip(chunks, chunks[1:]):
+            self.assertEqual(cur.frames[:cur.overlap], prev.frames[-cur.overlap:])
+
+    def test_workers_clamped_to_frame_count(self):
+        chunks = plan_chunks([5, 6, 7], workers=8, overlap=3)
+
+        self.assertEqual([c.frames for c in chunks], [[5], [5, 6], [6, 7]])
+        self.assertEqual([c.overlap for c in chunks], [0, 1, 1])
+
+    def test_negative_overlap_means_no_overlap(self):
+        chunks = plan_chunks(list(range(6)), workers=2, overlap=-1)
+
+        self.assertEqual([c.frames for c in chunks], [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual([c.overlap for c in chunks], [0, 0])
+
+
+class StitchChunkTracksTests(SimpleTestCase):
+
+    def setUp(self):
+        # 30 帧分 3 块，重叠 4 帧：块 0 = 0-9，块 1 = 6-19，块 2 = 16-29
+        self.chunks = plan_chunks(list(range(30)), workers=3, overlap=4)
+
+    def _tracks(self, chunk: Chunk, track_id: int, frames, x=lambda f: f, y: float = 0.0, cls: int = 0) -> dict:
+        return {f: [(_box(x(f), y), track_id, cls, None)] for f in chunk.frames if f in frames}
+
+    @staticmethod
+    def _merge(*parts: dict) -> dict:
+        merged = {}
+        for part in parts:
+            for index, tracks in part.items():
+                merged.setdefault(index, []).extend(tracks)
+        return merged
+
+    def test_track_continues_across_two_boundaries(self):
+        c0, c1, c2 = self.chunks
+        chunk_tracks = [
+            self._tracks(c0, 11, range(30)),
+            self._tracks(c1, 3, range(30)),
+            self._tracks(c2, 42, range(30)),
+        ]
+
+        merged = stitch_chunk_tracks(self.chunks, chunk_tracks)
+
+        self.assertEqual(sorted(merged), list(range(30)))
+        self.assertEqual({t[1] for tracks in merged.values() for t in tracks}, {1})
+
+    def test_overlap_output_comes_from_previous_chunk(self):
+        c0, c1, _ = self.chunks
+        chunk_tracks = [
+            self._tracks(c0, 1, range(30)),
+            # 块 1 在重叠帧上的框略有偏移，输出仍取块 0 的框
+            self._tracks(c1, 1, range(30), x=lambda f: f + 1),
+            {},
+        ]
+
+        merged = stitch_chunk_tracks(self.chunks, chunk_tracks)
+
+        for index in c1.frames[:c1.overlap]:
+            self.assertEqual(merged[index], [(_box(index), 1, 0, None)])
+        self.assertEqual(merged[c1.frames[c1.overlap]], [(_box(c1.frames[c1.overlap] + 1), 1, 0, None)])
+
+    def test_track_only_in_overlap_gets_no_global_id(self):
+        c0, c1, c2 = self.chunks
+        overlap_frames = c1.frames[:c1.overlap]
+        chunk_tracks = [
+            self._tracks(c0, 1, range(30)),
+            # 块 1 在重叠帧上多检测到一个只存在于重叠区的目标 7
+            self._merge(self._tracks(c1, 2, range(30)),
+                        self._tracks(c1, 7, overlap_frames, y=200.0)),
+            self._merge(self._tracks(c2, 5, range(30)),
+                        # 块 2 中新出现的目标（不在重叠帧内）
+                        self._tracks(c2, 9, range(24, 30), y=400.0, cls=1)),
+        ]
+
+        merged = stitch_chunk_tracks(self.chunks, chunk_tracks)
+
+        for index in overlap_frames:
+            self.assertEqual([t[1] for t in merged[index]], [1])
+        self.assertEqual({t[1] for f in range(24) for t in merged[f]}, {1})
+        # 只在重叠区出现的目标没有占用全局 ID，新目标拿到下一个 ID
+        for index in range(24, 30):
+            self.assertEqual(sorted((t[1], t[2]) for t in merged[index]), [(1, 0), (2, 1)])
+
+    def test_unmatched_tracks_get_new_ids(self):
+        c0, c1, c2 = self.chunks
+        chunk_tracks = [
+            self._tracks(c0, 1, range(30)),
+            # 块 1 的目标与块 0 的不重叠，是一条新轨迹
+            self._tracks(c1, 1, range(30), y=300.0),
+            self._tracks(c2, 1, range(30), y=300.0),
+        ]
+
+        merged = stitch_chunk_tracks(self.chunks, chunk_tracks)
+
+        self.assertEqual({t[1] for f in range(10) for t in merged[f]}, {1})
+        self.assertEqual({t[1] for f in range(10, 30) for t in merged[f]}, {2})
+
+    def test_each_previous_id_is_inherited_once(self):
+        c0, c1, _ = self.chunks
+        chunk_tracks = [
+            self._tracks(c0, 1, range(30)),
+            # 块 1 的两条轨迹在重叠帧上都与同一条上一块轨迹重叠（IoU 均超过阈值），
+            # 只有重叠更大的一条继承其 ID，另一条分配新 ID
+            self._merge(self._tracks(c1, 4, range(30), x=lambda f: f + 2),
+                        self._tracks(c1, 5, range(30))),
+            {},
+        ]
+
+        merged = stitch_chunk_tracks(self.chunks, chunk_tracks)
+
+        for index in range(10, 20):
+            self.assertEqual(sorted((t[0][0] - index, t[1]) for t in merged[index]), [(0, 1), (2, 2)])
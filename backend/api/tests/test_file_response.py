@@ -0,0 +1,139 @@
+"""
+Range / 条件请求的文件响应
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+
+from api.services.file_response import file_etag, parse_range, ranged_file_response
+
+CONTENT = bytes(range(256)) * 40    # 10240 字节
+
+
+class RangedFileResponseTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.path = self.tmp_dir / 'result.mp4'
+        self.path.write_bytes(CONTENT)
+        # 固定修改时间，便于构造早于 / 晚于文件的日期
+        self.mtime = 1_700_000_000
+        os.utime(self.path, (self.mtime, self.mtime))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _get(self, **headers):
+        request = self.factory.get('/video/', **headers)
+        response = ranged_file_response(request, self.path, 'video/mp4', 'result.mp4', as_attachment=False)
+        self.addCleanup(response.close)
+        return response
+
+    @staticmethod
+    def _body(response) -> bytes:
+        return b''.join(response.streaming_content)
+
+    def test_full_response_without_range(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], file_etag(self.path))
+
+    def test_open_ended_range(self):
+        response = self._get(HTTP_RANGE='bytes=0-')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-{len(CONTENT) - 1}/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_middle_range(self):
+        response = self._get(HTTP_RANGE='bytes=100-299')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-299/{len(CONTENT)}')
+        self.assertEqual(self._body(response), CONTENT[100:300])
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+    def test_suffix_range(self):
+        response = self._get(HTTP_RANGE='bytes=-500')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes {len(CONTENT) - 500}-{len(CONTENT) - 1}/{len(CONTENT)}')
+        self.assertEqual(self._body(response), CONTENT[-500:])
+
+    def test_suffix_range_longer_than_file(self):
+        response = self._get(HTTP_RANGE=f'bytes=-{len(CONTENT) * 2}')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_end_past_eof_is_clamped(self):
+        response = self._get(HTTP_RANGE=f'bytes=10000-{len(CONTENT) * 2}')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10000-{len(CONTENT) - 1}/{len(CONTENT)}')
+        self.assertEqual(self._body(response), CONTENT[10000:])
+
+    def test_start_past_eof_is_unsatisfiable(self):
+        response = self._get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_matching_if_none_match_is_not_modified(self):
+        response = self._get(HTTP_IF_NONE_MATCH=f'"other", {file_etag(self.path)}', HTTP_RANGE='bytes=0-99')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], file_etag(self.path))
+
+    def test_stale_if_none_match_returns_file(self):
+        response = self._get(HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_if_modified_since(self):
+        self.assertEqual(self._get(HTTP_IF_MODIFIED_SINCE=http_date(self.mtime)).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_MODIFIED_SINCE=http_date(self.mtime - 60)).status_code, 200)
+
+    def test_matching_if_range_returns_partial(self):
+        response = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=file_etag(self.path))
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self._body(response), CONTENT[:10])
+
+    def test_stale_if_range_etag_returns_full_file(self):
+        response = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), CONTENT)
+
+    def test_stale_if_range_date_returns_full_file(self):
+        response = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=http_date(self.mtime - 60))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._body(response), CONTENT)
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_unsupported_ranges_fall_back_to_full_file(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-', 'bytes=a-b'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=100-', 'bytes=50-10', 'bytes=-0'):
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 100)
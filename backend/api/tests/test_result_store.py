@@ -0,0 +1,129 @@
+"""
+列式结果存储：与 MOT 文件及旧版 result.json 的数值一致
+"""
+
+import csv
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.services.result_store import (LEGACY_RESULT_NAME, ResultStore, TRACK_FIELDS, read_label_columns,
+                                       read_mot_columns, write_result_store)
+
+MOT_ROWS = [
+    # frame, track_id, bb_left, bb_top, bb_width, bb_height, conf, class, visibility
+    '1,1,123.45,17.33,20.0,31.35,1.0,0,1',
+    '1,2,0.1,0.2,10.3,10.7,0.87,1,1',
+    '2,1,124.01,18.9,20.11,30.2,1.0,0,1',
+    '2,2,1.37,2.68,9.99,11.01,0.93,1,1',
+    '3,1,125.6,20.01,19.87,29.93,1.0,0,1',
+]
+
+
+def _legacy_tracking_data(mot_path: Path) -> list:
+    """旧版 result.json 中 tracking_data 的生成方式（逐行解析 MOT 文件）"""
+    tracking_data = []
+    with open(mot_path, 'r') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            parts = line.strip().split(',')
+            tracking_data.append({
+                'frame': int(parts[0]),
+                'track_id': int(parts[1]),
+                'bb_left': float(parts[2]),
+                'bb_top': float(parts[3]),
+                'bb_width': float(parts[4]),
+                'bb_height': float(parts[5]),
+                'conf': float(parts[6]),
+                'class': int(parts[7]),
+                'visibility': float(parts[8])
+            })
+    return tracking_data
+
+
+class ResultStoreValueTests(SimpleTestCase):
+
+    def setUp(self):
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=str(self.media_root))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.output_dir = self.media_root / 'tasks' / 'task-1' / 'output'
+        (self.output_dir / 'labels').mkdir(parents=True)
+        self.mot_path = self.output_dir / 'tracking_results_mot.txt'
+        self.mot_path.write_text('# MOT format\n' + '\n'.join(MOT_ROWS) + '\n')
+        self.expected = _legacy_tracking_data(self.mot_path)
+        self.client = APIClient()
+
+    def _write_store(self, columns=None) -> ResultStore:
+        task_dir = self.output_dir.parent
+        if columns is None:
+            columns = read_mot_columns(self.mot_path)
+            columns.update(read_label_columns(self.output_dir / 'labels'))
+        write_result_store(task_dir, {'task_id': 'task-1', 'total_detections': len(MOT_ROWS)}, columns)
+        return ResultStore(task_dir)
+
+    def test_result_api_matches_legacy_tracking_data(self):
+        self._write_store()
+
+        response = self.client.get('/api/result/task-1/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tracking_data'], self.expected)
+
+    def test_exports_keep_mot_values(self):
+        self._write_store()
+
+        response = self.client.get('/api/export/task-1/', {'format': 'csv', 'gzip': '0', 'fields': ','.join(TRACK_FIELDS)})
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([{k: float(v) for k, v in row.items()} for row in rows],
+                         [{k: float(v) for k, v in row.items()} for row in self.expected])
+        self.assertIn('123.45', body)
+        self.assertNotIn('123.4499', body)
+
+        response = self.client.get('/api/export/task-1/', {'format': 'json', 'gzip': '0', 'fields': ','.join(TRACK_FIELDS)})
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected)
+
+    def test_cell_positions_use_exact_boxes(self):
+        store = self._write_store()
+
+        frames = store.cell_frames(store.track_rows(1))
+
+        self.assertEqual(frames[0]['bounding_box'], {'x': 123.45, 'y': 17.33, 'width': 20.0, 'height': 31.35})
+        self.assertEqual(frames[0]['position'], {'x': 123.45 + 20.0 / 2, 'y': 17.33 + 31.35 / 2})
+        self.assertEqual(frames[1]['velocity']['vx'], (124.01 + 20.11 / 2) - (123.45 + 20.0 / 2))
+        self.assertEqual(frames[0]['area'], 20.0 * 31.35)
+
+        response = self.client.get('/api/cell/task-1/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(json.dumps(frames[0]['position']['y']), response.content.decode('utf-8'))
+
+    def test_float32_store_from_earlier_version(self):
+        columns = read_mot_columns(self.mot_path)
+        for name in ('bbox', 'conf', 'visibility'):
+            columns[name] = columns[name].astype(np.float32)
+        store = self._write_store(columns)
+
+        self.assertEqual(store.tracking_data(), self.expected)
+
+    def test_legacy_result_json(self):
+        task_dir = self.output_dir.parent
+        (task_dir / LEGACY_RESULT_NAME).write_text(json.dumps({'task_id': 'task-1', 'tracking_data': self.expected,
+                                                               'frame_labels': {}}))
+        store = ResultStore(task_dir)
+
+        self.assertEqual(store.to_result()['tracking_data'], self.expected)
+        self.assertEqual(store.field_values('bb_left'), [r['bb_left'] for r in self.expected])
+        self.assertEqual(store.field_values('conf'), [r['conf'] for r in self.expected])
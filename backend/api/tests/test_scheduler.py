@@ -0,0 +1,263 @@
+"""
+有界任务调度器
+"""
+
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from api.services.scheduler import CANCELLED, PREEMPTED, Job, JobCancelled, JobScheduler, QueueFullError
+
+TIMEOUT = 5
+
+
+def _wait_until(predicate, timeout: float = TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+class _Probe:
+    """记录任务的运行情况；运行后阻塞到 release，期间在检查点响应取消 / 抢占"""
+
+    def __init__(self, log: list):
+        self.log = log
+        self.release = threading.Event()
+        self.runs = 0
+        self.stopped = []
+        self.finished = 0
+
+    def __call__(self, job):
+        self.runs += 1
+        self.log.append(job.task_id)
+        try:
+            while not self.release.wait(0.005):
+                job.check_cancelled()
+        except JobCancelled as e:
+            self.stopped.append(e.reason)
+            raise
+        self.finished += 1
+
+
+class SchedulerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.log = []
+        self.probes = {}
+
+    def tearDown(self):
+        # 放行所有任务，执行线程回到等待状态（daemon 线程随进程退出）
+        for probe in self.probes.values():
+            probe.release.set()
+
+    def submit(self, scheduler: JobScheduler, task_id: str, model_name: str = 'a.pt', priority: int = 0) -> int:
+        probe = self.probes[task_id] = _Probe(self.log)
+        return scheduler.submit(task_id, model_name, probe, priority=priority)
+
+    def assertRunning(self, scheduler: JobScheduler, task_ids):
+        self.assertTrue(_wait_until(lambda: set(scheduler.running) == set(task_ids)),
+                        f'running={sorted(scheduler.running)}, expected={sorted(task_ids)}')
+
+    def finish(self, scheduler: JobScheduler, task_id: str):
+        self.probes[task_id].release.set()
+        self.assertTrue(_wait_until(lambda: task_id not in scheduler.running))
+
+
+class AdmissionTests(SchedulerTestCase):
+
+    def test_per_model_limit_skips_to_other_model(self):
+        scheduler = JobScheduler(max_concurrent=2, max_per_model=1, preemption=False)
+
+        self.submit(scheduler, 'a1', 'a.pt')
+        self.assertRunning(scheduler, ['a1'])
+        self.assertEqual(self.submit(scheduler, 'a2', 'a.pt'), 1)
+        # a.pt 已满：后入队的 b.pt 任务越过 a2 先运行
+        self.submit(scheduler, 'b1', 'b.pt')
+        self.assertRunning(scheduler, ['a1', 'b1'])
+        self.assertEqual(scheduler.queue_position('a2'), 1)
+        self.assertEqual(scheduler.stats()['running_per_model'], {'a.pt': 1, 'b.pt': 1})
+
+        self.finish(scheduler, 'a1')
+        self.assertRunning(scheduler, ['a2', 'b1'])
+        self.assertIsNone(scheduler.queue_position('a2'))
+
+    def test_per_model_limit_above_one(self):
+        scheduler = JobScheduler(max_concurrent=3, max_per_model=2, preemption=False)
+
+        for task_id in ('a1', 'a2', 'a3'):
+            self.submit(scheduler, task_id, 'a.pt')
+
+        self.assertRunning(scheduler, ['a1', 'a2'])
+        self.assertEqual(scheduler.queue_position('a3'), 1)
+
+    def test_concurrency_limit(self):
+        scheduler = JobScheduler(max_concurrent=2, max_per_model=2, preemption=False)
+
+        self.submit(scheduler, 'a1', 'a.pt')
+        self.submit(scheduler, 'b1', 'b.pt')
+        self.submit(scheduler, 'c1', 'c.pt')
+
+        self.assertRunning(scheduler, ['a1', 'b1'])
+        self.assertEqual(scheduler.queue_position('c1'), 1)
+        self.finish(scheduler, 'b1')
+        self.assertRunning(scheduler, ['a1', 'c1'])
+
+    def test_priority_then_fifo_order(self):
+        scheduler = JobScheduler(max_concurrent=1, preemption=False)
+        self.submit(scheduler, 'blocker')
+        self.assertRunning(scheduler, ['blocker'])
+
+        self.submit(scheduler, 'low-1', priority=0)
+        self.submit(scheduler, 'low-2', priority=0)
+        self.assertEqual(self.submit(scheduler, 'high', priority=5), 1)
+        self.assertEqual(scheduler.queue_position('low-2'), 3)
+
+        for task_id in ('blocker', 'high', 'low-1'):
+            self.finish(scheduler, task_id)
+        self.finish(scheduler, 'low-2')
+        self.assertEqual(self.log, ['blocker', 'high', 'low-1', 'low-2'])
+
+    def test_queue_limit_and_duplicates(self):
+        scheduler = JobScheduler(max_concurrent=1, max_queue=1, preemption=False)
+        self.submit(scheduler, 'running')
+        self.assertRunning(scheduler, ['running'])
+        self.submit(scheduler, 'queued')
+
+        with self.assertRaises(QueueFullError):
+            self.submit(scheduler, 'overflow')
+        with self.assertRaises(ValueError):
+            scheduler.submit('running', 'a.pt', lambda job: None)
+        with self.assertRaises(ValueError):
+            scheduler.submit('queued', 'a.pt', lambda job: None)
+
+    def test_failing_job_releases_slot(self):
+        scheduler = JobScheduler(max_concurrent=1, preemption=False)
+
+        def fail(job):
+            raise RuntimeError('boom')
+
+        scheduler.submit('fails', 'a.pt', fail)
+        self.submit(scheduler, 'next')
+
+        self.assertRunning(scheduler, ['next'])
+        self.assertEqual(scheduler.stats()['running_per_model'], {'a.pt': 1})
+
+
+class CancelAndPreemptionTests(SchedulerTestCase):
+
+    def test_higher_priority_preempts_and_victim_is_requeued(self):
+        scheduler = JobScheduler(max_concurrent=1)
+        self.submit(scheduler, 'low', priority=0)
+        self.assertRunning(scheduler, ['low'])
+
+        self.submit(scheduler, 'high', priority=5)
+
+        self.assertRunning(scheduler, ['high'])
+        self.assertEqual(self.probes['low'].stopped, [PREEMPTED])
+        self.assertEqual(scheduler.queue_position('low'), 1)
+
+        self.finish(scheduler, 'high')
+        self.assertRunning(scheduler, ['low'])
+        self.assertEqual(scheduler.running['low'].preemptions, 1)
+        self.finish(scheduler, 'low')
+        self.assertEqual(self.log, ['low', 'high', 'low'])
+        self.assertEqual(self.probes['low'].finished, 1)
+
+    def test_requeued_job_keeps_its_place(self):
+        scheduler = JobScheduler(max_concurrent=1)
+        self.submit(scheduler, 'first', priority=0)
+        self.assertRunning(scheduler, ['first'])
+        self.submit(scheduler, 'second', priority=0)
+
+        self.submit(scheduler, 'urgent', priority=5)
+        self.assertRunning(scheduler, ['urgent'])
+
+        # 被抢占的任务保留原序号，仍排在同优先级的后来者之前
+        self.assertEqual(scheduler.queue_position('first'), 1)
+        self.assertEqual(scheduler.queue_position('second'), 2)
+
+    def test_preempts_lowest_priority_of_the_same_model(self):
+        scheduler = JobScheduler(max_concurrent=3, max_per_model=1)
+        self.submit(scheduler, 'a-low', 'a.pt', priority=1)
+        self.submit(scheduler, 'b-lowest', 'b.pt', priority=0)
+        self.assertRunning(scheduler, ['a-low', 'b-lowest'])
+
+        # 还有空闲执行线程，但 a.pt 已满：只能抢占 a.pt 的任务
+        self.submit(scheduler, 'a-high', 'a.pt', priority=5)
+
+        self.assertRunning(scheduler, ['a-high', 'b-lowest'])
+        self.assertEqual(self.probes['a-low'].stopped, [PREEMPTED])
+        self.assertEqual(self.probes['b-lowest'].stopped, [])
+
+    def test_no_preemption_for_equal_priority_or_when_disabled(self):
+        for preemption, priority in ((True, 0), (False, 5)):
+            with self.subTest(preemption=preemption, priority=priority):
+                self.log.clear()
+                scheduler = JobScheduler(max_concurrent=1, preemption=preemption)
+                self.submit(scheduler, 'running')
+                self.assertRunning(scheduler, ['running'])
+
+                self.submit(scheduler, 'waiting', priority=priority)
+
+                time.sleep(0.05)
+                self.assertRunning(scheduler, ['running'])
+                self.assertEqual(self.probes['running'].stopped, [])
+                self.finish(scheduler, 'running')
+                self.finish(scheduler, 'waiting')
+
+    def test_cancel_queued_job_never_runs(self):
+        scheduler = JobScheduler(max_concurrent=1, preemption=False)
+        self.submit(scheduler, 'running')
+        self.assertRunning(scheduler, ['running'])
+        self.submit(scheduler, 'queued')
+
+        self.assertTrue(scheduler.cancel('queued'))
+
+        self.assertIsNone(scheduler.queue_position('queued'))
+        self.finish(scheduler, 'running')
+        time.sleep(0.05)
+        self.assertEqual(self.probes['queued'].runs, 0)
+        self.assertFalse(scheduler.cancel('queued'))
+
+    def test_cancel_running_job_stops_at_checkpoint(self):
+        scheduler = JobScheduler(max_concurrent=1)
+        self.submit(scheduler, 'job')
+        self.assertRunning(scheduler, ['job'])
+
+        self.assertTrue(scheduler.cancel('job'))
+
+        self.assertRunning(scheduler, [])
+        self.assertEqual(self.probes['job'].stopped, [CANCELLED])
+        self.assertIsNone(scheduler.queue_position('job'))
+        self.assertEqual(scheduler.stats()['running_per_model'], {})
+
+    def test_cancel_overrides_pending_preemption(self):
+        scheduler = JobScheduler(max_concurrent=1)
+        self.submit(scheduler, 'low')
+        self.assertRunning(scheduler, ['low'])
+        job = scheduler.running['low']
+
+        # 抢占请求之后又收到取消：停止后不再重新排队
+        job.request_cancel(PREEMPTED)
+        job.request_cancel(CANCELLED)
+        job.request_cancel(PREEMPTED)
+
+        self.assertRunning(scheduler, [])
+        self.assertEqual(self.probes['low'].stopped, [CANCELLED])
+        self.assertIsNone(scheduler.queue_position('low'))
+
+    def test_job_cancelled_reason(self):
+        job = Job('t', 'a.pt', lambda j: None, priority=0, seq=0)
+        job.check_cancelled()
+
+        job.request_cancel(PREEMPTED)
+        with self.assertRaises(JobCancelled) as ctx:
+            job.check_cancelled()
+        self.assertEqual(ctx.exception.reason, PREEMPTED)
+
+        job._reset()
+        job.check_cancelled()
@@ -0,0 +1,160 @@
+"""
+持久化的任务状态：取消请求的比较并设置、进度写入与推送的限流
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+
+from api.models import TaskState
+from api.services import task_state
+from api.services.scheduler import JobCancelled
+from api.services.task_state import ProgressReporter, request_cancel
+
+
+class RequestCancelTests(TestCase):
+
+    def _task(self, status: str, task_id: str = 'task-1') -> str:
+        TaskState.objects.create(task_id=task_id, status=status, worker=task_state.WORKER_ID)
+        return task_id
+
+    def _status(self, task_id: str) -> str:
+        return TaskState.objects.get(task_id=task_id).status
+
+    def test_queued_task_is_cancelled_immediately(self):
+        task_id = self._task(TaskState.QUEUED)
+
+        self.assertEqual(request_cancel(task_id), TaskState.CANCELLED)
+
+        state = TaskState.objects.get(task_id=task_id)
+        self.assertEqual(state.status, TaskState.CANCELLED)
+        self.assertEqual(state.stage, 'cancelled')
+        self.assertIsNotNone(state.cancelled_at)
+
+    def test_processing_task_becomes_cancelling(self):
+        task_id = self._task(TaskState.PROCESSING)
+
+        self.assertEqual(request_cancel(task_id), TaskState.CANCELLING)
+
+        state = TaskState.objects.get(task_id=task_id)
+        self.assertEqual(state.status, TaskState.CANCELLING)
+        self.assertIsNone(state.cancelled_at)
+
+    def test_repeated_cancel_is_idempotent(self):
+        task_id = self._task(TaskState.PROCESSING)
+        request_cancel(task_id)
+
+        self.assertEqual(request_cancel(task_id), TaskState.CANCELLING)
+        self.assertEqual(self._status(task_id), TaskState.CANCELLING)
+
+    def test_finished_or_missing_task_is_not_cancelled(self):
+        for status in (TaskState.UPLOADED, TaskState.COMPLETED, TaskState.FAILED, TaskState.CANCELLED):
+            with self.subTest(status=status):
+                task_id = self._task(status, task_id=f'task-{status}')
+                self.assertIsNone(request_cancel(task_id))
+                self.assertEqual(self._status(task_id), status)
+        self.assertIsNone(request_cancel('missing'))
+
+    def test_transition_only_from_expected_status(self):
+        task_id = self._task(TaskState.QUEUED)
+
+        # 执行线程与取消请求竞争：只有一方的比较并设置成功
+        self.assertTrue(task_state.transition_task(task_id, [TaskState.QUEUED], status=TaskState.PROCESSING))
+        self.assertFalse(task_state.transition_task(task_id, [TaskState.QUEUED], status=TaskState.CANCELLED))
+        self.assertEqual(request_cancel(task_id), TaskState.CANCELLING)
+
+    def test_worker_sees_cancel_at_next_progress_write(self):
+        task_id = self._task(TaskState.PROCESSING)
+        report = ProgressReporter(task_id, min_interval=0, push_rate=0)
+        report('processing', 10, {'message': 'frame 1'})
+        self.assertEqual(TaskState.objects.get(task_id=task_id).progress, 10)
+
+        # 取消请求可能来自其他工作进程，处理进程在下一次写入进度时发现状态已变化
+        request_cancel(task_id)
+
+        with self.assertRaises(JobCancelled):
+            report('processing', 20, {'message': 'frame 2'})
+        state = TaskState.objects.get(task_id=task_id)
+        self.assertEqual(state.status, TaskState.CANCELLING)
+        self.assertEqual(state.progress, 10)
+
+    def test_scheduler_cancel_check_runs_on_every_call(self):
+        task_id = self._task(TaskState.PROCESSING)
+        calls = []
+
+        def cancel_check():
+            calls.append(1)
+            if len(calls) == 3:
+                raise JobCancelled()
+
+        report = ProgressReporter(task_id, min_interval=60, cancel_check=cancel_check, push_rate=0)
+        report('processing', 1, {})
+        report('processing', 2, {})
+        with self.assertRaises(JobCancelled):
+            report('processing', 3, {})
+
+
+class ProgressReporterTests(TestCase):
+
+    def setUp(self):
+        TaskState.objects.create(task_id='task-1', status=TaskState.PROCESSING, worker=task_state.WORKER_ID)
+        self.now = 100.0
+        self.pushes = []
+        clock = mock.patch.object(task_state.time, 'monotonic', side_effect=lambda: self.now)
+        push = mock.patch.object(task_state, 'broadcast_progress',
+                                 side_effect=lambda task_id, stage, progress, data: self.pushes.append((stage, progress)))
+        clock.start()
+        push.start()
+        self.addCleanup(clock.stop)
+        self.addCleanup(push.stop)
+
+    def _report(self, reporter: ProgressReporter, stage: str, progress: int, at: float):
+        self.now = at
+        reporter(stage, progress, {'message': f'{stage} {progress}'})
+
+    def _progress(self) -> int:
+        return TaskState.objects.get(task_id='task-1').progress
+
+    def test_push_rate_independent_of_db_writes(self):
+        # 每 0.125 秒调用一次并写数据库，每秒最多推送 2 条
+        reporter = ProgressReporter('task-1', min_interval=0.125, push_rate=2)
+        for i in range(1, 21):
+            self._report(reporter, 'processing', i, at=100.0 + i * 0.125)
+
+        self.assertEqual(self._progress(), 20)
+        # 第一次（阶段变化）立即推送，之后每 0.5 秒一条
+        self.assertEqual(self.pushes, [('processing', i) for i in (1, 5, 9, 13, 17)])
+
+    def test_stage_change_and_completion_push_immediately(self):
+        reporter = ProgressReporter('task-1', min_interval=10, push_rate=1)
+        self._report(reporter, 'processing', 10, at=100.0)
+        self._report(reporter, 'processing', 20, at=100.1)
+        self._report(reporter, 'packaging', 0, at=100.2)
+        self._report(reporter, 'packaging', 100, at=100.3)
+
+        self.assertEqual(self.pushes, [('processing', 10), ('packaging', 0), ('packaging', 100)])
+
+    def test_flush_pushes_latest_value_once(self):
+        reporter = ProgressReporter('task-1', min_interval=10, push_rate=1)
+        self._report(reporter, 'processing', 10, at=100.0)
+        self._report(reporter, 'processing', 30, at=100.1)
+        self._report(reporter, 'processing', 50, at=100.2)
+        self.assertEqual(self._progress(), 10)
+
+        self.assertTrue(reporter.flush())
+        self.assertTrue(reporter.flush())
+
+        self.assertEqual(self._progress(), 50)
+        self.assertEqual(self.pushes, [('processing', 10), ('processing', 50)])
+        # flush 也计入推送间隔
+        self._report(reporter, 'processing', 60, at=100.5)
+        self.assertEqual(len(self.pushes), 2)
+
+    def test_push_disabled(self):
+        reporter = ProgressReporter('task-1', min_interval=0, push_rate=0)
+        self._report(reporter, 'processing', 10, at=100.0)
+        self._report(reporter, 'processing', 100, at=101.0)
+        reporter.flush()
+
+        self.assertEqual(self.pushes, [])
+        self.assertEqual(self._progress(), 100)
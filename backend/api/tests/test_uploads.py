@@ -0,0 +1,104 @@
+"""
+分块 / 断点续传上传
+"""
+
+import hashlib
+import io
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from api.services import uploads
+from api.services.uploads import UploadError, UploadSession
+
+DATA = bytes(range(256)) * 64    # 16384 字节
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadSessionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+        self.session = UploadSession.create(self.tmp_dir / 'task-1', 'a.mp4', len(DATA), sha256=_sha256(DATA))
+        self.addCleanup(uploads._hashers.pop, self.session.task_id, None)
+        self.addCleanup(uploads._locks.pop, self.session.task_id, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _put(self, offset: int, data: bytes, chunk_sha256: str = None) -> int:
+        return self.session.write_chunk(offset, io.BytesIO(data), len(data), chunk_sha256=chunk_sha256)
+
+    def test_sequential_upload(self):
+        self.assertEqual(self._put(0, DATA[:4096]), 4096)
+        self.assertEqual(self._put(4096, DATA[4096:], chunk_sha256=_sha256(DATA[4096:])), len(DATA))
+
+        video_path, digest = self.session.finalize()
+
+        self.assertEqual(video_path.read_bytes(), DATA)
+        self.assertEqual(digest, _sha256(DATA))
+        self.assertFalse(self.session.exists())
+        self.assertNotIn(self.session.task_id, uploads._locks)
+
+    def test_gap_is_rejected(self):
+        with self.assertRaises(UploadError) as ctx:
+            self._put(100, DATA[100:200])
+        self.assertEqual(ctx.exception.status_code, 409)
+        self.assertEqual(ctx.exception.offset, 0)
+
+    def test_resent_chunk_with_bad_digest_keeps_received_bytes(self):
+        self._put(0, DATA[:8192])
+        garbage = b'\xff' * 4096
+
+        with self.assertRaises(UploadError) as ctx:
+            self._put(2048, garbage, chunk_sha256=_sha256(DATA[2048:6144]))
+        self.assertEqual(ctx.exception.status_code, 422)
+
+        self.assertEqual(self.session.video_path.read_bytes()[:8192], DATA[:8192])
+        self.assertEqual(self.session.to_dict()['offset'], 8192)
+
+    def test_interrupted_resent_chunk_keeps_received_bytes(self):
+        self._put(0, DATA[:8192])
+        garbage = b'\xff' * 4096
+
+        # 请求体读到 1000 字节时连接中断
+        with self.assertRaises(UploadError):
+            self.session.write_chunk(0, io.BytesIO(garbage[:1000]), len(garbage))
+
+        self.assertEqual(self.session.video_path.read_bytes()[:8192], DATA[:8192])
+
+    def test_resent_chunk_overlapping_tail(self):
+        self._put(0, DATA[:8192])
+        # 重传与已接收区间部分重叠、并继续向后扩展的块
+        self.assertEqual(self._put(4096, DATA[4096:12288], chunk_sha256=_sha256(DATA[4096:12288])), 12288)
+        self._put(12288, DATA[12288:])
+
+        video_path, digest = self.session.finalize()
+
+        self.assertEqual(video_path.read_bytes(), DATA)
+        self.assertEqual(digest, _sha256(DATA))
+
+    def test_finalize_rejects_incomplete_or_corrupt_upload(self):
+        self._put(0, DATA[:8192])
+        with self.assertRaises(UploadError) as ctx:
+            self.session.finalize()
+        self.assertEqual(ctx.exception.status_code, 409)
+
+        self._put(8192, b'\x00' * (len(DATA) - 8192))
+        with self.assertRaises(UploadError) as ctx:
+            self.session.finalize()
+        self.assertEqual(ctx.exception.status_code, 422)
+        self.assertTrue(self.session.exists())
+
+    def test_write_after_finalize(self):
+        self._put(0, DATA)
+        self.session.finalize()
+
+        with self.assertRaises(UploadError) as ctx:
+            self._put(0, DATA[:10])
+        self.assertEqual(ctx.exception.status_code, 404)
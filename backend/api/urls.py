@@ -6,11 +6,20 @@ urlpatterns = [
 
     # 视频处理相关接口
     path('upload/', views.UploadVideoView.as_view(), name='upload_video'),
+    path('upload/init/', views.UploadInitView.as_view(), name='upload_init'),
+    path('upload/<str:task_id>/', views.UploadChunkView.as_view(), name='upload_chunk'),
+    path('upload/<str:task_id>/complete/', views.UploadCompleteView.as_view(), name='upload_complete'),
     path('process/', views.ProcessTaskView.as_view(), name='process_task'),
+    path('cancel/<str:task_id>/', views.CancelTaskView.as_view(), name='cancel_task'),
     path('status/<str:task_id>/', views.TaskStatusView.as_view(), name='task_status'),
     path('result/<str:task_id>/', views.TaskResultView.as_view(), name='task_result'),
     path('video/<str:task_id>/', views.AnnotatedVideoView.as_view(), name='annotated_video'),
     path('delete/<str:task_id>/', views.DeleteTaskView.as_view(), name='delete_task'),
+
+    # 追踪数据查询和导出接口
+    path('cells/<str:task_id>/', views.CellListView.as_view(), name='cell_list'),
+    path('cell/<str:task_id>/<int:cell_id>/', views.CellDetailView.as_view(), name='cell_detail'),
+    path('export/<str:task_id>/', views.ExportView.as_view(), name='export'),
     
     # 任务列表接口
     path('tasks/', views.TaskListView.as_view(), name='task_list'),
@@ -1,23 +1,39 @@
 import os
 import json
 import uuid
-import threading
+import base64
+import hashlib
+import shutil
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
+
+import numpy as np
 
 from django.conf import settings
-from django.http import JsonResponse, FileResponse, HttpResponseNotFound
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.http import JsonResponse, HttpResponseNotFound, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.decorators import api_view
+from rest_framework.negotiation import DefaultContentNegotiation
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 
-from .services.video_processor import get_video_processor
-
+from .models import TaskRecord, TaskState
+from .services.video_processor import MODEL_DIR, get_video_processor
+from .services.model_pool import get_model_pool
+from .services.scheduler import CANCELLED, PREEMPTED, Job, JobCancelled, QueueFullError, get_job_scheduler
+from .services import task_state
+from .services.content_store import ContentStore
+from .services.detection_cache import file_sha256, remember_file_sha256
+from .services.frame_reader import FrameRange
+from .services.exporter import EXPORT_FORMATS, gzip_stream, iter_csv, iter_ndjson
+from .services.file_response import ranged_file_response
+from .services.result_store import QUERY_FIELDS, ResultStore
+from .services.uploads import DEFAULT_CHUNK_SIZE, UploadError, UploadSession
+from .services.writers import FrameOutputPolicy, VideoEncoding
 
-# 全局任务状态存储（生产环境应使用数据库或 Redis）
-task_status = {}
-task_lock = threading.Lock()
 
 
 @api_view(['GET'])
@@ -61,21 +77,15 @@ class UploadVideoView(APIView):
             video_path = task_dir / 'original' / video_file.name
             video_path.parent.mkdir(parents=True, exist_ok=True)
 
+            # 边写边计算内容哈希，写完后纳入内容寻址存储（相同视频只保存一份）
+            hasher = hashlib.sha256()
             with open(video_path, 'wb') as f:
                 for chunk in video_file.chunks():
                     f.write(chunk)
+                    hasher.update(chunk)
 
             # 初始化任务状态
-            with task_lock:
-                task_status[task_id] = {
-                    'task_id': task_id,
-                    'video_name': video_file.name,
-                    'video_path': str(video_path),
-                    'status': 'uploaded',
-                    'progress': 0,
-                    'created_at': datetime.now().isoformat(),
-                    'error': None
-                }
+            _register_uploaded_task(task_id, video_file.name, video_path, hasher.hexdigest())
 
             return Response({
                 'task_id': task_id,
@@ -91,6 +101,121 @@ class UploadVideoView(APIView):
             )
 
 
+def _register_uploaded_task(task_id: str, video_name: str, video_path: Path, video_sha256: str):
+    """视频上传完成后纳入内容存储并登记任务状态（之后才能启动处理）"""
+    ContentStore(settings.MEDIA_ROOT).adopt_video(video_path, video_sha256)
+    remember_file_sha256(video_path, video_sha256)
+    task_state.create_task(task_id, video_name, video_path, video_sha256)
+
+
+def _upload_error_response(e: UploadError) -> Response:
+    body = {'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return Response(body, status=e.status_code)
+
+
+def _get_upload_session(task_id: str) -> Optional[UploadSession]:
+    session = UploadSession(Path(settings.MEDIA_ROOT) / 'tasks' / task_id)
+    return session if session.exists() else None
+
+
+class UploadInitView(APIView):
+    """分块上传：创建上传会话"""
+
+    def post(self, request):
+        """
+        请求体: {"filename": "a.mp4", "size": 总字节数, "sha256": 可选，整个文件的 SHA-256}
+
+        返回 task_id、已接收偏移 (0) 和建议的块大小；之后按偏移 PUT /api/upload/<task_id>/ 上传各块
+        """
+        try:
+            data = json.loads(request.body or b'{}')
+            task_id = str(uuid.uuid4())
+            session = UploadSession.create(
+                Path(settings.MEDIA_ROOT) / 'tasks' / task_id,
+                data.get('filename'),
+                data.get('size'),
+                sha256=data.get('sha256')
+            )
+        except UploadError as e:
+            return _upload_error_response(e)
+        except ValueError as e:
+            return Response({'error': f'请求体不是有效的 JSON: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            **session.to_dict(),
+            'upload_url': f'/api/upload/{task_id}/',
+            'chunk_size': DEFAULT_CHUNK_SIZE
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadChunkView(APIView):
+    """分块上传：查询进度 / 上传一个块"""
+
+    def get(self, request, task_id):
+        """返回已接收的偏移，断点续传时客户端从该偏移继续"""
+        session = _get_upload_session(task_id)
+        if session is None:
+            return Response({'error': '上传会话不存在'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(session.to_dict())
+
+    def put(self, request, task_id):
+        """
+        上传一个块，请求体为原始字节
+
+        请求头:
+            Upload-Offset: 块在文件中的起始字节（也可用查询参数 offset）
+            Content-Length: 块大小
+            X-Chunk-SHA256: 可选，本块的 SHA-256
+        """
+        session = _get_upload_session(task_id)
+        if session is None:
+            return Response({'error': '上传会话不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET', request.query_params.get('offset', '')))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': '缺少或无效的 Upload-Offset / Content-Length'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            received = session.write_chunk(offset, request.stream, length,
+                                           chunk_sha256=request.META.get('HTTP_X_CHUNK_SHA256'))
+        except UploadError as e:
+            return _upload_error_response(e)
+
+        return Response({'task_id': task_id, 'offset': received, 'size': session.state['size']})
+
+
+class UploadCompleteView(APIView):
+    """分块上传：完成上传并校验"""
+
+    def post(self, request, task_id):
+        """请求体: {"sha256": 整个文件的 SHA-256}（init 时已提供则可省略）"""
+        session = _get_upload_session(task_id)
+        if session is None:
+            return Response({'error': '上传会话不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            data = json.loads(request.body or b'{}')
+            video_path, video_sha256 = session.finalize(data.get('sha256'))
+        except UploadError as e:
+            return _upload_error_response(e)
+        except ValueError as e:
+            return Response({'error': f'请求体不是有效的 JSON: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        _register_uploaded_task(task_id, video_path.name, video_path, video_sha256)
+
+        return Response({
+            'task_id': task_id,
+            'video_name': video_path.name,
+            'status': 'uploaded',
+            'message': '视频上传成功'
+        }, status=status.HTTP_201_CREATED)
+
+
 class ProcessTaskView(APIView):
     """启动处理任务接口"""
 
@@ -109,45 +234,113 @@ class ProcessTaskView(APIView):
             conf = data.get('conf', 0.3)
             imgsz = data.get('imgsz', 1024)
             fps = data.get('fps', 10)
+            batch = data.get('batch', 4)
             model_name = data.get('model_name', 'best_split.pt')
 
+            try:
+                # 分块并行处理的进程数（不超过 CPU 核数），1 表示单进程
+                workers = max(1, min(int(data.get('workers') or 1), os.cpu_count() or 1))
+                chunk_overlap = max(0, int(data.get('chunk_overlap', 10)))
+                # 排队优先级，越大越先运行
+                priority = int(data.get('priority') or 0)
+                # 逐帧标注图片输出策略：none（默认）/ png / jpeg，可每 N 帧保存一张
+                frame_output = FrameOutputPolicy(
+                    data.get('frame_output', 'none'),
+                    quality=data.get('frame_quality', 90),
+                    every=data.get('frame_every', 1)
+                )
+                # 帧选择范围：只处理 [start_frame, end_frame) 内每 frame_stride 帧中的一帧，用于长视频快速预览
+                frame_range = FrameRange(
+                    data.get('start_frame') or 0,
+                    data.get('end_frame'),
+                    stride=data.get('frame_stride') or 1
+                )
+                # 标注视频编码：未指定的项使用 settings 中的默认值
+                video_encoding = VideoEncoding(
+                    backend=data.get('video_encoder') or getattr(settings, 'VIDEO_ENCODER_BACKEND', 'auto'),
+                    crf=data.get('video_crf', getattr(settings, 'VIDEO_CRF', 23)),
+                    preset=data.get('video_preset') or getattr(settings, 'VIDEO_PRESET', 'veryfast'),
+                    previews=data.get('video_previews', getattr(settings, 'VIDEO_PREVIEW_HEIGHTS', ()))
+                )
+            except (TypeError, ValueError) as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # 检查任务是否存在
-            with task_lock:
-                if task_id not in task_status:
-                    return Response(
-                        {'error': '任务不存在'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-
-                # 检查任务状态
-                if task_status[task_id]['status'] == 'processing':
-                    return Response(
-                        {'error': '任务正在处理中'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # 更新任务状态
-                task_status[task_id]['status'] = 'processing'
-                task_status[task_id]['progress'] = 0
-                task_status[task_id]['params'] = {
-                    'conf': conf,
-                    'imgsz': imgsz,
-                    'fps': fps,
-                    'model_name': model_name
-                }
-
-            # 在后台线程中处理视频
-            thread = threading.Thread(
-                target=self._process_video,
-                args=(task_id, conf, imgsz, fps, model_name),
-                daemon=True
-            )
-            thread.start()
+            task_info = task_state.get_task(task_id)
+            if task_info is None:
+                return Response(
+                    {'error': '任务不存在'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            params = {
+                'conf': conf,
+                'imgsz': imgsz,
+                'fps': fps,
+                'batch': batch,
+                'model_name': model_name,
+                'frame_output': frame_output.format,
+                'frame_quality': frame_output.quality,
+                'frame_every': frame_output.every,
+                **frame_range.to_dict(),
+                'workers': workers,
+                'chunk_overlap': chunk_overlap,
+                'video_encoder': video_encoding.backend,
+                'video_crf': video_encoding.crf,
+                'video_preset': video_encoding.preset,
+                'video_previews': list(video_encoding.previews),
+                'priority': priority
+            }
+
+            # 更新任务状态（进入调度队列，开始运行时再改为 processing）；其他请求已启动该任务时失败
+            previous_status = task_info['status']
+            if previous_status in TaskState.ACTIVE_STATUSES or not task_state.transition_task(
+                    task_id, [previous_status], status=TaskState.QUEUED, stage='queued', progress=0, message='',
+                    params=params, priority=priority, error=None, worker=task_state.WORKER_ID,
+                    queued_at=timezone.now()):
+                return Response(
+                    {'error': '任务正在处理中'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            video_path = task_info['video_path']
+            video_sha256 = task_info['video_sha256']
+
+            # 同一视频已用相同参数处理过时直接复用已有结果
+            content_store = ContentStore(settings.MEDIA_ROOT)
+            result_key = self._result_key(video_path, video_sha256, params)
+            source_task_id = content_store.lookup_result(result_key) if result_key else None
+            if source_task_id:
+                try:
+                    result = content_store.materialize_result(source_task_id, task_id, video_path)
+                    TaskRecord.upsert_from_manifest(result)
+                except Exception as e:
+                    print(f"复用已有结果失败，重新处理: {e}")
+                else:
+                    task_state.update_task(task_id, status=TaskState.COMPLETED, stage='complete', progress=100,
+                                           message='处理完成', completed_at=timezone.now())
+                    return Response({
+                        'task_id': task_id,
+                        'status': 'completed',
+                        'cached': True,
+                        'cached_from': source_task_id,
+                        'message': '已有相同视频和参数的处理结果，直接复用'
+                    }, status=status.HTTP_200_OK)
+
+            # 交给任务调度器排队运行（并发数、每个模型的并发数和队列长度都有上限）
+            try:
+                position = self._submit(task_id, params, result_key)
+            except QueueFullError as e:
+                task_state.update_task(task_id, status=previous_status, stage='', worker='')
+                return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
             return Response({
                 'task_id': task_id,
-                'status': 'processing',
-                'message': '任务已启动'
+                'status': 'queued',
+                'queue_position': position,
+                'message': '任务已加入队列'
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -156,26 +349,70 @@ class ProcessTaskView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _process_video(self, task_id: str, conf: float, imgsz: int, fps: int, model_name: str):
-        """后台处理视频"""
+    def _submit(self, task_id: str, params: dict, result_key: Optional[str]) -> int:
+        """
+        按保存的处理参数把任务交给调度器（新任务和接管的中断任务共用）
+
+        Returns:
+            入队后的排队位置
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        frame_output = FrameOutputPolicy(params['frame_output'], quality=params['frame_quality'],
+                                         every=params['frame_every'])
+        frame_range = FrameRange(params['start_frame'], params['end_frame'], stride=params['frame_stride'])
+        video_encoding = VideoEncoding(backend=params['video_encoder'], crf=params['video_crf'],
+                                       preset=params['video_preset'], previews=params['video_previews'])
+        return get_job_scheduler().submit(
+            task_id,
+            params['model_name'],
+            lambda job: self._process_video(task_id, params['conf'], params['imgsz'], params['fps'], params['batch'],
+                                            params['model_name'], frame_output, frame_range, params['workers'],
+                                            params['chunk_overlap'], video_encoding, result_key, job=job),
+            priority=params['priority']
+        )
+
+    @staticmethod
+    def _result_key(video_path: str, video_sha256: Optional[str], params: dict) -> Optional[str]:
+        """
+        结果缓存键：视频内容 + 模型 + 影响输出的参数（batch / workers 等只影响速度的参数不计入）
+
+        模型不存在等无法计算时返回 None（不使用缓存）
+        """
+        model_path = MODEL_DIR / params['model_name']
+        if not model_path.exists() or not os.path.exists(video_path):
+            return None
+        output_options = {k: params[k] for k in ('frame_output', 'frame_quality', 'frame_every', 'video_encoder',
+                                                 'video_crf', 'video_preset', 'video_previews')}
+        frame_range = FrameRange(params['start_frame'], params['end_frame'], stride=params['frame_stride'])
+        return ContentStore.result_key(video_sha256 or file_sha256(video_path), model_path, params['conf'],
+                                       params['imgsz'], params['fps'], frame_range, output_options)
+
+    def _process_video(self, task_id: str, conf: float, imgsz: int, fps: int, batch: int, model_name: str,
+                       frame_output: FrameOutputPolicy, frame_range: FrameRange, workers: int = 1,
+                       chunk_overlap: int = 10, video_encoding: Optional[VideoEncoding] = None,
+                       result_key: Optional[str] = None, job: Optional[Job] = None):
+        """
+        后台处理视频（在调度器的执行线程中运行）
+
+        被取消或抢占时更新任务状态后重新抛出 JobCancelled，由调度器决定是否重新排队
+        """
         try:
-            # 获取任务信息
-            with task_lock:
-                task_info = task_status[task_id]
-                video_path = task_info['video_path']
+            # 获取任务信息（任务在排队期间被删除时直接返回）
+            task_info = task_state.get_task(task_id)
+            if task_info is None or not task_state.transition_task(
+                    task_id, [TaskState.QUEUED], status=TaskState.PROCESSING, stage='processing', message='',
+                    started_at=timezone.now()):
+                return
+            video_path = task_info['video_path']
 
             # 获取视频处理器
             processor = get_video_processor()
 
-            # 进度回调函数
-            def progress_callback(stage: str, progress: int, data: dict):
-                with task_lock:
-                    if task_id in task_status:
-                        task_status[task_id]['progress'] = progress
-                        task_status[task_id]['stage'] = stage
-                        task_status[task_id]['message'] = data.get('message', '')
-                        task_status[task_id]['current_frame'] = data.get('current_frame')
-                        task_status[task_id]['total_frames'] = data.get('total_frames')
+            # 进度回调函数（每帧调用，按时间间隔合并后写入数据库；同时是取消 / 抢占的检查点）
+            progress_callback = task_state.ProgressReporter(task_id,
+                                                            cancel_check=job.check_cancelled if job else None)
 
             # 处理视频
             result = processor.process_video(
@@ -185,129 +422,474 @@ class ProcessTaskView(APIView):
                 imgsz=imgsz,
                 fps=fps,
                 model_name=model_name,
+                batch=batch,
+                frame_output=frame_output,
+                frame_range=frame_range,
+                workers=workers,
+                chunk_overlap=chunk_overlap,
+                video_encoding=video_encoding,
                 progress_callback=progress_callback
             )
 
-            # 更新任务状态
-            with task_lock:
-                if task_id in task_status:
-                    task_status[task_id]['status'] = 'completed'
-                    task_status[task_id]['progress'] = 100
-                    task_status[task_id]['result'] = result
-                    task_status[task_id]['completed_at'] = datetime.now().isoformat()
-
+            # 写入任务索引（任务列表从数据库分页读取）
+            TaskRecord.upsert_from_manifest(result)
+            if result_key:
+                ContentStore(settings.MEDIA_ROOT).record_result(result_key, task_id)
+
+            # 更新任务状态（处理已全部完成时，期间到达的取消请求不再生效）
+            progress_callback.flush()
+            task_state.transition_task(task_id, [TaskState.PROCESSING, TaskState.CANCELLING],
+                                       status=TaskState.COMPLETED, stage='complete', progress=100,
+                                       completed_at=timezone.now())
+
+        except JobCancelled as e:
+            # 被抢占：回到排队状态（保留原入队时间），由调度器重新排队；其间又被取消时按取消处理
+            if e.reason == PREEMPTED and task_state.transition_task(
+                    task_id, [TaskState.PROCESSING], status=TaskState.QUEUED, stage='queued',
+                    message='被更高优先级的任务抢占，等待重新运行'):
+                raise
+            task_state.transition_task(task_id, [TaskState.PROCESSING, TaskState.CANCELLING],
+                                       status=TaskState.CANCELLED, stage='cancelled', message='任务已取消',
+                                       cancelled_at=timezone.now())
+            # 删除未写完的输出文件和检查点（被抢占的任务保留检查点，重新运行时从中断处继续）
+            task_dir = get_video_processor().output_base_dir / task_id
+            shutil.rmtree(task_dir / 'output', ignore_errors=True)
+            shutil.rmtree(task_dir / 'checkpoint', ignore_errors=True)
+            raise JobCancelled(CANCELLED) from e
+        except Exception as e:
+            # 更新任务状态为失败（处理过程中被取消的任务因终止子进程等原因报错时记为已取消）
+            if not task_state.transition_task(task_id, [TaskState.PROCESSING], status=TaskState.FAILED,
+                                              error=str(e), failed_at=timezone.now()):
+                task_state.transition_task(task_id, [TaskState.CANCELLING], status=TaskState.CANCELLED,
+                                           stage='cancelled', message='任务已取消', cancelled_at=timezone.now())
+        finally:
+            # 后台线程结束时关闭本线程的数据库连接
+            connection.close()
+
+
+def resume_interrupted_tasks():
+    """
+    接管工作进程已退出的排队 / 处理中任务并重新排队（启用追踪检查点时从检查点继续）
+
+    服务进程启动时调用一次（见 ApiConfig.ready）。
+    """
+    view = ProcessTaskView()
+    for task_info in task_state.claim_interrupted_tasks():
+        task_id = task_info['task_id']
+        params = task_info['params']
+        try:
+            result_key = view._result_key(task_info['video_path'], task_info['video_sha256'], params)
+            view._submit(task_id, params, result_key)
+            print(f"[TaskState] 接管中断的任务 {task_id}，重新排队")
         except Exception as e:
-            # 更新任务状态为失败
-            with task_lock:
-                if task_id in task_status:
-                    task_status[task_id]['status'] = 'failed'
-                    task_status[task_id]['error'] = str(e)
-                    task_status[task_id]['failed_at'] = datetime.now().isoformat()
+            task_state.transition_task(task_id, [TaskState.QUEUED], status=TaskState.FAILED, stage='', message='',
+                                       error=f'处理进程已退出，重新排队失败: {e!r}', failed_at=timezone.now())
+
+
+class CancelTaskView(APIView):
+    """取消处理任务接口"""
+
+    def post(self, request, task_id):
+        """
+        取消排队中或处理中的任务
+
+        排队中的任务立即取消；处理中的任务返回 202（cancelling），负责它的工作进程在下一帧停止推理、
+        终止子进程并删除未写完的输出后变为 cancelled，可通过状态接口确认。
+        """
+        if task_state.get_task(task_id) is None:
+            return Response(
+                {'error': '任务不存在'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        new_status = task_state.request_cancel(task_id)
+        if new_status is None:
+            return Response(
+                {'error': '任务不在排队或处理中，无法取消'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # 任务在本进程中排队 / 运行时立即移出队列或通知停止，否则由负责的进程在写入进度时发现
+        get_job_scheduler().cancel(task_id)
+
+        if new_status == TaskState.CANCELLED:
+            return Response({
+                'task_id': task_id,
+                'status': new_status,
+                'message': '任务已取消'
+            }, status=status.HTTP_200_OK)
+        return Response({
+            'task_id': task_id,
+            'status': new_status,
+            'message': '正在停止任务'
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class TaskStatusView(APIView):
     """查询任务状态接口"""
 
     def get(self, request, task_id):
-        with task_lock:
-            if task_id not in task_status:
-                return Response(
-                    {'error': '任务不存在'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+        task_info = task_state.get_task(task_id)
+        if task_info is None:
+            return Response(
+                {'error': '任务不存在'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-            task_info = task_status[task_id].copy()
+        # 排队中的任务返回排队位置（按所有工作进程的排队任务计算）
+        if task_info['status'] == TaskState.QUEUED:
+            position, length = task_state.queue_position(task_id)
+            task_info['queue_position'] = position
+            task_info['queue_length'] = length
+            if position:
+                task_info['message'] = f'排队中，前面还有 {position - 1} 个任务'
 
-            # 如果任务完成，读取 JSON 结果
-            if task_info['status'] == 'completed' and 'result' not in task_info:
-                try:
-                    media_root = Path(settings.MEDIA_ROOT)
-                    json_path = media_root / 'tasks' / task_id / 'result.json'
-                    if json_path.exists():
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            task_info['result'] = json.load(f)
-                except Exception as e:
-                    task_info['error'] = f'读取结果失败: {str(e)}'
+        # 如果任务完成，读取结果 manifest（仅汇总字段，逐行数据通过 /result/ 获取）
+        if task_info['status'] == TaskState.COMPLETED:
+            try:
+                store = ResultStore(Path(settings.MEDIA_ROOT) / 'tasks' / task_id)
+                if store.exists():
+                    task_info['result'] = store.manifest()
+            except Exception as e:
+                task_info['error'] = f'读取结果失败: {str(e)}'
 
-            return Response(task_info, status=status.HTTP_200_OK)
+        return Response(task_info, status=status.HTTP_200_OK)
 
 
 class TaskResultView(APIView):
     """获取处理结果接口"""
 
     def get(self, request, task_id):
-        media_root = Path(settings.MEDIA_ROOT)
-        json_path = media_root / 'tasks' / task_id / 'result.json'
+        store = ResultStore(Path(settings.MEDIA_ROOT) / 'tasks' / task_id)
 
-        if not json_path.exists():
+        if not store.exists():
             return Response(
                 {'error': '结果不存在'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            result = json.load(f)
+        return Response(store.to_result(), status=status.HTTP_200_OK)
+
+
+def _encode_cursor(position: dict) -> str:
+    """把分页位置编码为不透明的游标字符串"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError(f'无效的游标: {cursor}')
+
+
+def _parse_track_query(request, default_limit: Optional[int] = None, max_limit: Optional[int] = None) -> dict:
+    """
+    解析追踪数据查询参数
+
+    查询参数:
+        frame_start / frame_end: 帧号范围（含两端，与 MOT 帧号一致）
+        track_ids: 逗号分隔的 track_id 列表
+        fields: 逗号分隔的返回字段（frame, track_id, bb_left, bb_top, bb_width, bb_height, conf, class, visibility,
+                x, y, vx, vy, speed, area），不传时为 None
+        cursor: 上一页返回的 next_cursor
+        limit: 每页条数（default_limit 为空时不分页）
+
+    Raises:
+        ValueError: 参数格式错误
+    """
+    params = request.query_params
+
+    def optional_int(name):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f'{name} 必须为整数: {value}')
+
+    frame_start, frame_end = optional_int('frame_start'), optional_int('frame_end')
+    if frame_start is not None and frame_end is not None and frame_end < frame_start:
+        raise ValueError(f'frame_end 不能小于 frame_start: {frame_start} ~ {frame_end}')
+
+    track_ids = None
+    if params.get('track_ids'):
+        try:
+            track_ids = [int(t) for t in params['track_ids'].split(',') if t.strip()]
+        except ValueError:
+            raise ValueError(f"track_ids 必须为逗号分隔的整数: {params['track_ids']}")
+
+    fields = None
+    if params.get('fields'):
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in QUERY_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}，可选: {', '.join(QUERY_FIELDS)}")
+
+    limit = None
+    if default_limit is not None:
+        limit = optional_int('limit') or default_limit
+        if not 1 <= limit <= max_limit:
+            raise ValueError(f'limit 必须在 1-{max_limit} 之间: {limit}')
+
+    return {
+        'frame_start': frame_start,
+        'frame_end': frame_end,
+        'track_ids': track_ids,
+        'fields': fields,
+        'cursor': _decode_cursor(params['cursor']) if params.get('cursor') else None,
+        'limit': limit,
+    }
+
+
+def _cell_frames(store: ResultStore, rows, fields: Optional[list]) -> list:
+    """未指定 fields 时按前端 CellFrameData 结构返回，否则返回投影后的扁平行"""
+    if fields is None:
+        return store.cell_frames(rows)
+    return store.tracking_data(rows, fields)
+
+
+def _get_result_store(task_id: str):
+    """返回任务的 ResultStore，结果不存在时返回 None"""
+    store = ResultStore(Path(settings.MEDIA_ROOT) / 'tasks' / task_id)
+    return store if store.exists() else None
 
-        return Response(result, status=status.HTTP_200_OK)
+
+class CellListView(APIView):
+    """按细胞（track_id）分页获取追踪数据接口"""
+
+    def get(self, request, task_id):
+        """
+        返回 {'cells': [{'cell_id', 'frames': [...], 'stats': {...}}, ...], 'count', 'next_cursor'}
+
+        按 track_id 升序以游标分页（limit 为每页细胞数），每个细胞只包含帧范围内的行。
+        frames 默认为前端 CellFrameData 结构，指定 fields 时为投影后的扁平行；stats 为整条轨迹的运动学汇总。
+        """
+        store = _get_result_store(task_id)
+        if store is None:
+            return Response({'error': '结果不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            query = _parse_track_query(request, default_limit=50, max_limit=500)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        frame_start, frame_end, track_ids = query['frame_start'], query['frame_end'], query['track_ids']
+        if frame_start is None and frame_end is None:
+            # 不限帧范围时细胞列表直接取自轨迹索引
+            cell_ids = np.asarray(store.track_ids())
+            if track_ids is not None:
+                cell_ids = np.intersect1d(cell_ids, track_ids)
+        else:
+            rows = store.select_rows(frame_start, frame_end, track_ids)
+            cell_ids = np.unique(np.asarray(store.column('track_id')[rows]))
+        count = len(cell_ids)
+
+        if query['cursor'] is not None:
+            cell_ids = cell_ids[cell_ids > int(query['cursor'].get('after_cell', -1))]
+        page_ids = cell_ids[:query['limit']]
+
+        cells = [
+            {
+                'cell_id': str(cid),
+                'frames': _cell_frames(store, store.select_rows(frame_start, frame_end, [cid]), query['fields']),
+                'stats': store.cell_stats(cid)
+            }
+            for cid in page_ids.tolist()
+        ]
+        has_more = len(cell_ids) > len(page_ids)
+
+        return Response({
+            'task_id': task_id,
+            'cells': cells,
+            'count': count,
+            'next_cursor': _encode_cursor({'after_cell': int(page_ids[-1])}) if has_more else None
+        }, status=status.HTTP_200_OK)
+
+
+class CellDetailView(APIView):
+    """获取单个细胞的追踪数据接口"""
+
+    def get(self, request, task_id, cell_id):
+        """
+        返回 {'cell_id', 'frames': [...], 'stats': {...}, 'next_cursor'}
+
+        按帧号升序以游标分页（limit 为每页行数），支持帧范围和字段投影（格式同 /cells/）。
+        """
+        store = _get_result_store(task_id)
+        if store is None:
+            return Response({'error': '结果不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            query = _parse_track_query(request, default_limit=1000, max_limit=10000)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 轨迹索引直接定位该细胞的行，不随总检测数增长
+        if len(store.track_rows(cell_id)) == 0:
+            return Response({'error': '细胞不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        frame_start = query['frame_start']
+        if query['cursor'] is not None:
+            after = int(query['cursor'].get('after_frame', -1)) + 1
+            frame_start = after if frame_start is None else max(frame_start, after)
+        rows = store.select_rows(frame_start, query['frame_end'], [cell_id])
+
+        page = rows[:query['limit']]
+        has_more = len(rows) > len(page)
+
+        return Response({
+            'task_id': task_id,
+            'cell_id': str(cell_id),
+            'frames': _cell_frames(store, page, query['fields']),
+            'stats': store.cell_stats(cell_id),
+            'next_cursor': _encode_cursor({'after_frame': int(store.column('frame')[page[-1]])}) if has_more else None
+        }, status=status.HTTP_200_OK)
+
+
+class _ExportNegotiation(DefaultContentNegotiation):
+    """导出接口的 ?format= 表示导出文件格式，不参与 DRF 的渲染器选择"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    """导出追踪数据接口"""
+
+    content_negotiation_class = _ExportNegotiation
+
+    def get(self, request, task_id):
+        """
+        流式导出追踪数据
+
+        查询参数:
+            format: csv（默认）或 json（NDJSON，每行一条记录）
+            gzip: 设为 0 时不压缩；否则客户端 Accept-Encoding 包含 gzip 时边生成边压缩
+            另支持与 /cells/ 相同的 frame_start / frame_end / track_ids / fields 筛选
+        """
+        store = _get_result_store(task_id)
+        if store is None:
+            return Response({'error': '结果不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        export_format = request.query_params.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"不支持的导出格式: {export_format}，可选: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            query = _parse_track_query(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        row_chunks = store.iter_rows(query['frame_start'], query['frame_end'], query['track_ids'])
+        encode = iter_csv if export_format == 'csv' else iter_ndjson
+        content = encode(store, row_chunks, query['fields'] or list(QUERY_FIELDS))
+
+        use_gzip = (request.query_params.get('gzip') != '0'
+                    and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if use_gzip:
+            content = gzip_stream(content)
+
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{task_id}_tracking.{extension}"'
+        response['Vary'] = 'Accept-Encoding'
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        return response
 
 
 class AnnotatedVideoView(APIView):
     """获取标注视频接口"""
 
     def get(self, request, task_id):
+        """
+        返回标注视频，支持 Range（206）和 ETag / Last-Modified 条件请求
+
+        查询参数:
+            inline: 为 1 时以 inline 方式返回，供 <video> 直接播放和拖动；默认作为附件下载
+            rendition: 低分辨率预览版本，如 480p（需在处理时通过 video_previews 生成），默认返回原分辨率视频
+        """
         media_root = Path(settings.MEDIA_ROOT)
         video_path = media_root / 'tasks' / task_id / 'output' / 'tracking_result.mp4'
 
+        rendition = request.query_params.get('rendition')
+        if rendition:
+            if not (rendition.endswith('p') and rendition[:-1].isdigit()):
+                return Response({'error': f'无效的 rendition: {rendition}'}, status=status.HTTP_400_BAD_REQUEST)
+            video_path = VideoEncoding.preview_path(video_path, int(rendition[:-1]))
+
         if not video_path.exists():
             return HttpResponseNotFound('视频不存在')
 
         # 获取文件名
-        filename = f"{task_id}_annotated.mp4"
-
-        # 返回视频文件
-        return FileResponse(
-            open(video_path, 'rb'),
-            content_type='video/mp4',
-            as_attachment=True,
-            filename=filename
-        )
+        filename = f"{task_id}_annotated_{rendition}.mp4" if rendition else f"{task_id}_annotated.mp4"
+        inline = request.query_params.get('inline') in ('1', 'true')
+
+        return ranged_file_response(request, video_path, 'video/mp4', filename, as_attachment=not inline)
 
 
 class TaskListView(APIView):
     """获取所有任务列表接口"""
 
+    # 分页时每页最多返回的任务数
+    MAX_PAGE_SIZE = 200
+
     def get(self, request):
-        """获取所有已完成任务的结果列表"""
-        media_root = Path(settings.MEDIA_ROOT)
-        tasks_dir = media_root / 'tasks'
+        """
+        获取已完成任务的列表（从任务索引读取）
+
+        查询参数:
+            ordering: 排序字段，可选 created_at / cell_count / total_frames / video_duration / model_name，
+                      加 '-' 前缀表示降序，默认 -created_at
+            page: 页码（从 1 开始），与 page_size 都不传时返回全部任务
+            page_size: 每页任务数，默认 20
+        """
+        ordering = request.query_params.get('ordering', '-created_at')
+        if ordering.lstrip('-') not in TaskRecord.ORDERING_FIELDS:
+            return Response(
+                {'error': f"不支持的排序字段: {ordering}，可选: {', '.join(TaskRecord.ORDERING_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # 排序字段相同时按 task_id 保证分页稳定
+        queryset = TaskRecord.objects.order_by(ordering, 'task_id')
 
-        if not tasks_dir.exists():
-            return Response({'tasks': [], 'count': 0}, status=status.HTTP_200_OK)
+        if 'page' not in request.query_params and 'page_size' not in request.query_params:
+            tasks = [record.to_dict() for record in queryset]
+            return Response({
+                'tasks': tasks,
+                'count': len(tasks)
+            }, status=status.HTTP_200_OK)
 
-        tasks = []
-        
-        # 遍历所有任务目录
-        for task_dir in tasks_dir.iterdir():
-            if not task_dir.is_dir():
-                continue
-
-            # 读取 result.json
-            json_path = task_dir / 'result.json'
-            if json_path.exists():
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        result = json.load(f)
-                        tasks.append(result)
-                except Exception as e:
-                    print(f"读取任务 {task_dir.name} 结果失败: {e}")
-                    continue
+        try:
+            page_number = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 20))
+        except ValueError:
+            return Response(
+                {'error': 'page 和 page_size 必须为整数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if page_number < 1 or not 1 <= page_size <= self.MAX_PAGE_SIZE:
+            return Response(
+                {'error': f'page 必须 >= 1，page_size 必须在 1-{self.MAX_PAGE_SIZE} 之间'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # 按创建时间排序（最新的在前）
-        tasks.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+        paginator = Paginator(queryset, page_size)
+        try:
+            page = paginator.page(page_number)
+        except EmptyPage:
+            page = None
 
         return Response({
-            'tasks': tasks,
-            'count': len(tasks)
+            'tasks': [record.to_dict() for record in page] if page else [],
+            'count': paginator.count,
+            'page': page_number,
+            'page_size': page_size,
+            'num_pages': paginator.num_pages
         }, status=status.HTTP_200_OK)
 
 
@@ -323,13 +905,15 @@ class ModelListView(APIView):
             return Response({'models': [], 'count': 0}, status=status.HTTP_200_OK)
 
         models = []
+        resident = set(get_model_pool().resident_models())
         
         # 遍历所有 .pt 文件
         for model_file in models_dir.glob('*.pt'):
             models.append({
                 'name': model_file.name,
                 'size_mb': round(model_file.stat().st_size / (1024 * 1024), 2),
-                'path': str(model_file.relative_to(backend_dir))
+                'path': str(model_file.relative_to(backend_dir)),
+                'loaded': model_file.name in resident
             })
 
         # 按名称排序
@@ -348,8 +932,6 @@ class DeleteTaskView(APIView):
     def delete(self, request, task_id: str):
         """删除指定任务的所有数据"""
         try:
-            import shutil
-
             media_root = Path(settings.MEDIA_ROOT)
             task_dir = media_root / 'tasks' / task_id
 
@@ -360,20 +942,18 @@ class DeleteTaskView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # 检查任务是否正在处理中
-            with task_lock:
-                if task_id in task_status and task_status[task_id]['status'] == 'processing':
-                    return Response(
-                        {'error': '任务正在处理中，无法删除'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # 从内存中移除任务状态
-                if task_id in task_status:
-                    del task_status[task_id]
+            # 检查任务是否正在处理中；排队中的任务移出队列后删除
+            if not task_state.delete_task(task_id):
+                return Response(
+                    {'error': '任务正在处理中，无法删除，请先取消任务'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            get_job_scheduler().cancel(task_id)
 
-            # 删除任务目录及其所有内容
+            # 删除任务目录及其所有内容（原始视频不再被任何任务引用时一并从内容存储中删除）
             shutil.rmtree(task_dir)
+            TaskRecord.objects.filter(task_id=task_id).delete()
+            ContentStore(media_root).prune_videos()
 
             return Response({
                 'message': '任务已成功删除',
@@ -1,49 +1,49 @@
 """
 WebSocket 消费者
 用于实时推送任务进度
+
+每个连接加入所订阅任务的 channel layer 组（task_<task_id>）。处理进程每条消息只对组 group_send 一次，
+由 channel layer 分发给所有订阅者，订阅人数不影响处理线程的开销；消息频率由 ProgressReporter 限制。
+连接建立 / 订阅时先推送一次任务的当前状态，客户端不需要再轮询 /status/。
 """
 
 import json
-import asyncio
-from typing import Dict, Set
-from threading import Thread, Lock
+import re
+from typing import Optional
 
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.layers import get_channel_layer
 
+# channel layer 组名只允许 ASCII 字母、数字、连字符、下划线和点，长度 < 100
+_TASK_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
 
-# 全局 WebSocket 连接管理
-connections: Dict[str, Set[AsyncWebsocketConsumer]] = {}
-connections_lock = Lock()
+def task_group_name(task_id: str) -> str:
+    """任务对应的 channel layer 组名"""
+    return f'task_{task_id}'
 
 
 class TaskProgressConsumer(AsyncWebsocketConsumer):
-    """任务进度 WebSocket 消费者"""
+    """任务进度 WebSocket 消费者（每个连接同时订阅一个任务）"""
 
     async def connect(self):
         """连接建立"""
+        self.task_id: Optional[str] = None
         await self.accept()
 
-        # 获取任务ID（从 URL 参数）
-        self.task_id = self.scope['url_route']['kwargs'].get('task_id')
-
-        # 将连接添加到任务订阅列表
-        if self.task_id:
-            with connections_lock:
-                if self.task_id not in connections:
-                    connections[self.task_id] = set()
-                connections[self.task_id].add(self)
+        # 获取任务ID（从 URL 参数），也可以连接后发送 subscribe 消息订阅
+        task_id = self.scope['url_route']['kwargs'].get('task_id')
+        if task_id:
+            await self._subscribe(task_id)
 
         print(f"WebSocket connected for task: {self.task_id}")
 
     async def disconnect(self, close_code):
         """连接断开"""
         if self.task_id:
-            with connections_lock:
-                if self.task_id in connections:
-                    connections[self.task_id].discard(self)
-                    if not connections[self.task_id]:
-                        del connections[self.task_id]
+            await self.channel_layer.group_discard(task_group_name(self.task_id), self.channel_name)
 
         print(f"WebSocket disconnected for task: {self.task_id}")
 
@@ -54,39 +54,92 @@ class TaskProgressConsumer(AsyncWebsocketConsumer):
             message_type = data.get('type')
 
             if message_type == 'subscribe':
-                # 订阅任务进度
-                self.task_id = data.get('task_id')
-                if self.task_id:
-                    with connections_lock:
-                        if self.task_id not in connections:
-                            connections[self.task_id] = set()
-                        connections[self.task_id].add(self)
-
+                # 订阅任务进度（替换之前订阅的任务）
+                task_id = data.get('task_id')
+                if await self._subscribe(task_id):
                     # 发送确认消息
                     await self.send(json.dumps({
                         'type': 'subscribed',
                         'task_id': self.task_id,
                         'message': f'已订阅任务 {self.task_id} 的进度更新'
-                    }))
+                    }, ensure_ascii=False))
 
             elif message_type == 'unsubscribe':
                 # 取消订阅
-                if self.task_id:
-                    with connections_lock:
-                        if self.task_id in connections:
-                            connections[self.task_id].discard(self)
+                task_id, self.task_id = self.task_id, None
+                if task_id:
+                    await self.channel_layer.group_discard(task_group_name(task_id), self.channel_name)
 
                     await self.send(json.dumps({
                         'type': 'unsubscribed',
-                        'task_id': self.task_id,
-                        'message': f'已取消订阅任务 {self.task_id}'
-                    }))
+                        'task_id': task_id,
+                        'message': f'已取消订阅任务 {task_id}'
+                    }, ensure_ascii=False))
 
         except json.JSONDecodeError:
             await self.send(json.dumps({
                 'type': 'error',
                 'message': '无效的 JSON 格式'
-            }))
+            }, ensure_ascii=False))
+
+    async def task_message(self, event):
+        """channel layer 组消息（type: task.message），原样转发给客户端"""
+        await self.send(json.dumps(event['message'], ensure_ascii=False))
+
+    async def _subscribe(self, task_id) -> bool:
+        """加入任务的组并推送当前状态，返回是否订阅成功"""
+        if not isinstance(task_id, str) or not _TASK_ID_RE.fullmatch(task_id):
+            await self.send(json.dumps({
+                'type': 'error',
+                'message': '无效的 task_id'
+            }, ensure_ascii=False))
+            return False
+
+        if self.task_id and self.task_id != task_id:
+            await self.channel_layer.group_discard(task_group_name(self.task_id), self.channel_name)
+        self.task_id = task_id
+        # 先加入组再读取状态，两者之间的更新不会丢失（最多重复一次）
+        await self.channel_layer.group_add(task_group_name(task_id), self.channel_name)
+
+        # 延迟导入：task_state 推送消息时会导入本模块
+        from .services import task_state
+
+        task_info = await database_sync_to_async(task_state.get_task)(task_id)
+        if task_info is None:
+            await self.send(json.dumps({
+                'type': 'error',
+                'task_id': task_id,
+                'data': {'error': '任务不存在'}
+            }, ensure_ascii=False))
+            return True
+        await self.send(json.dumps(_status_message(task_id, task_info['status'], {
+            key: task_info[key] for key in ('stage', 'progress', 'message', 'current_frame', 'total_frames', 'error')
+        }), ensure_ascii=False))
+        return True
+
+
+def _status_message(task_id: str, status: str, data: dict) -> dict:
+    return {
+        'type': 'status',
+        'task_id': task_id,
+        'stage': data.get('stage') or 'status',
+        'progress': data.get('progress'),
+        'data': dict(data, status=status)
+    }
+
+
+def _group_send(task_id: str, message: dict):
+    """向订阅该任务的所有连接发送消息（同步代码中调用，推送失败不影响任务处理）"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(task_group_name(task_id), {
+            'type': 'task.message',
+            'message': message
+        })
+    except Exception as e:
+        print(f"推送任务 {task_id} 的消息失败: {e}")
 
 
 # 进度推送函数（从外部调用）
@@ -100,41 +153,16 @@ def broadcast_progress(task_id: str, stage: str, progress: int, data: dict = Non
         progress: 进度百分比
         data: 额外数据
     """
-    message = {
+    _group_send(task_id, {
         'type': 'progress',
         'task_id': task_id,
         'stage': stage,
         'progress': progress,
-        'data': data or {}
-    }
-
-    # 获取所有订阅该任务的连接
-    with connections_lock:
-        task_connections = connections.get(task_id, set()).copy()
-
-    # 异步发送消息
-    async def send_to_connections():
-        channel_layer = get_channel_layer()
-        for connection in task_connections:
-            try:
-                await connection.send(json.dumps(message))
-            except Exception as e:
-                print(f"发送消息失败: {e}")
-
-    # 在事件循环中执行
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    if loop.is_running():
-        asyncio.create_task(send_to_connections())
-    else:
-        loop.run_until_complete(send_to_connections())
+        'data': dict(data or {}, progress=progress)
+    })
 
 
-def broadcast_status(task_id: str, status: str, message: str = None):
+def broadcast_status(task_id: str, status: str, message: str = None, data: dict = None):
     """
     广播任务状态更新
 
@@ -142,16 +170,12 @@ def broadcast_status(task_id: str, status: str, message: str = None):
         task_id: 任务ID
         status: 任务状态
         message: 状态消息
+        data: 额外数据（如 stage / progress / error）
     """
-    broadcast_progress(
-        task_id,
-        'status',
-        0,
-        {
-            'status': status,
-            'message': message
-        }
-    )
+    data = dict(data or {})
+    if message is not None:
+        data['message'] = message
+    _group_send(task_id, _status_message(task_id, status, data))
 
 
 def broadcast_error(task_id: str, error: str):
@@ -162,14 +186,13 @@ def broadcast_error(task_id: str, error: str):
         task_id: 任务ID
         error: 错误信息
     """
-    broadcast_progress(
-        task_id,
-        'error',
-        0,
-        {
-            'error': error
-        }
-    )
+    _group_send(task_id, {
+        'type': 'error',
+        'task_id': task_id,
+        'stage': 'error',
+        'progress': 0,
+        'data': {'error': error}
+    })
 
 
 def broadcast_complete(task_id: str):
@@ -186,4 +209,4 @@ def broadcast_complete(task_id: str):
         {
             'message': '任务完成'
         }
-    )
\ No newline at end of file
+    )
@@ -88,10 +88,17 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# 任务状态在多个工作进程之间通过数据库共享：SQLite 使用 WAL 模式（读写互不阻塞），
+# 写事务以 IMMEDIATE 方式开始并在锁冲突时等待，避免并发写入时报 database is locked
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -163,10 +170,48 @@ REST_FRAMEWORK = {
 }
 
 
+# 常驻模型工作池配置
+# 同时常驻内存的模型（.pt 文件）数量上限，超出时按 LRU 淘汰空闲模型
+MODEL_POOL_MAX_MODELS = int(os.getenv('MODEL_POOL_MAX_MODELS', 2))
+# 模型加载后预热使用的图像尺寸
+MODEL_POOL_WARMUP_IMGSZ = int(os.getenv('MODEL_POOL_WARMUP_IMGSZ', 1024))
+
+
+# 任务调度配置
+# 同时运行的处理任务数上限，超出的任务排队
+JOB_MAX_CONCURRENT = int(os.getenv('JOB_MAX_CONCURRENT', 2))
+# 每个模型同时运行的任务数上限（同一模型的任务在常驻工作线程中串行执行，多占执行线程没有意义）
+JOB_MAX_PER_MODEL = int(os.getenv('JOB_MAX_PER_MODEL', 1))
+# 排队任务数上限，队列满时新任务返回 503
+JOB_MAX_QUEUE = int(os.getenv('JOB_MAX_QUEUE', 100))
+# 高优先级任务入队且没有空位时，是否抢占优先级更低的运行中任务（被抢占的任务停止后重新排队）
+JOB_PREEMPTION = os.getenv('JOB_PREEMPTION', '1').lower() not in ('0', 'false', 'no')
+
+
+# 追踪检查点配置
+# 单进程流式处理时每处理多少帧保存一次检查点（自动对齐到推理批次），处理进程退出后从检查点继续；0 表示不保存。
+# 启用后标注视频按检查点分段编码、完成时拼接，需要 ffmpeg 可执行文件或 PyAV，两者都没有时不保存检查点
+TRACKING_CHECKPOINT_INTERVAL = int(os.getenv('TRACKING_CHECKPOINT_INTERVAL', 0))
+
+
+# 标注视频编码配置
+# 编码后端: auto（依次尝试 ffmpeg 可执行文件 / PyAV / cv2）、ffmpeg、pyav、cv2
+VIDEO_ENCODER_BACKEND = os.getenv('VIDEO_ENCODER_BACKEND', 'auto')
+# H.264 质量参数 (0-51) 和 x264 速度预设
+VIDEO_CRF = int(os.getenv('VIDEO_CRF', 23))
+VIDEO_PRESET = os.getenv('VIDEO_PRESET', 'veryfast')
+# 额外生成的低分辨率预览版本高度，逗号分隔，如 "480,240"；为空时不生成
+VIDEO_PREVIEW_HEIGHTS = [int(h) for h in os.getenv('VIDEO_PREVIEW_HEIGHTS', '').split(',') if h.strip()]
+
+
 # Channels 配置（用于 WebSocket）
 ASGI_APPLICATION = 'backend.asgi.application'
 
-# 使用内存层作为消息代理（开发环境）
+# 每个任务每秒最多推送的进度消息数（中间的进度合并为最新值），0 表示只推送状态变化
+PROGRESS_PUSH_MAX_RATE = float(os.getenv('PROGRESS_PUSH_MAX_RATE', 4))
+
+# 使用内存层作为消息代理（开发环境）；多个工作进程部署时必须使用 Redis 等跨进程的 channel layer，
+# 否则其他进程中处理的任务进度推送不到本进程的 WebSocket 连接
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
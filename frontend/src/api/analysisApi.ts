@@ -69,6 +69,55 @@ export const analysisApi = {
     return data
   },
 
+  /**
+   * 分块 / 断点续传上传视频文件（适合大文件和不稳定网络）
+   * POST /api/upload/init/ -> PUT /api/upload/:task_id/ (Upload-Offset) -> POST /api/upload/:task_id/complete/
+   * @param file 视频文件
+   * @param onProgress 上传进度回调 (已上传字节数, 总字节数)
+   * @param resumeTaskId 可选，之前未完成的上传会话 ID，从服务端已接收的偏移继续
+   * @returns 上传完成的任务信息
+   */
+  async uploadResumable(
+    file: File,
+    onProgress?: (loaded: number, total: number) => void,
+    resumeTaskId?: string
+  ): Promise<AnalysisRecord> {
+    let session: { task_id: string; offset: number; chunk_size: number }
+    if (resumeTaskId) {
+      const { data } = await api.get(`/upload/${resumeTaskId}/`)
+      session = data
+    } else {
+      const { data } = await api.post('/upload/init/', { filename: file.name, size: file.size })
+      session = data
+    }
+
+    let offset = session.offset
+    let retries = 0
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + session.chunk_size)
+      try {
+        const { data } = await api.put(`/upload/${session.task_id}/`, chunk, {
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            'Upload-Offset': String(offset),
+          },
+          timeout: 0,
+        })
+        offset = data.offset
+        retries = 0
+        onProgress?.(offset, file.size)
+      } catch (error: any) {
+        // 网络中断或偏移不一致：按服务端记录的偏移重试
+        if (++retries > 5) throw error
+        const { data } = await api.get(`/upload/${session.task_id}/`)
+        offset = data.offset
+      }
+    }
+
+    const { data } = await api.post<AnalysisRecord>(`/upload/${session.task_id}/complete/`, {}, { timeout: 0 })
+    return data
+  },
+
   /**
    * 启动处理任务
    * POST /api/process
@@ -88,17 +137,26 @@ export const analysisApi = {
     return data
   },
 
+  /**
+   * 取消排队中或处理中的任务
+   * POST /api/cancel/:task_id
+   * @param taskId 任务ID
+   * @returns 取消后的状态（cancelled，处理中的任务为 cancelling，停止后变为 cancelled）
+   */
+  async cancelProcess(taskId: string): Promise<{ task_id: string; status: string; message: string }> {
+    const { data } = await api.post(`/cancel/${taskId}/`)
+    return data
+  },
+
   /**
    * 查询任务状态
    * GET /api/status/:task_id
    * @param taskId 任务ID
    * @returns 任务状态和进度
    */
-  async getStatus(taskId: string): Promise<{
+  async getStatus(taskId: string): Promise<TaskStatusUpdate & {
     status: string
     progress: number
-    current_frame?: number
-    total_frames?: number
   }> {
     const { data } = await api.get(`/status/${taskId}`)
     return data
@@ -119,10 +177,14 @@ export const analysisApi = {
    * 获取细胞数据列表
    * GET /api/cells/:task_id
    * @param taskId 任务ID
-   * @returns 细胞数据数组
+   * @param params 可选的筛选和分页参数（frame_start, frame_end, track_ids, fields, cursor, limit）
+   * @returns 本页细胞数据、匹配的细胞总数和下一页游标
    */
-  async getCells(taskId: string): Promise<CellData[]> {
-    const { data } = await api.get<CellData[]>(`/cells/${taskId}`)
+  async getCells(
+    taskId: string,
+    params?: Record<string, string | number>
+  ): Promise<{ cells: CellData[]; count: number; next_cursor: string | null }> {
+    const { data } = await api.get(`/cells/${taskId}/`, { params })
     return data
   },
 
@@ -131,10 +193,15 @@ export const analysisApi = {
    * GET /api/cell/:task_id/:cell_id
    * @param taskId 任务ID
    * @param cellId 细胞ID
-   * @returns 单个细胞的完整数据
+   * @param params 可选的筛选和分页参数（frame_start, frame_end, fields, cursor, limit）
+   * @returns 单个细胞的数据（分页时附带下一页游标）
    */
-  async getCell(taskId: string, cellId: string): Promise<CellData> {
-    const { data } = await api.get<CellData>(`/cell/${taskId}/${cellId}`)
+  async getCell(
+    taskId: string,
+    cellId: string,
+    params?: Record<string, string | number>
+  ): Promise<CellData & { next_cursor: string | null }> {
+    const { data } = await api.get(`/cell/${taskId}/${cellId}/`, { params })
     return data
   },
 
@@ -149,7 +216,7 @@ export const analysisApi = {
     taskId: string,
     format: 'csv' | 'json' = 'csv'
   ): Promise<Blob> {
-    const { data } = await api.get(`/export/${taskId}`, {
+    const { data } = await api.get(`/export/${taskId}/`, {
       params: { format },
       responseType: 'blob',
     })
@@ -161,10 +228,10 @@ export const analysisApi = {
    * 获取标注视频 URL
    * GET /api/video/:task_id
    * @param taskId 任务ID
-   * @returns 视频 URL
+   * @returns 视频 URL（inline 模式，支持 Range 请求拖动播放）
    */
   getVideoUrl(taskId: string): string {
-    return `${api.defaults.baseURL}/video/${taskId}`
+    return `${api.defaults.baseURL}/video/${taskId}/?inline=1`
   },
 
   /**
@@ -191,6 +258,94 @@ export const analysisApi = {
   },
 }
 
+/**
+ * 任务进度 WebSocket 地址（与页面同源，开发环境由 Vite 代理到后端）
+ * @param taskId 任务ID，为空时连接后通过 subscribe 消息订阅
+ */
+export function taskProgressUrl(taskId?: string): string {
+  const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+  return `${protocol}//${window.location.host}/ws/task/${taskId ? `${taskId}/` : ''}`
+}
+
+// 任务已结束的状态
+const FINISHED_STATUSES = ['completed', 'failed', 'cancelled']
+
+/**
+ * 监听任务进度
+ * 优先订阅 WebSocket 推送（连接时先收到一次当前状态），连接失败或中途断开时退回每 2 秒轮询 /status/；
+ * 任务结束（completed / failed / cancelled）后停止监听
+ * @param taskId 任务ID
+ * @param onUpdate 收到状态更新（推送的进度只包含变化的字段）
+ * @param onError 轮询失败时调用，之后停止监听
+ * @returns 停止监听的函数
+ */
+export function watchTaskProgress(
+  taskId: string,
+  onUpdate: (update: TaskStatusUpdate) => void,
+  onError?: (error: unknown) => void
+): () => void {
+  let stopped = false
+  let socket: WebSocket | null = null
+  let pollInterval: ReturnType<typeof setInterval> | null = null
+
+  const stop = () => {
+    stopped = true
+    if (pollInterval !== null) {
+      clearInterval(pollInterval)
+      pollInterval = null
+    }
+    if (socket) {
+      socket.close()
+      socket = null
+    }
+  }
+
+  const handle = (update: TaskStatusUpdate) => {
+    if (update.status && FINISHED_STATUSES.includes(update.status)) {
+      stop()
+    }
+    onUpdate(update)
+  }
+
+  const poll = () => {
+    if (stopped || pollInterval !== null) return
+    pollInterval = setInterval(async () => {
+      try {
+        handle(await analysisApi.getStatus(taskId))
+      } catch (error) {
+        stop()
+        onError?.(error)
+      }
+    }, 2000) // 每2秒轮询一次
+  }
+
+  try {
+    socket = new WebSocket(taskProgressUrl(taskId))
+  } catch (error) {
+    console.warn('WebSocket 不可用，改为轮询任务状态:', error)
+    poll()
+    return stop
+  }
+
+  socket.onmessage = (event) => {
+    const message: WSMessage = JSON.parse(event.data)
+    if (message.type === 'progress') {
+      handle({ ...message.data, stage: message.stage })
+    } else if (message.type === 'status') {
+      handle(message.data)
+    } else if (message.type === 'error') {
+      // 任务不存在等：交给轮询报告错误
+      socket?.close()
+    }
+  }
+  socket.onclose = () => {
+    socket = null
+    poll()
+  }
+
+  return stop
+}
+
 /**
  * WebSocket 连接管理器
  * 用于实时接收处理进度更新
@@ -201,7 +356,7 @@ export class AnalysisWebSocket {
   private maxReconnectAttempts = 5
   private reconnectDelay = 1000
 
-  constructor(private url: string = 'ws://localhost:8000/ws') {}
+  constructor(private url: string = taskProgressUrl()) {}
 
   /**
    * 连接 WebSocket
@@ -296,20 +451,30 @@ export class AnalysisWebSocket {
   }
 }
 
+/**
+ * 任务状态更新（状态接口返回值或 WebSocket 推送的字段）
+ */
+export interface TaskStatusUpdate {
+  status?: string
+  stage?: string
+  progress?: number | null
+  message?: string
+  current_frame?: number | null
+  total_frames?: number | null
+  error?: string | null
+}
+
 /**
  * WebSocket 消息类型
+ * progress: 逐帧进度（按频率合并）；status: 连接 / 订阅时的当前状态和之后的每次状态变化
  */
 export interface WSMessage {
-  type: 'progress' | 'status' | 'error' | 'complete'
+  type: 'progress' | 'status' | 'error' | 'complete' | 'subscribed' | 'unsubscribed'
   task_id: string
-  data: {
-    progress?: number
-    status?: string
-    current_frame?: number
-    total_frames?: number
-    message?: string
-    error?: string
-  }
+  stage?: string
+  progress?: number | null
+  message?: string
+  data: TaskStatusUpdate
 }
 
 export default api
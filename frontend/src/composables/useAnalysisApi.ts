@@ -1,5 +1,5 @@
 import { ref } from 'vue'
-import { analysisApi, AnalysisWebSocket, type WSMessage } from '@/api/analysisApi'
+import { analysisApi, AnalysisWebSocket, watchTaskProgress, type WSMessage } from '@/api/analysisApi'
 import { useAnalysisStore } from '@/stores/analysisStore'
 import type { AnalysisRecord } from '@/stores/analysisStore'
 
@@ -52,34 +52,28 @@ export function useAnalysisApi() {
   }
 
   /**
-   * 开始监听任务进度（轮询方式）
+   * 开始监听任务进度（WebSocket 推送，不可用时退回轮询）
+   * @returns 停止监听的函数
    */
   function startProgressMonitoring(taskId: string) {
-    const pollInterval = setInterval(async () => {
-      try {
-        const statusData = await analysisApi.getStatus(taskId)
-
+    return watchTaskProgress(
+      taskId,
+      (update) => {
         // 更新 store 中的任务状态
         store.updateTaskStatus(taskId, {
-          status: statusData.status as any,
-          progress: statusData.progress,
+          status: update.status as any,
+          progress: update.progress ?? undefined,
         })
 
-        // 如果任务完成，停止轮询并获取结果
-        if (statusData.status === 'completed') {
-          clearInterval(pollInterval)
-          await fetchTaskResult(taskId)
-        } else if (statusData.status === 'failed') {
-          clearInterval(pollInterval)
+        // 如果任务完成，获取结果
+        if (update.status === 'completed') {
+          fetchTaskResult(taskId)
         }
-      } catch (error) {
+      },
+      (error) => {
         console.error('Failed to poll status:', error)
-        clearInterval(pollInterval)
       }
-    }, 2000) // 每2秒轮询一次
-
-    // 保存 interval ID 以便后续清理
-    return pollInterval
+    )
   }
 
   /**
@@ -114,11 +108,14 @@ export function useAnalysisApi() {
               break
 
             case 'status':
-              // 更新状态
+              // 更新状态（状态变化时只推送变化的字段）
               store.updateTaskStatus(message.task_id, {
                 status: message.data.status as any,
-                progress: message.data.progress || 0,
+                progress: message.data.progress ?? undefined,
               })
+              if (message.data.status === 'completed') {
+                fetchTaskResult(message.task_id)
+              }
               break
 
             case 'complete':
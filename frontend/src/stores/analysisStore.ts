@@ -2,7 +2,14 @@ import { ref, computed } from 'vue'
 import { defineStore } from 'pinia'
 import axios from 'axios'
 
-export type AnalysisStatus = 'uploading' | 'processing' | 'completed' | 'failed'
+export type AnalysisStatus =
+  | 'uploading'
+  | 'queued'
+  | 'processing'
+  | 'cancelling'
+  | 'completed'
+  | 'failed'
+  | 'cancelled'
 
 // 位置信息
 export interface Position {
@@ -2,6 +2,7 @@
 
 import signal
 import sys
+import threading
 from pathlib import Path
 from time import sleep
 
@@ -26,8 +27,10 @@ def signal_handler(signum, frame):
     sys.exit(signum)
 
 
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGINT, signal_handler)
+# signal.signal 只能在主线程调用；在后台线程（如 Web 服务的任务执行线程）中首次导入时跳过
+if threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
 
 
 class HubTrainingSession:
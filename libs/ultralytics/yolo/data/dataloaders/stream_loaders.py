@@ -153,6 +153,44 @@ class LoadScreenshots:
         return str(self.screen), im, im0, None, s  # screen, img, original img, im0s, s
 
 
+class LoadNumpy:
+    # In-memory BGR image loader, i.e. `model.predict(source=np.ndarray)` or `source=[im1, im2, ...]`
+    def __init__(self, im0, imgsz=640, stride=32, auto=True, transforms=None):
+        self.ims = list(im0) if isinstance(im0, (list, tuple)) else [im0]
+        for im in self.ims:
+            assert isinstance(im, np.ndarray) and im.ndim == 3, f'Expected HWC BGR np.ndarray, got {type(im)}'
+        self.imgsz = imgsz
+        self.stride = stride
+        self.auto = auto
+        self.transforms = transforms  # optional
+        self.mode = 'image'
+        self.nf = len(self.ims)
+        self.paths = [f'image{i}' for i in range(self.nf)]  # fake paths for write_results()
+
+    def __iter__(self):
+        self.count = 0
+        return self
+
+    def __next__(self):
+        if self.count == self.nf:
+            raise StopIteration
+        path, im0 = self.paths[self.count], self.ims[self.count]
+        self.count += 1
+        s = f'image {self.count}/{self.nf} {path}: '
+
+        if self.transforms:
+            im = self.transforms(im0)  # transforms
+        else:
+            im = LetterBox(self.imgsz, self.auto, stride=self.stride)(image=im0)
+            im = im.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+            im = np.ascontiguousarray(im)  # contiguous
+
+        return path, im, im0, None, s
+
+    def __len__(self):
+        return self.nf
+
+
 class LoadImages:
     # YOLOv5 image/video dataloader, i.e. `python detect.py --source image.jpg/vid.mp4`
     def __init__(self, path, imgsz=640, stride=32, auto=True, transforms=None, vid_stride=1):
@@ -50,6 +50,8 @@ class YOLO:
         self.cfg = None  # if loaded from *.yaml
         self.ckpt_path = None
         self.overrides = {}  # overrides for trainer object
+        self.predictor = None  # reusable predictor object
+        self.predictor_overrides = None  # overrides the predictor was built with
 
         # Load or create new YOLO model
         {'.pt': self._load, '.yaml': self._new}[Path(model).suffix](model)
@@ -110,26 +112,65 @@ class YOLO:
     def fuse(self):
         self.model.fuse()
 
-    @smart_inference_mode()
-    def predict(self, source, **kwargs):
+    # predictor args that can be changed on a live predictor without rebuilding it
+    PREDICTOR_TUNABLE_ARGS = ("conf", "iou", "max_det", "agnostic_nms", "imgsz", "augment", "verbose", "retina_masks")
+
+    def _get_predictor(self, **kwargs):
         """
-        Visualize prediction.
+        > Returns a predictor with its model already wrapped, reusing the previous one when possible.
+
+        The predictor is only rebuilt when an arg outside PREDICTOR_TUNABLE_ARGS changes (e.g. device, half, save),
+        tunable args such as conf/iou/imgsz are patched onto the live predictor.
 
         Args:
-            source (str): Accepts all source types accepted by yolo
-            **kwargs : Any other args accepted by the predictors. To see all args check 'configuration' section in docs
+            **kwargs : Any other args accepted by the predictors.
         """
         overrides = self.overrides.copy()
         overrides["conf"] = 0.25
         overrides.update(kwargs)
         overrides["mode"] = "predict"
         overrides["save"] = kwargs.get("save", False)  # not save files by default
-        predictor = self.PredictorClass(overrides=overrides)
 
-        predictor.args.imgsz = check_imgsz(predictor.args.imgsz, min_dim=2)  # check image size
-        predictor.setup(model=self.model, source=source)
+        fixed = {k: v for k, v in overrides.items() if k not in self.PREDICTOR_TUNABLE_ARGS}
+        if self.predictor is None or self.predictor_overrides != fixed:
+            self.predictor = self.PredictorClass(overrides=overrides)
+            self.predictor.args.imgsz = check_imgsz(self.predictor.args.imgsz, min_dim=2)  # check image size
+            self.predictor.setup_model(model=self.model)
+            self.predictor_overrides = fixed
+        else:
+            predictor = self.predictor
+            args = get_config(DEFAULT_CONFIG, overrides)  # resets tunable args that were dropped since last call
+            for k in self.PREDICTOR_TUNABLE_ARGS:
+                setattr(predictor.args, k, getattr(args, k))
+            predictor.args.imgsz = check_imgsz(predictor.args.imgsz, min_dim=2)
+            predictor.imgsz = check_imgsz(predictor.args.imgsz, stride=predictor.model.stride)
+        return self.predictor
+
+    @smart_inference_mode()
+    def predict(self, source, **kwargs):
+        """
+        Visualize prediction.
+
+        Args:
+            source (str, np.ndarray, list): Accepts all source types accepted by yolo, or in-memory BGR images
+            **kwargs : Any other args accepted by the predictors. To see all args check 'configuration' section in docs
+        """
+        predictor = self._get_predictor(**kwargs)
+        predictor.setup_source(source)
         return predictor()
 
+    def stream(self, **kwargs):
+        """
+        > Returns the reusable predictor for repeated in-memory inference.
+
+        Call predictor.predict_frames(frames) per frame or batch: it only runs preprocess, forward and NMS, without
+        rebuilding the predictor, re-wrapping the model or creating a dataloader.
+
+        Args:
+            **kwargs : Any other args accepted by the predictors, same as predict()
+        """
+        return self._get_predictor(**kwargs)
+
     @smart_inference_mode()
     def val(self, data=None, **kwargs):
         """
@@ -30,10 +30,12 @@ from collections import defaultdict
 from pathlib import Path
 
 import cv2
+import numpy as np
 
 from ultralytics.nn.autobackend import AutoBackend
 from ultralytics.yolo.configs import get_config
-from ultralytics.yolo.data.dataloaders.stream_loaders import LoadImages, LoadScreenshots, LoadStreams
+from ultralytics.yolo.data.augment import LetterBox
+from ultralytics.yolo.data.dataloaders.stream_loaders import LoadImages, LoadNumpy, LoadScreenshots, LoadStreams
 from ultralytics.yolo.data.utils import IMG_FORMATS, VID_FORMATS
 from ultralytics.yolo.utils import DEFAULT_CONFIG, LOGGER, SETTINGS, callbacks, colorstr, ops
 from ultralytics.yolo.utils.checks import check_file, check_imgsz, check_imshow
@@ -105,26 +107,45 @@ class BasePredictor:
         return preds
 
     def setup(self, source=None, model=None):
-        # source
-        source = str(source if source is not None else self.args.source)
-        is_file = Path(source).suffix[1:] in (IMG_FORMATS + VID_FORMATS)
-        is_url = source.lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
-        webcam = source.isnumeric() or source.endswith('.streams') or (is_url and not is_file)
-        screenshot = source.lower().startswith('screen')
+        model = self.setup_model(model, warmup=False)
+        bs = self.setup_source(source)
+        model.warmup(imgsz=(1 if model.pt or model.triton else bs, 3, *self.imgsz))  # warmup
+        return model
+
+    def setup_source(self, source=None):
+        """
+        Builds the dataloader for a new source, reusing the model wrapped by setup_model().
+
+        Args:
+            source (str, np.ndarray, list, optional): Source to predict on. Defaults to args.source.
+
+        Returns:
+            (int): Batch size of the dataloader.
+        """
+        source = source if source is not None else self.args.source
+        from_img = isinstance(source, np.ndarray) or \
+            (isinstance(source, (list, tuple)) and len(source) and isinstance(source[0], np.ndarray))
+        source = source if from_img else str(source)
+        is_file = not from_img and Path(source).suffix[1:] in (IMG_FORMATS + VID_FORMATS)
+        is_url = not from_img and source.lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
+        webcam = not from_img and (source.isnumeric() or source.endswith('.streams') or (is_url and not is_file))
+        screenshot = not from_img and source.lower().startswith('screen')
         if is_url and is_file:
             source = check_file(source)  # download
 
-        # model
-        device = select_device(self.args.device)
-        model = model or self.args.model
-        self.args.half &= device.type != 'cpu'  # half precision only supported on CUDA
-        model = AutoBackend(model, device=device, dnn=self.args.dnn, fp16=self.args.half)
+        model = self.model
         stride, pt = model.stride, model.pt
-        imgsz = check_imgsz(self.args.imgsz, stride=stride)  # check image size
+        imgsz = self.imgsz
 
         # Dataloader
         bs = 1  # batch_size
-        if webcam:
+        if from_img:
+            self.dataset = LoadNumpy(source,
+                                     imgsz=imgsz,
+                                     stride=stride,
+                                     auto=pt,
+                                     transforms=getattr(model.model, 'transforms', None))
+        elif webcam:
             self.args.show = check_imshow(warn=True)
             self.dataset = LoadStreams(source,
                                        imgsz=imgsz,
@@ -147,21 +168,69 @@ class BasePredictor:
                                       transforms=getattr(model.model, 'transforms', None),
                                       vid_stride=self.args.vid_stride)
         self.vid_path, self.vid_writer = [None] * bs, [None] * bs
-        model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
 
-        self.model = model
         self.webcam = webcam
         self.screenshot = screenshot
-        self.imgsz = imgsz
         self.done_setup = True
-        self.device = device
 
+        return bs
+
+    def setup_model(self, model=None, warmup=True):
+        """
+        Wraps the model in AutoBackend once, so that it can be reused by predict_frames() without a dataloader.
+
+        Args:
+            model (str, nn.Module, optional): Model weights or in-memory model. Defaults to args.model.
+            warmup (bool, optional): Whether to run a warmup forward pass. Defaults to True.
+
+        Returns:
+            (AutoBackend): The wrapped model.
+        """
+        device = select_device(self.args.device)
+        model = model or self.args.model
+        self.args.half &= device.type != 'cpu'  # half precision only supported on CUDA
+        model = AutoBackend(model, device=device, dnn=self.args.dnn, fp16=self.args.half)
+        self.imgsz = check_imgsz(self.args.imgsz, stride=model.stride)  # check image size
+        if warmup:
+            model.warmup(imgsz=(1, 3, *self.imgsz))
+        model.eval()
+
+        self.model = model
+        self.device = device
+        self.webcam = False
         return model
 
+    @smart_inference_mode()
+    def predict_frames(self, im0s):
+        """
+        Runs preprocess, a single batched forward pass and postprocess on in-memory images.
+
+        Requires setup_model() (or setup()) to have been called. No dataloader, annotator or write_results() is used.
+
+        Args:
+            im0s (np.ndarray, list[np.ndarray]): A BGR HWC image or a list of them.
+
+        Returns:
+            Postprocessed predictions for the whole batch, one entry per image (see postprocess()).
+        """
+        im0s = [im0s] if isinstance(im0s, np.ndarray) else list(im0s)
+        stride = self.model.stride
+        shapes = {x.shape for x in im0s}
+        auto = self.model.pt and len(shapes) == 1  # minimum rectangle only if all shapes are equal
+        im = np.stack([LetterBox(self.imgsz, auto, stride=stride)(image=x) for x in im0s])
+        im = np.ascontiguousarray(im[..., ::-1].transpose((0, 3, 1, 2)))  # BGR to RGB, BHWC to BCHW
+        im = self.preprocess(im)
+        preds = self.model(im, augment=self.args.augment, visualize=False)
+        return self.postprocess(preds, im, im0s)
+
     @smart_inference_mode()
     def __call__(self, source=None, model=None):
         self.run_callbacks("on_predict_start")
-        model = self.model if self.done_setup else self.setup(source, model)
+        if self.model is None:
+            self.setup(source, model)
+        elif source is not None or not self.done_setup:
+            self.setup_source(source)  # reuse the wrapped model, only rebuild the dataloader
+        model = self.model
         model.eval()
         self.seen, self.windows, self.dt = 0, [], (ops.Profile(), ops.Profile(), ops.Profile())
         self.all_outputs = []
@@ -13,14 +13,15 @@ __all__ = ['DeepSort']
 class DeepSort(object):
     def __init__(self, model_path, max_dist=0.2, min_confidence=0.3,
                  nms_max_overlap=1.0, max_iou_distance=0.7, max_age=70,
-                 n_init=3, nn_budget=100, use_cuda=True, use_reid=True):
+                 n_init=3, nn_budget=100, use_cuda=True, use_reid=True, extractor=None):
         self.min_confidence = min_confidence
         self.nms_max_overlap = nms_max_overlap
         self.use_reid = use_reid
 
         # 只在启用 ReID 时加载外观特征提取器 (节省 GPU 显存和推理时间)
+        # 可传入已加载的 extractor 复用, 避免每个任务重复加载 ReID 权重
         if self.use_reid:
-            self.extractor = Extractor(model_path, use_cuda=use_cuda)
+            self.extractor = extractor or Extractor(model_path, use_cuda=use_cuda)
         else:
             self.extractor = None
             print("[DeepSort] USE_REID=false => 纯 IoU 模式, 跳过 ReID 模型加载")
@@ -156,8 +156,9 @@ class SegmentationPredictor(DetectionPredictor):
                                     nm=32)
         proto = preds[1][-1]
         for i, pred in enumerate(p):
-            shape = orig_img[i].shape if self.webcam else orig_img.shape
+            shape = orig_img[i].shape if self.webcam or isinstance(orig_img, list) else orig_img.shape
             if not len(pred):
+                masks.append(None)  # keep masks aligned with batch index
                 continue
             if self.args.retina_masks:
                 pred[:, :4] = ops.scale_boxes(img.shape[2:], pred[:, :4], shape).round()